@@ -2,4 +2,35 @@
 
 .. moduleauthor:: Sam McHardy
 
+The common classes can be imported from the package, each module is only imported
+when a name from it is first used so ``import allcoin`` stays cheap.
+
 """
+
+import importlib
+
+_EXPORTS = {
+    'Client': 'client',
+    'PaperClient': 'paper',
+    'BacktestClient': 'backtest',
+    'AllcoinAPIException': 'exceptions',
+    'AllcoinRequestException': 'exceptions',
+    'AllcoinCircuitOpenException': 'exceptions',
+    'AllcoinOrderValidationException': 'exceptions',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    # cache so later lookups skip this function
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,25 @@
+# coding=utf-8
+"""Command line entry point, ``python -m allcoin <command>``
+
+Commands are ``download`` for bulk data download and ``server`` for the simulated exchange.
+
+"""
+
+import sys
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    commands = ('download', 'server')
+    if not argv or argv[0] not in commands:
+        sys.stderr.write('usage: python -m allcoin {{{}}} ...\n'.format(','.join(commands)))
+        return 2
+    if argv[0] == 'download':
+        from .download import main as command
+    else:
+        from .server import main as command
+    return command(argv[1:])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
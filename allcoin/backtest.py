@@ -0,0 +1,398 @@
+# coding=utf-8
+
+import heapq
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+from .matching import KLINE_SECONDS, MatchingEngine, SimulatedTradingMixin, api_error
+
+KLINE_FIELDS = 6
+TRADE_FIELDS = 4
+
+SIDE_BUY = 1.0
+SIDE_SELL = -1.0
+
+DAY_MS = 86400000
+
+
+class KlineSeries(object):
+    """Array backed kline history for a single symbol
+
+    Columns are held in ``array('d')`` so months of 1min data cost 48 bytes a bar
+    rather than a list of Python floats per bar.
+
+    """
+
+    def __init__(self, time=None, open=None, high=None, low=None, close=None, volume=None):
+        self.time = time if time is not None else array('d')
+        self.open = open if open is not None else array('d')
+        self.high = high if high is not None else array('d')
+        self.low = low if low is not None else array('d')
+        self.close = close if close is not None else array('d')
+        self.volume = volume if volume is not None else array('d')
+
+    def __len__(self):
+        return len(self.time)
+
+    @classmethod
+    def from_klines(cls, klines):
+        """Build from the list of lists returned by :meth:`Client.get_klines`"""
+        flat = array('d')
+        for k in klines:
+            flat.extend(float(v) for v in k[:KLINE_FIELDS])
+        return cls._from_flat(flat)
+
+    @classmethod
+    def _from_flat(cls, flat):
+        return cls(*(flat[i::KLINE_FIELDS] for i in range(KLINE_FIELDS)))
+
+    @classmethod
+    def load(cls, path):
+        """Load klines stored by :meth:`save`"""
+        flat = array('d')
+        with open(path, 'rb') as f:
+            flat.frombytes(f.read())
+        return cls._from_flat(flat)
+
+    def save(self, path):
+        """Store klines as interleaved native doubles"""
+        flat = array('d', bytes(8 * KLINE_FIELDS * len(self)))
+        for i, column in enumerate((self.time, self.open, self.high, self.low, self.close, self.volume)):
+            flat[i::KLINE_FIELDS] = column
+        with open(path, 'wb') as f:
+            flat.tofile(f)
+
+    def row(self, i):
+        return [int(self.time[i]), self.open[i], self.high[i], self.low[i], self.close[i], self.volume[i]]
+
+
+class TradeSeries(object):
+    """Array backed trade tape for a single symbol"""
+
+    def __init__(self, time=None, price=None, amount=None, side=None, tid=None):
+        self.time = time if time is not None else array('d')
+        self.price = price if price is not None else array('d')
+        self.amount = amount if amount is not None else array('d')
+        self.side = side if side is not None else array('d')
+        self.tid = tid if tid is not None else array('d')
+
+    def __len__(self):
+        return len(self.time)
+
+    @classmethod
+    def from_trades(cls, trades):
+        """Build from the list of dicts returned by :meth:`Client.get_trades`"""
+        series = cls()
+        for t in trades:
+            series.time.append(float(t['date_ms']))
+            series.price.append(float(t['price']))
+            series.amount.append(float(t['amount']))
+            series.side.append(SIDE_BUY if t['type'] == 'buy' else SIDE_SELL)
+            series.tid.append(float(t['tid']))
+        return series
+
+    @classmethod
+    def load(cls, path):
+        """Load trades stored by :meth:`save`"""
+        flat = array('d')
+        with open(path, 'rb') as f:
+            flat.frombytes(f.read())
+        fields = TRADE_FIELDS + 1
+        return cls(*(flat[i::fields] for i in range(fields)))
+
+    def save(self, path):
+        fields = TRADE_FIELDS + 1
+        flat = array('d', bytes(8 * fields * len(self)))
+        for i, column in enumerate((self.time, self.price, self.amount, self.side, self.tid)):
+            flat[i::fields] = column
+        with open(path, 'wb') as f:
+            flat.tofile(f)
+
+    def row(self, i):
+        ts = int(self.time[i])
+        return {
+            'date': str(ts // 1000),
+            'date_ms': str(ts),
+            'price': self.price[i],
+            'amount': self.amount[i],
+            'tid': str(int(self.tid[i])),
+            'type': 'buy' if self.side[i] > 0 else 'sell'
+        }
+
+
+class DataStore(object):
+    """Klines and trades by symbol, optionally backed by a directory on disk
+
+    Files are laid out as ``<root>/<symbol>/<kline_type>.klines`` and
+    ``<root>/<symbol>/trades.trades``.
+
+    """
+
+    def __init__(self, root=None):
+        self.root = root
+        self.klines = {}
+        self.trades = {}
+
+    def add_klines(self, symbol, kline_type, series):
+        self.klines[(symbol, kline_type)] = series
+
+    def add_trades(self, symbol, series):
+        self.trades[symbol] = series
+
+    def load(self, symbols, kline_type='1min'):
+        """Load stored data for the given symbols from ``root``"""
+        for symbol in symbols:
+            path = os.path.join(self.root, symbol, '{}.klines'.format(kline_type))
+            if os.path.exists(path):
+                self.add_klines(symbol, kline_type, KlineSeries.load(path))
+            path = os.path.join(self.root, symbol, 'trades.trades')
+            if os.path.exists(path):
+                self.add_trades(symbol, TradeSeries.load(path))
+
+    def save(self):
+        for (symbol, kline_type), series in self.klines.items():
+            self._ensure_dir(symbol)
+            series.save(os.path.join(self.root, symbol, '{}.klines'.format(kline_type)))
+        for symbol, series in self.trades.items():
+            self._ensure_dir(symbol)
+            series.save(os.path.join(self.root, symbol, 'trades.trades'))
+
+    def _ensure_dir(self, symbol):
+        path = os.path.join(self.root, symbol)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+
+def _events(symbol, series, kind, offset=0):
+    # generators keep the merged schedule lazy; the timestamp leads for heapq.merge
+    times = series.time
+    for i in range(len(times)):
+        yield times[i] + offset, kind, symbol, i
+
+
+class _RollingDay(object):
+    """High, low and volume of the klines in the 24 hours to the last one added
+
+    Monotonic queues of highs and lows and a running volume keep each kline O(1)
+    amortised, as in :class:`allcoin.server.MarketData`.
+
+    """
+
+    def __init__(self):
+        self.last = -1
+        self._window = deque()
+        self._highs = deque()
+        self._lows = deque()
+        self.volume = 0.0
+
+    def add(self, k, i):
+        """Add row ``i`` of a :class:`KlineSeries`, rebuilding the window if rows were skipped"""
+        if i != self.last + 1:
+            self.__init__()
+            for j in range(bisect_left(k.time, k.time[i] - DAY_MS, 0, i), i):
+                self._push(k.time[j], k.high[j], k.low[j], k.volume[j])
+        self._push(k.time[i], k.high[i], k.low[i], k.volume[i])
+        self.last = i
+
+        cutoff = k.time[i] - DAY_MS
+        window = self._window
+        while window[0][0] < cutoff:
+            self.volume -= window.popleft()[1]
+        if len(window) == 1:
+            self.volume = window[0][1]
+        while self._highs[0][0] < cutoff:
+            self._highs.popleft()
+        while self._lows[0][0] < cutoff:
+            self._lows.popleft()
+
+    def _push(self, ts, high, low, volume):
+        self._window.append((ts, volume))
+        self.volume += volume
+        while self._highs and self._highs[-1][1] <= high:
+            self._highs.pop()
+        self._highs.append((ts, high))
+        while self._lows and self._lows[-1][1] >= low:
+            self._lows.pop()
+        self._lows.append((ts, low))
+
+    @property
+    def high(self):
+        return self._highs[0][1]
+
+    @property
+    def low(self):
+        return self._lows[0][1]
+
+
+class BacktestClient(SimulatedTradingMixin):
+    """Offline Client replaying stored klines and trades through a simulated matching engine
+
+    Exposes the same methods as :class:`allcoin.client.Client` so strategies can run
+    unchanged.  Time only moves forward when :meth:`run` dispatches the next event, and
+    market data methods only ever see data up to the current clock.  Klines are dispatched
+    when they close, after the trades inside them, and only closed klines are visible.
+
+    .. code:: python
+
+        store = DataStore('/data/allcoin')
+        store.load(['eth_btc', 'ltc_btc'])
+        client = BacktestClient(store, balances={'btc': 1.0})
+
+        def on_bar(client, symbol, kline):
+            if kline[4] < 0.05:
+                client.create_buy_order(symbol, kline[4], 1)
+
+        client.run(on_bar=on_bar)
+        print(client.get_userinfo())
+
+    """
+
+    ORDER_STATUS_UNFILLED = 0
+    ORDER_STATUS_PARTIALLY_FILLED = 1
+    ORDER_STATUS_FILLED = 2
+    ORDER_STATUS_CANCELLED = 10
+
+    def __init__(self, store, balances=None, kline_type='1min', maker_fee=0.001, taker_fee=0.002, spread=0.0):
+        """
+        :param store: market data to replay
+        :type store: DataStore
+        :param balances: initial free balances by currency
+        :type balances: dict
+        :param kline_type: kline resolution that drives the clock, one of the kline types accepted by get_klines
+        :type kline_type: str
+        :param maker_fee: fee rate for resting fills
+        :type maker_fee: float
+        :param taker_fee: fee rate for fills crossing the book
+        :type taker_fee: float
+        :param spread: fractional spread applied around the close for the synthetic book
+        :type spread: float
+
+        """
+        self.store = store
+        self.kline_type = kline_type
+        self.spread = spread
+        self.engine = MatchingEngine(balances, maker_fee=maker_fee, taker_fee=taker_fee)
+        self.time_ms = 0
+        # index one past the last visible row per (kind, symbol)
+        self._cursor = {}
+        # rolling ticker stats per symbol, kept up to date as klines are dispatched
+        self._days = {}
+
+    # Clock
+
+    def run(self, on_bar=None, on_trade=None, start=None, end=None):
+        """Replay all stored events in time order
+
+        :param on_bar: optional - callback(client, symbol, kline) after each kline
+        :param on_trade: optional - callback(client, symbol, trade) after each trade
+        :param start: optional - first timestamp in ms to replay
+        :param end: optional - last timestamp in ms to replay
+
+        """
+        streams = []
+        interval = self._interval_ms(self.kline_type)
+        for (symbol, kline_type), series in self.store.klines.items():
+            if kline_type == self.kline_type:
+                streams.append(_events(symbol, series, 0, interval))
+        for symbol, series in self.store.trades.items():
+            streams.append(_events(symbol, series, 1))
+
+        engine = self.engine
+        cursor = self._cursor
+        days = self._days
+        spread = self.spread
+        for ts, kind, symbol, i in heapq.merge(*streams):
+            if start is not None and ts < start:
+                continue
+            if end is not None and ts > end:
+                break
+            self.time_ms = int(ts)
+            if kind == 0:
+                k = self.store.klines[(symbol, self.kline_type)]
+                cursor[(0, symbol)] = i + 1
+                day = days.get(symbol)
+                if day is None:
+                    day = days[symbol] = _RollingDay()
+                day.add(k, i)
+                close = k.close[i]
+                engine.on_bar(symbol, self.time_ms, k.high[i], k.low[i], close, k.volume[i])
+                if spread:
+                    engine.set_book(symbol, [[close * (1 - spread), k.volume[i]]], [[close * (1 + spread), k.volume[i]]])
+                if on_bar:
+                    on_bar(self, symbol, k.row(i))
+            else:
+                t = self.store.trades[symbol]
+                cursor[(1, symbol)] = i + 1
+                engine.on_trade(symbol, self.time_ms, t.price[i], t.amount[i], 'buy' if t.side[i] > 0 else 'sell')
+                if on_trade:
+                    on_trade(self, symbol, t.row(i))
+
+    def _interval_ms(self, kline_type):
+        try:
+            return KLINE_SECONDS[kline_type] * 1000
+        except KeyError:
+            raise api_error(10008)
+
+    # Exchange Endpoints
+
+    def _klines(self, symbol, kline_type=None):
+        try:
+            return self.store.klines[(symbol, kline_type or self.kline_type)]
+        except KeyError:
+            raise api_error(10017)
+
+    def get_ticker(self, symbol):
+        k = self._klines(symbol)
+        end = self._cursor.get((0, symbol), 0)
+        if not end:
+            raise api_error(10016)
+        day = self._days[symbol]
+        bids, asks = self.engine.get_book(symbol)
+        return {
+            'date': str(self.time_ms // 1000),
+            'ticker': {
+                'buy': str(bids[0][0]) if bids else '0',
+                'high': str(day.high),
+                'last': str(k.close[end - 1]),
+                'low': str(day.low),
+                'sell': str(asks[0][0]) if asks else '0',
+                'vol': str(day.volume),
+            }
+        }
+
+    def get_order_book(self, symbol, size=None, merge=None):
+        self._klines(symbol)
+        bids, asks = self.engine.get_book(symbol)
+        size = size or 100
+        return {
+            'asks': [list(level) for level in asks[:size]][::-1],
+            'bids': [list(level) for level in bids[:size]],
+        }
+
+    def get_trades(self, symbol, since=None):
+        t = self.store.trades.get(symbol)
+        if t is None:
+            raise api_error(10017)
+        end = self._cursor.get((1, symbol), 0)
+        if since:
+            start = bisect_left(t.tid, float(since), 0, end)
+        else:
+            start = max(0, end - 600)
+        return [t.row(i) for i in range(start, min(end, start + 600))]
+
+    def get_klines(self, symbol, kline_type, size=None, since=None):
+        k = self._klines(symbol, kline_type)
+        if kline_type == self.kline_type:
+            end = self._cursor.get((0, symbol), 0)
+        else:
+            # only klines which have closed by the current clock
+            end = bisect_right(k.time, self.time_ms - self._interval_ms(kline_type))
+        if since:
+            start = bisect_left(k.time, since, 0, end)
+            if size:
+                end = min(end, start + size)
+        else:
+            start = max(0, end - size) if size else 0
+        return [k.row(i) for i in range(start, end)]
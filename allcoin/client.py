@@ -1,23 +1,40 @@
 # coding=utf-8
 
 import hashlib
-import requests
 import json
+import threading
+import time
+import weakref
 from operator import itemgetter
 from .exceptions import AllcoinAPIException, AllcoinRequestException
+from .models import OrderStatus
+from .streaming import JSONArrayStream
 
 
 class Client(object):
+    """Allcoin API client
+
+    A Client can be shared between threads, each thread sends its requests through its own
+    ``requests.Session`` so connections and cookies are never shared mid request.
+
+    ``requests`` is only imported when the first session is made, and with
+    ``transport='http.client'`` never, see :mod:`allcoin.httpclient`.
+
+    """
 
     API_URL = 'https://api.allcoin.com/api'
     API_VERSION = 'v1'
 
-    ORDER_STATUS_UNFILLED = 0
-    ORDER_STATUS_PARTIALLY_FILLED = 1
-    ORDER_STATUS_FILLED = 2
-    ORDER_STATUS_CANCELLED = 10
+    ORDER_STATUS_UNFILLED = OrderStatus.UNFILLED
+    ORDER_STATUS_PARTIALLY_FILLED = OrderStatus.PARTIALLY_FILLED
+    ORDER_STATUS_FILLED = OrderStatus.FILLED
+    ORDER_STATUS_CANCELLED = OrderStatus.CANCELLED
 
-    def __init__(self, api_key, api_secret, requests_params=None):
+    STREAM_CHUNK_SIZE = 8192
+
+    def __init__(self, api_key, api_secret, requests_params=None, hedge_policy=None, retry_policy=None, timeout=10,
+                 pool_size=10, scheduler=None, symbol_registry=None,
+                 clock=None, transport='requests'):
         """Allcoin API Client constructor
 
         :param api_key: Api Key
@@ -26,21 +43,86 @@ class Client(object):
         :type api_secret: str.
         :param requests_params: optional - Dictionary of requests params to use for all calls
         :type requests_params: dict.
+        :param hedge_policy: optional - HedgePolicy used to hedge slow unsigned GET requests
+        :type hedge_policy: allcoin.hedging.HedgePolicy
+        :param retry_policy: optional - RetryPolicy used to retry transient errors and trip circuit breakers
+        :type retry_policy: allcoin.retry.RetryPolicy
+        :param timeout: optional - requests timeout in seconds, default 10
+        :type timeout: float
+        :param pool_size: optional - connections kept open per thread, default 10
+        :type pool_size: int
+        :param scheduler: optional - RequestScheduler sharing the rate budget between trading and market data
+        :type scheduler: allcoin.scheduler.RequestScheduler
+        :param symbol_registry: optional - SymbolRegistry orders are checked and rounded against before sending
+        :type symbol_registry: allcoin.symbols.SymbolRegistry
+        :param clock: optional - ClockEstimator learning the server clock offset from responses
+        :type clock: allcoin.clock.ClockEstimator
+        :param transport: optional - requests, or http.client for the standard library transport
+        :type transport: str
 
         """
 
         self.API_KEY = api_key
         self.API_SECRET = api_secret
-        self.session = self._init_session()
+        self._pool_size = pool_size
+        self._local = threading.local()
+        # (weak reference to the thread, its session)
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
         self._requests_params = requests_params
+        self._hedge_policy = hedge_policy
+        self._retry_policy = retry_policy
+        self._scheduler = scheduler
+        self._symbol_registry = symbol_registry
+        self._clock = clock
+        if transport not in ('requests', 'http.client'):
+            raise ValueError('Unknown transport {}'.format(transport))
+        self._transport = transport
+        self._timeout = timeout
 
     def _init_session(self):
 
-        session = requests.session()
+        if self._transport == 'http.client':
+            from .httpclient import HTTPSession
+            session = HTTPSession()
+        else:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
         session.headers.update({'Accept': 'application/json',
                                 'User-Agent': 'allcoin/python'})
         return session
 
+    @property
+    def session(self):
+        """The session for the calling thread, a ``requests.Session`` unless another transport was chosen"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._init_session()
+            with self._sessions_lock:
+                # close the sessions of threads that have ended so short lived threads do not leak pools
+                live = []
+                for ref, other in self._sessions:
+                    thread = ref()
+                    if thread is not None and thread.is_alive():
+                        live.append((ref, other))
+                    else:
+                        other.close()
+                live.append((weakref.ref(threading.current_thread()), session))
+                self._sessions = live
+        return session
+
+    def close(self):
+        """Close the sessions of every thread that used this client"""
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for _, session in sessions:
+            session.close()
+        self._local = threading.local()
+
     def _create_api_uri(self, path):
         return "{}/{}/{}".format(self.API_URL, self.API_VERSION, path)
 
@@ -48,7 +130,6 @@ class Client(object):
 
         ordered_data = self._order_params(data)
         ordered_data.append(('secret_key', self.API_SECRET))
-        print("ordered data:{}".format(ordered_data))
         query_string = '&'.join(["{}={}".format(d[0], d[1]) for d in ordered_data])
         m = hashlib.md5(query_string.encode('utf-8'))
         return m.hexdigest().upper()
@@ -77,8 +158,13 @@ class Client(object):
 
         uri = self._create_api_uri(path)
 
+        # True streams a top level array, a string streams the array under that key
+        stream = kwargs.pop('stream', False)
+        if stream:
+            kwargs['stream'] = True
+
         # set default requests timeout
-        kwargs['timeout'] = 10
+        kwargs['timeout'] = self._timeout
 
         # add our global requests params
         if self._requests_params:
@@ -86,7 +172,15 @@ class Client(object):
 
         data = kwargs.get('data', None)
         if data and isinstance(data, dict):
-            kwargs['data'] = data
+            # copy so the caller's dict is never modified and can be reused across threads
+            data = kwargs['data'] = dict(data)
+
+            # find any requests params passed and apply them, before signing so they are not sent
+            if 'requests_params' in kwargs['data']:
+                # merge requests params into kwargs
+                kwargs.update(kwargs['data']['requests_params'])
+                del(kwargs['data']['requests_params'])
+
         if signed:
             # generate signature
             kwargs['data']['api_key'] = self.API_KEY
@@ -94,12 +188,6 @@ class Client(object):
 
         # sort get and post params to match signature order
         if data:
-            # find any requests params passed and apply them
-            if 'requests_params' in kwargs['data']:
-                # merge requests params into kwargs
-                kwargs.update(kwargs['data']['requests_params'])
-                del(kwargs['data']['requests_params'])
-
             # sort post params
             kwargs['data'] = self._order_params(kwargs['data'])
 
@@ -108,10 +196,34 @@ class Client(object):
             kwargs['params'] = kwargs['data']
             del(kwargs['data'])
 
-        print(kwargs)
-
-        response = getattr(self.session, method)(uri, **kwargs)
-        return self._handle_response(response)
+        def send():
+            # every attempt, including retries, waits for its turn in the rate budget
+            if self._scheduler:
+                return self._scheduler.call(path, lambda: self._send(method, path, signed, uri, kwargs, stream))
+            return self._send(method, path, signed, uri, kwargs, stream)
+
+        if self._retry_policy:
+            return self._retry_policy.call(path, send)
+        return send()
+
+    def _send(self, method, path, signed, uri, kwargs, stream=False):
+        sent = time.time() * 1000
+        # only unsigned GETs are idempotent enough to send twice
+        if self._hedge_policy and not signed and not stream and method == 'get':
+            # resolve the session inside each hedge worker so two threads never share one
+            response = self._hedge_policy.request(path, lambda *a, **k: self.session.get(*a, **k), uri, **kwargs)
+        else:
+            response = getattr(self.session, method)(uri, **kwargs)
+        if stream:
+            if self._clock:
+                self._clock.observe_response(sent, time.time() * 1000, response)
+            return self._handle_stream_response(response, None if stream is True else stream)
+        if not self._clock:
+            return self._handle_response(response)
+        received = time.time() * 1000
+        res = self._handle_response(response)
+        self._clock.observe_response(sent, received, response, res)
+        return self._clock.annotate(res, sent, received)
 
     def _handle_response(self, response):
         """Internal helper for handling API responses from the Binance server.
@@ -128,6 +240,14 @@ class Client(object):
         except ValueError:
             raise AllcoinRequestException('Invalid Response: %s' % response.text)
 
+    def _handle_stream_response(self, response, key=None):
+        """Internal helper for streamed responses, returns an iterator over the array rows.
+        Raises the appropriate exceptions for error responses before any rows are read.
+        """
+        if not str(response.status_code).startswith('2'):
+            raise AllcoinAPIException(response)
+        return JSONArrayStream(response.iter_content(self.STREAM_CHUNK_SIZE), key=key, response=response)
+
     def _get(self, path, signed=False, **kwargs):
         return self._request('get', path, signed, **kwargs)
 
@@ -289,6 +409,32 @@ class Client(object):
 
         return self._get('trades', data=params)
 
+    def stream_trades(self, symbol, since=None):
+        """Stream the last 600 trades, parsing each trade as the response arrives
+
+        :param symbol: required
+        :type symbol: str
+        :param since:  Transaction id (inclusive)
+        :type since: int
+
+        .. code:: python
+
+            for trade in client.stream_trades('eth_btc'):
+                print(trade['price'])
+
+        :returns: iterator of trades in the same format as :meth:`get_trades`
+
+        :raises: AllcoinResponseException, BinanceAPIException
+
+        """
+        params = {
+            'symbol': symbol
+        }
+        if since:
+            params['since'] = since
+
+        return self._get('trades', data=params, stream=True)
+
     def get_trade_history(self, symbol, since=None):
         """Get trade history - requires api key
 
@@ -347,6 +493,32 @@ class Client(object):
 
         return self._post('trade_history', data=params, signed=True)
 
+    def stream_trade_history(self, symbol, since=None):
+        """Stream trade history, parsing each trade as the response arrives - requires api key
+
+        :param symbol: required
+        :type symbol: str
+        :param since:  Transaction id (inclusive)
+        :type since: int
+
+        .. code:: python
+
+            for trade in client.stream_trade_history('eth_btc', since=230433):
+                print(trade['tid'])
+
+        :returns: iterator of trades in the same format as :meth:`get_trade_history`
+
+        :raises: AllcoinResponseException, BinanceAPIException
+
+        """
+        params = {
+            'symbol': symbol
+        }
+        if since:
+            params['since'] = since
+
+        return self._post('trade_history', data=params, signed=True, stream=True)
+
     def get_klines(self, symbol, kline_type, size=None, since=None):
         """Get klines for a symbol
 
@@ -471,9 +643,11 @@ class Client(object):
                 "result": true
             }
 
-        :raises: AllcoinResponseException, BinanceAPIException
+        :raises: AllcoinResponseException, BinanceAPIException, AllcoinOrderValidationException
 
         """
+        if self._symbol_registry:
+            price, amount = self._symbol_registry.normalize(symbol, side, price, amount)
         params = {
             'symbol': symbol,
             'type': side,
@@ -581,9 +755,17 @@ class Client(object):
                 "result":true
             }
 
-        :raises: AllcoinResponseException, BinanceAPIException
+        :raises: AllcoinResponseException, BinanceAPIException, AllcoinOrderValidationException
 
         """
+        if self._symbol_registry:
+            # a failing order rejects the whole batch before it is sent
+            normalized = []
+            for order in order_data:
+                price, amount = self._symbol_registry.normalize(
+                    symbol, order.get('type', order_type), order['price'], order['amount'])
+                normalized.append(dict(order, price=price, amount=amount))
+            order_data = normalized
         params = {
             'symbol': symbol,
             'order_data': json.dumps(order_data, separators=(',', ':'))
@@ -810,7 +992,7 @@ class Client(object):
 
             order = client.get_order_history('eth_btc', 1)
 
-        :returns: API response
+        :returns: API response, orders are listed oldest first
 
         .. code-block:: python
 
@@ -847,3 +1029,34 @@ class Client(object):
         }
 
         return self._post('order_history', data=params, signed=True)
+
+    def stream_order_history(self, symbol, order_status, page=1, limit=200):
+        """Stream a page of order history, parsing each order as the response arrives
+
+        :param symbol: required
+        :type symbol: str
+        :param order_status: 0 for unfilled orders; 1 for filled orders
+        :type order_status: int
+        :param page: page to fetch
+        :type page: int
+        :param limit: amount on each page
+        :type limit: int
+
+        .. code-block:: python
+
+            for order in client.stream_order_history('eth_btc', 1, limit=1000):
+                print(order['order_id'])
+
+        :returns: iterator of the orders in the page in the same format as :meth:`get_order_history`
+
+        :raises: AllcoinResponseException, BinanceAPIException
+
+        """
+        params = {
+            'symbol': symbol,
+            'status': order_status,
+            'current_page': page,
+            'page_length': limit
+        }
+
+        return self._post('order_history', data=params, signed=True, stream='orders')
@@ -0,0 +1,146 @@
+# coding=utf-8
+
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+
+
+class ClockEstimator(object):
+    """Estimate the server clock offset and round trip times from normal traffic
+
+    Every response brackets a server timestamp between the local times the request was
+    sent and the response received.  The ``Date`` header is whole seconds, so each response
+    gives the offset (server minus local clock) to within the round trip plus a second,
+    and the ticker ``date`` and trade ``date_ms`` values give lower bounds.  Intersecting the
+    bounds from the last ``window`` responses narrows the offset well below a second as
+    requests land at different points within the server's second.
+
+    Dict responses are annotated with ``server_time``, the estimated server time in ms the
+    response was generated, and ``age_ms``, how old it was when received.  List responses
+    such as trades and klines are not annotated, pass their timestamps to :meth:`age`.
+
+    .. code:: python
+
+        clock = ClockEstimator()
+        client = Client(api_key, api_secret, clock=clock)
+
+        ticker = client.get_ticker('eth_btc')
+        if clock.age(ticker) > 2000:
+            ...
+
+        klines = client.get_klines('eth_btc', '1min', since=clock.server_time() - 3600000)
+
+    """
+
+    def __init__(self, window=64):
+        """
+        :param window: responses the offset and round trip statistics are taken over
+        :type window: int
+
+        """
+        self.window = window
+        self.offset = 0.0
+        self.uncertainty = None
+        self.samples = 0
+        self._bounds = deque(maxlen=window)
+        self._rtts = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._date_header = (None, None)
+
+    def _header_ms(self, value):
+        # the header only changes once a second, parse each value once
+        header, ms = self._date_header
+        if header != value:
+            try:
+                ms = parsedate_to_datetime(value).timestamp() * 1000
+            except (TypeError, ValueError):
+                ms = None
+            self._date_header = (value, ms)
+        return ms
+
+    def observe(self, sent, received, low, high=None):
+        """Record that the server clock read between ``low`` and ``high`` ms during a request
+
+        :param sent: local time in ms the request was sent
+        :param received: local time in ms the response was received
+        :param low: earliest server time in ms
+        :param high: optional - latest server time in ms, None if only a lower bound is known
+
+        """
+        bound = (low - received, None if high is None else high - sent)
+        with self._lock:
+            self._bounds.append(bound)
+            lows = [b[0] for b in self._bounds]
+            highs = [b[1] for b in self._bounds if b[1] is not None]
+            if not highs:
+                return
+            low, high = max(lows), min(highs)
+            if low > high:
+                # clocks drifted or a bound was wrong, fall back to the tightest two sided sample
+                low, high = min((b for b in self._bounds if b[1] is not None), key=lambda b: b[1] - b[0])
+            self.offset = (low + high) / 2.0
+            self.uncertainty = (high - low) / 2.0
+
+    def observe_response(self, sent, received, response, res=None):
+        """Record the round trip and any timestamps in a response
+
+        :param sent: local time in ms the request was sent
+        :param received: local time in ms the response was received
+        :param response: ``requests`` response
+        :param res: optional - decoded JSON body
+
+        """
+        with self._lock:
+            self.samples += 1
+            self._rtts.append(received - sent)
+        date = self._header_ms(response.headers.get('Date'))
+        if date is not None:
+            self.observe(sent, received, date, date + 1000)
+        # body timestamps may come from cached data so only bound the server clock from below
+        if isinstance(res, dict) and 'date' in res:
+            self.observe(sent, received, int(res['date']) * 1000)
+        elif isinstance(res, list) and res and isinstance(res[-1], dict) and 'date_ms' in res[-1]:
+            self.observe(sent, received, max(int(t['date_ms']) for t in res))
+
+    def annotate(self, res, sent, received):
+        """Add ``server_time`` and ``age_ms`` to a dict response"""
+        if not isinstance(res, dict):
+            return res
+        if 'date' in res:
+            # the middle of the second the server stamped it with
+            generated = int(res['date']) * 1000 + 500
+        else:
+            generated = (sent + received) / 2.0 + self.offset
+        res['server_time'] = int(generated)
+        res['age_ms'] = max(0, int(received + self.offset - generated))
+        return res
+
+    def server_time(self, now=None):
+        """Estimated server time in ms"""
+        now = time.time() * 1000 if now is None else now
+        return int(now + self.offset)
+
+    def age(self, value, now=None):
+        """Estimated ms since an annotated response was generated or a server timestamp in ms"""
+        if isinstance(value, dict):
+            value = value['server_time']
+        return self.server_time(now) - int(value)
+
+    def stats(self):
+        """Offset and its uncertainty, and round trip percentiles in ms over the window"""
+        with self._lock:
+            rtts = sorted(self._rtts)
+            return {
+                'offset': self.offset,
+                'uncertainty': self.uncertainty,
+                'samples': self.samples,
+                'rtt_min': rtts[0] if rtts else None,
+                'rtt_p50': _percentile(rtts, 0.5),
+                'rtt_p90': _percentile(rtts, 0.9),
+                'rtt_p99': _percentile(rtts, 0.99),
+            }
@@ -0,0 +1,156 @@
+# coding=utf-8
+
+import threading
+import time
+from decimal import Decimal
+
+# largest depth the exchange returns
+MAX_DEPTH = 100
+
+
+def _decimals(price):
+    # repr is the shortest string that round trips, Decimal reads its exponent form too
+    return max(0, -Decimal(repr(float(price))).normalize().as_tuple().exponent)
+
+
+def merge_levels(levels, tick, merge, side):
+    """Aggregate price levels into buckets of ``merge`` ticks
+
+    Bids round down and asks round up so a bucket never shows a better price than any
+    order in it.
+
+    :param levels: [price, amount] pairs, best price first
+    :param tick: price increment of the symbol
+    :param merge: ticks per bucket, 1 leaves levels unmerged
+    :param side: buy for bids, sell for asks
+    :returns: merged [price, amount] pairs, best price first
+
+    """
+    decimals = _decimals(tick)
+    merged = []
+    last = None
+    for price, amount in levels:
+        ticks = int(round(price / tick))
+        bucket = ticks // merge if side == 'buy' else -(-ticks // merge)
+        if bucket == last:
+            merged[-1][1] += amount
+        else:
+            merged.append([bucket, amount])
+            last = bucket
+    step = tick * merge
+    return [[round(bucket * step, decimals), round(amount, 8)] for bucket, amount in merged]
+
+
+class DepthSnapshot(object):
+    """One full depth fetch from which any size and merge view is derived locally
+
+    Views are cached so consumers asking for the same size and merge share the result.
+    When the snapshot holds the full ``MAX_DEPTH`` levels the deepest bucket of a merged
+    view may be missing orders beyond the snapshot, so it is dropped.
+
+    .. code:: python
+
+        snapshot = DepthSnapshot(client.get_order_book('eth_btc', size=100))
+        top = snapshot.view(size=5)
+        coarse = snapshot.view(size=10, merge=10)
+
+    """
+
+    def __init__(self, res, tick=None, fetched=None):
+        """
+        :param res: :meth:`Client.get_order_book` response
+        :param tick: optional - price increment, inferred from the prices if not given
+        :param fetched: optional - time the snapshot was fetched, defaults to now
+
+        """
+        # best first on both sides, the API lists asks highest first
+        self.bids = [(float(p), float(a)) for p, a in res.get('bids', [])]
+        self.asks = [(float(p), float(a)) for p, a in reversed(res.get('asks', []))]
+        if tick is None:
+            decimals = max([_decimals(p) for p, _ in self.bids + self.asks] or [0])
+            tick = 10 ** -decimals
+        self.tick = tick
+        self.fetched = time.time() if fetched is None else fetched
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def _side(self, side, merge):
+        levels = self.bids if side == 'buy' else self.asks
+        if merge <= 1:
+            return [[p, a] for p, a in levels]
+        merged = merge_levels(levels, self.tick, merge, side)
+        if len(levels) >= MAX_DEPTH:
+            merged = merged[:-1]
+        return merged
+
+    def view(self, size=MAX_DEPTH, merge=1):
+        """Order book in the :meth:`Client.get_order_book` shape
+
+        :param size: levels per side
+        :param merge: ticks per merged level
+        :returns: dict of asks (highest first) and bids (highest first)
+
+        """
+        size = int(size or MAX_DEPTH)
+        merge = int(merge or 1)
+        key = (size, merge)
+        with self._lock:
+            view = self._views.get(key)
+        if view is None:
+            view = {
+                'asks': self._side('sell', merge)[:size][::-1],
+                'bids': self._side('buy', merge)[:size],
+            }
+            with self._lock:
+                self._views[key] = view
+        return view
+
+
+class DepthCache(object):
+    """Serve order books at any size and merge from one full depth request per symbol
+
+    A snapshot is reused for ``max_age`` seconds, so several consumers asking for different
+    views of a symbol cost one request between them.
+
+    .. code:: python
+
+        depth = DepthCache(client, max_age=0.5)
+        book = depth.get_order_book('eth_btc', size=10, merge=5)
+
+    Returned views are shared between callers and must not be modified.
+
+    """
+
+    def __init__(self, client, max_age=1.0, ticks=None):
+        """
+        :param client: Client to fetch depth with
+        :param max_age: seconds a snapshot is reused for
+        :param ticks: optional - dict of symbol to price increment, inferred from prices otherwise
+
+        """
+        self.client = client
+        self.max_age = max_age
+        self.ticks = dict(ticks or {})
+        self.requests = 0
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._symbol_locks = {}
+
+    def snapshot(self, symbol):
+        """Current :class:`DepthSnapshot` for the symbol, fetching one if the last is too old"""
+        with self._lock:
+            lock = self._symbol_locks.setdefault(symbol, threading.Lock())
+        # one fetch per symbol at a time, concurrent callers wait for it rather than duplicating it
+        with lock:
+            snapshot = self._snapshots.get(symbol)
+            if snapshot is None or time.time() - snapshot.fetched > self.max_age:
+                res = self.client.get_order_book(symbol, size=MAX_DEPTH)
+                snapshot = DepthSnapshot(res, self.ticks.get(symbol))
+                with self._lock:
+                    self.requests += 1
+                    self._snapshots[symbol] = snapshot
+        return snapshot
+
+    def get_order_book(self, symbol, size=None, merge=None):
+        """Drop in for :meth:`Client.get_order_book` served from the cached snapshot"""
+        return self.snapshot(symbol).view(size, merge)
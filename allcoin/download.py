@@ -0,0 +1,229 @@
+# coding=utf-8
+"""Bulk download of klines, trades and order history for many symbols
+
+Each symbol and data kind is a job run on a bounded worker pool, with every request
+passing through one shared rate limiter.  Rows are appended to gzipped JSON lines files
+and the cursor of each job is checkpointed after every page, so an interrupted run picks
+up where it stopped and a later run only fetches what is new.
+
+.. code:: bash
+
+    python -m allcoin download eth_btc ltc_btc --kinds klines trades \\
+        --kline-type 1hour --since 1514764800000 --output data/ --workers 4 --rate 5
+
+Order history is signed so needs ``--api-key`` and ``--api-secret`` or the
+``ALLCOIN_API_KEY`` and ``ALLCOIN_API_SECRET`` environment variables.
+
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .client import Client
+from .matching import KLINE_SECONDS
+
+KINDS = ('klines', 'trades', 'order_history')
+KLINE_PAGE = 1000
+ORDER_PAGE = 200
+
+
+class RateLimiter(object):
+    """Token bucket shared by all workers, ``rate`` requests per second with bursts of ``burst``"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.time()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Checkpoint(object):
+    """Cursor per job persisted to a JSON file, rewritten atomically on every update"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.cursors = json.load(f)
+        except (IOError, ValueError):
+            self.cursors = {}
+
+    def get(self, job, default=None):
+        with self._lock:
+            return self.cursors.get(job, default)
+
+    def set(self, job, cursor):
+        with self._lock:
+            self.cursors[job] = cursor
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self.cursors, f, sort_keys=True)
+            os.replace(tmp, self.path)
+
+
+class Downloader(object):
+    """Run download jobs for a set of symbols
+
+    :param client: Client to fetch with, signed jobs need its API key and secret
+    :param output: directory for the data files and checkpoint
+    :param workers: jobs run at the same time
+    :param rate: requests per second across all workers
+
+    """
+
+    def __init__(self, client, output, workers=4, rate=5.0, kline_type='1min', since=0):
+        self.client = client
+        self.output = output
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.kline_type = kline_type
+        self.since = since
+        self.checkpoint = Checkpoint(os.path.join(output, 'checkpoint.json'))
+
+    def _path(self, job):
+        return os.path.join(self.output, '{}.jsonl.gz'.format(job))
+
+    def _write(self, job, rows, cursor):
+        # rows land before the checkpoint moves, a crash between the two repeats one page at most
+        with gzip.open(self._path(job), 'at') as f:
+            for row in rows:
+                f.write(json.dumps(row, separators=(',', ':')))
+                f.write('\n')
+        self.checkpoint.set(job, cursor)
+
+    def _fetch(self, method, *args, **kwargs):
+        self.limiter.acquire()
+        return method(*args, **kwargs)
+
+    def klines(self, symbol):
+        job = '{}_klines_{}'.format(symbol, self.kline_type)
+        since = self.checkpoint.get(job, self.since)
+        rows = 0
+        while True:
+            klines = self._fetch(self.client.get_klines, symbol, self.kline_type, size=KLINE_PAGE, since=since)
+            # the still forming bar is left for the next run so it is only written once closed
+            last_open = (time.time() - KLINE_SECONDS[self.kline_type]) * 1000
+            closed = [k for k in klines if since <= k[0] <= last_open]
+            if not closed:
+                return rows
+            since = int(closed[-1][0]) + 1
+            self._write(job, closed, since)
+            rows += len(closed)
+            if len(klines) < KLINE_PAGE:
+                return rows
+
+    def trades(self, symbol):
+        job = '{}_trades'.format(symbol)
+        since = self.checkpoint.get(job, 1)
+        rows = 0
+        while True:
+            trades = [t for t in self._fetch(self.client.get_trades, symbol, since=since) if int(t['tid']) >= since]
+            if not trades:
+                return rows
+            since = int(trades[-1]['tid']) + 1
+            self._write(job, trades, since)
+            rows += len(trades)
+
+    def order_history(self, symbol):
+        """Append new completed orders and replace the snapshot of open orders
+
+        Order history is listed oldest first, as :class:`allcoin.orderindex.OrderIndex` and the simulator
+        assume, so completed orders are resumed from the page and offset reached last run.
+
+        """
+        job = '{}_orders_completed'.format(symbol)
+        page, offset = self.checkpoint.get(job, [1, 0])
+        rows = 0
+        while True:
+            orders = self._fetch(self.client.get_order_history, symbol, int(self.client.ORDER_STATUS_FILLED),
+                                 page=page, limit=ORDER_PAGE).get('orders', [])
+            new = orders[offset:]
+            if len(orders) < ORDER_PAGE:
+                # the last page is partial and may still grow, remember how much of it we have
+                if new:
+                    self._write(job, new, [page, len(orders)])
+                rows += len(new)
+                break
+            page, offset = page + 1, 0
+            self._write(job, new, [page, offset])
+            rows += len(new)
+
+        # open orders change state so are downloaded as a fresh snapshot every run
+        snapshot = []
+        page = 1
+        while True:
+            orders = self._fetch(self.client.get_order_history, symbol, int(self.client.ORDER_STATUS_UNFILLED),
+                                 page=page, limit=ORDER_PAGE).get('orders', [])
+            snapshot.extend(orders)
+            if len(orders) < ORDER_PAGE:
+                break
+            page += 1
+        path = self._path('{}_orders_open'.format(symbol))
+        with gzip.open(path + '.tmp', 'wt') as f:
+            for row in snapshot:
+                f.write(json.dumps(row, separators=(',', ':')))
+                f.write('\n')
+        os.replace(path + '.tmp', path)
+        return rows + len(snapshot)
+
+    def run(self, symbols, kinds=KINDS, log=None):
+        """Run every symbol and kind job, returning a dict of job to rows written or the error raised"""
+        if not os.path.isdir(self.output):
+            os.makedirs(self.output)
+        jobs = [(symbol, kind) for symbol in symbols for kind in kinds]
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = dict((executor.submit(getattr(self, kind), symbol), (symbol, kind)) for symbol, kind in jobs)
+            for future, (symbol, kind) in futures.items():
+                try:
+                    results[(symbol, kind)] = future.result()
+                except Exception as e:
+                    results[(symbol, kind)] = e
+                if log:
+                    log('{} {}: {}'.format(symbol, kind, results[(symbol, kind)]))
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='allcoin download', description='Bulk download Allcoin market and account data')
+    parser.add_argument('symbols', nargs='+', help='symbols e.g. eth_btc')
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=['klines', 'trades'])
+    parser.add_argument('--kline-type', default='1min')
+    parser.add_argument('--since', type=int, default=0, help='first kline time in ms')
+    parser.add_argument('--output', default='.', help='directory for data files and the checkpoint')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=5.0, help='requests per second across all workers')
+    parser.add_argument('--api-key', default=os.environ.get('ALLCOIN_API_KEY', ''))
+    parser.add_argument('--api-secret', default=os.environ.get('ALLCOIN_API_SECRET', ''))
+    parser.add_argument('--api-url', default=Client.API_URL)
+    args = parser.parse_args(argv)
+
+    if 'order_history' in args.kinds and not (args.api_key and args.api_secret):
+        parser.error('order_history needs --api-key and --api-secret')
+    client = Client(args.api_key, args.api_secret)
+    client.API_URL = args.api_url
+    downloader = Downloader(client, args.output, workers=args.workers, rate=args.rate,
+                            kline_type=args.kline_type, since=args.since)
+    results = downloader.run(args.symbols, args.kinds, log=lambda line: sys.stderr.write(line + '\n'))
+    client.close()
+    return 1 if any(isinstance(r, Exception) for r in results.values()) else 0
@@ -61,3 +61,24 @@ class AllcoinRequestException(Exception):
 
     def __str__(self):
         return 'AllcoinRequestException: %s' % self.message
+
+
+class AllcoinCircuitOpenException(AllcoinRequestException):
+    def __init__(self, path, retry_after):
+        self.path = path
+        self.retry_after = retry_after
+        self.message = 'Circuit open for {}, retry in {:.1f}s'.format(path, retry_after)
+
+    def __str__(self):
+        return 'AllcoinCircuitOpenException: %s' % self.message
+
+
+class AllcoinOrderValidationException(AllcoinRequestException):
+    def __init__(self, code, symbol, field, message):
+        self.code = code
+        self.symbol = symbol
+        self.field = field
+        self.message = message
+
+    def __str__(self):
+        return 'AllcoinOrderValidationException(code=%s): %s' % (self.code, self.message)
@@ -0,0 +1,233 @@
+# coding=utf-8
+"""Columnar export of market and account data to Arrow and Parquet
+
+Requires pyarrow, install with ``pip install python-allcoin[export]``.
+
+.. code:: python
+
+    from allcoin.export import export_trade_history
+
+    rows = export_trade_history(client, 'eth_btc_fills.parquet', 'eth_btc')
+
+"""
+
+from itertools import islice
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = pq = None
+
+# column name, arrow type name, source field (index for klines, key for dict rows)
+COLUMNS = {
+    'klines': [
+        ('time', 'timestamp', 0),
+        ('open', 'float64', 1),
+        ('high', 'float64', 2),
+        ('low', 'float64', 3),
+        ('close', 'float64', 4),
+        ('volume', 'float64', 5),
+    ],
+    'trades': [
+        ('time', 'timestamp', 'date_ms'),
+        ('tid', 'int64', 'tid'),
+        ('price', 'float64', 'price'),
+        ('amount', 'float64', 'amount'),
+        ('type', 'string', 'type'),
+    ],
+    'orders': [
+        ('order_id', 'int64', 'order_id'),
+        ('symbol', 'string', 'symbol'),
+        ('type', 'string', 'type'),
+        ('price', 'float64', 'price'),
+        ('amount', 'float64', 'amount'),
+        ('deal_amount', 'float64', 'deal_amount'),
+        ('avg_price', 'float64', 'avg_price'),
+        ('status', 'int8', 'status'),
+        ('create_date', 'timestamp', 'create_date'),
+    ],
+}
+COLUMNS['trade_history'] = COLUMNS['trades']
+COLUMNS['order_history'] = COLUMNS['orders']
+
+BATCH_SIZE = 10000
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError('pyarrow is required for export, install with pip install python-allcoin[export]')
+
+
+def _arrow_type(name):
+    if name == 'timestamp':
+        return pa.timestamp('ms', tz='UTC')
+    return getattr(pa, name)()
+
+
+def schema(kind):
+    """Arrow schema for an export kind
+
+    :param kind: one of klines, trades, trade_history, orders, order_history
+    :type kind: str
+
+    """
+    _require_pyarrow()
+    return pa.schema([(name, _arrow_type(type_name)) for name, type_name, _ in COLUMNS[kind]])
+
+
+def _column(values, type_name):
+    if type_name == 'timestamp':
+        return pa.array(values).cast(pa.int64()).cast(_arrow_type(type_name))
+    if type_name == 'string':
+        return pa.array(values, pa.string())
+    arr = pa.array(values)
+    # the API mixes numbers and numeric strings, Arrow casts either
+    return arr.cast(_arrow_type(type_name))
+
+
+def to_record_batch(kind, rows):
+    """Convert a list of API rows to an Arrow RecordBatch with the fixed schema for ``kind``
+
+    :param kind: one of klines, trades, trade_history, orders, order_history
+    :type kind: str
+    :param rows: rows as returned by the matching Client method
+    :type rows: list
+
+    """
+    _require_pyarrow()
+    columns = COLUMNS[kind]
+    if kind == 'klines':
+        fields = list(zip(*rows)) if rows else [()] * len(columns)
+        arrays = [_column(list(fields[source]), type_name) for _, type_name, source in columns]
+    else:
+        arrays = [_column([row[source] for row in rows], type_name) for _, type_name, source in columns]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema(kind))
+
+
+class Exporter(object):
+    """Append batches of API rows to a Parquet file or Arrow IPC file
+
+    .. code:: python
+
+        with Exporter('trades.parquet', 'trades') as exporter:
+            exporter.write(client.get_trades('eth_btc'))
+
+    :param path: file to write
+    :param kind: one of klines, trades, trade_history, orders, order_history
+    :param format: parquet or arrow
+    :param compression: parquet compression codec
+
+    """
+
+    def __init__(self, path, kind, format='parquet', compression='zstd'):
+        _require_pyarrow()
+        self.kind = kind
+        self.schema = schema(kind)
+        self.rows = 0
+        if format == 'parquet':
+            self._writer = pq.ParquetWriter(path, self.schema, compression=compression)
+        elif format == 'arrow':
+            self._writer = pa.ipc.new_file(path, self.schema)
+        else:
+            raise ValueError('Unknown export format: {}'.format(format))
+
+    def write(self, rows):
+        """Write a batch of rows, returning the number written"""
+        rows = list(rows)
+        if rows:
+            self._writer.write_batch(to_record_batch(self.kind, rows))
+            self.rows += len(rows)
+        return len(rows)
+
+    def write_iter(self, rows, batch_size=BATCH_SIZE):
+        """Write rows from an iterator in batches so they are never all held in memory"""
+        rows = iter(rows)
+        written = 0
+        while True:
+            count = self.write(islice(rows, batch_size))
+            if not count:
+                return written
+            written += count
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def export_klines(client, path, symbol, kline_type, since, size=1000, **kwargs):
+    """Page through klines from ``since`` writing each page as it arrives
+
+    ``since`` is required, without it the API only returns the latest ``size`` klines
+    so there is nothing to page through.
+
+    :param since: timestamp in ms of the first kline to export
+    :type since: int
+    :returns: number of rows written
+
+    """
+    with Exporter(path, 'klines', **kwargs) as exporter:
+        while True:
+            klines = [k for k in client.get_klines(symbol, kline_type, size=size, since=since) if k[0] >= since]
+            if not exporter.write(klines) or len(klines) < size:
+                return exporter.rows
+            since = int(klines[-1][0]) + 1
+
+
+def _export_by_tid(fetch, path, kind, symbol, since, kwargs):
+    with Exporter(path, kind, **kwargs) as exporter:
+        while True:
+            last = None
+            for batch in _batches(fetch(symbol, since=since)):
+                exporter.write(batch)
+                last = batch[-1]
+            if last is None:
+                return exporter.rows
+            since = int(last['tid']) + 1
+
+
+def _batches(rows, batch_size=BATCH_SIZE):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def export_trades(client, path, symbol, since=None, **kwargs):
+    """Page through public trades from transaction id ``since`` writing each page as it arrives
+
+    :returns: number of rows written
+
+    """
+    return _export_by_tid(client.stream_trades, path, 'trades', symbol, since, kwargs)
+
+
+def export_trade_history(client, path, symbol, since=None, **kwargs):
+    """Page through account trade history from transaction id ``since`` writing each page as it arrives
+
+    :returns: number of rows written
+
+    """
+    return _export_by_tid(client.stream_trade_history, path, 'trade_history', symbol, since, kwargs)
+
+
+def export_order_history(client, path, symbol, order_status, page_length=200, **kwargs):
+    """Page through order history writing each page as it arrives
+
+    :returns: number of rows written
+
+    """
+    with Exporter(path, 'order_history', **kwargs) as exporter:
+        page = 1
+        while True:
+            count = exporter.write_iter(client.stream_order_history(symbol, order_status, page=page, limit=page_length))
+            if count < page_length:
+                return exporter.rows
+            page += 1
@@ -0,0 +1,190 @@
+# coding=utf-8
+
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class LatencyTracker(object):
+    """Rolling window of observed latencies per endpoint"""
+
+    def __init__(self, window=500):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def count(self, key):
+        return len(self._samples[key])
+
+    def percentile(self, key, pct):
+        """Latency at the given percentile (0-100) or None without samples"""
+        with self._lock:
+            samples = sorted(self._samples[key])
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * pct / 100.0))
+        return samples[index]
+
+
+class HedgePolicy(object):
+    """Hedge slow idempotent requests with a duplicate
+
+    If a request has not completed after the configured percentile of recent latency
+    for its endpoint a second identical request is sent and whichever response arrives
+    first is used.  Each request earns ``budget`` hedge tokens, and a hedge spends one,
+    so hedges stay within ``budget`` extra load over time.
+
+    .. code:: python
+
+        policy = HedgePolicy(percentile=95, budget=0.05)
+        client = Client(api_key, api_secret, hedge_policy=policy)
+
+        book = client.get_order_book('eth_btc')
+        print(policy.stats())
+
+    Requests already on the wire cannot be interrupted, a losing request is cancelled if
+    it has not started yet, otherwise its response is closed when it arrives.  When every
+    worker is busy requests are sent on the calling thread without a hedge rather than
+    queueing behind other requests.
+
+    """
+
+    def __init__(self, percentile=95, budget=0.05, min_samples=20, window=500, min_delay=0.0,
+                 burst=10, max_workers=16):
+        """
+        :param percentile: latency percentile after which a hedge is sent
+        :type percentile: float
+        :param budget: maximum extra load from hedges as a fraction of requests
+        :type budget: float
+        :param min_samples: observations per endpoint required before hedging starts
+        :type min_samples: int
+        :param window: number of recent latencies kept per endpoint
+        :type window: int
+        :param min_delay: lower bound in seconds on the hedge delay
+        :type min_delay: float
+        :param burst: maximum hedge tokens that can accumulate
+        :type burst: float
+        :param max_workers: size of the thread pool issuing requests
+        :type max_workers: int
+
+        """
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.burst = burst
+        self.tracker = LatencyTracker(window)
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._tokens = 0.0
+        self.requests = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.hedges_denied = 0
+
+    def delay(self, key):
+        """Seconds to wait before hedging a request for ``key`` or None if not yet known"""
+        if self.tracker.count(key) < self.min_samples:
+            return None
+        return max(self.min_delay, self.tracker.percentile(key, self.percentile))
+
+    def _take_token(self):
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.hedges_sent += 1
+                return True
+            self.hedges_denied += 1
+            return False
+
+    def _timed(self, key, send, args, kwargs, start=None):
+        # latency is measured from submission so time queued for a worker counts
+        start = time.time() if start is None else start
+        response = send(*args, **kwargs)
+        self.tracker.record(key, time.time() - start)
+        return response
+
+    def _submit(self, key, send, args, kwargs):
+        """Run the request on a free worker, or return None when all are busy"""
+        with self._lock:
+            if self._busy >= self.max_workers:
+                return None
+            self._busy += 1
+        future = self._executor.submit(self._timed, key, send, args, kwargs, time.time())
+        future.add_done_callback(self._release_worker)
+        return future
+
+    def _release_worker(self, future):
+        with self._lock:
+            self._busy -= 1
+
+    @staticmethod
+    def _close_response(future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        close = getattr(future.result(), 'close', None)
+        if close is not None:
+            close()
+
+    def request(self, key, send, *args, **kwargs):
+        """Call ``send(*args, **kwargs)``, hedging it if it runs slow
+
+        :param key: endpoint used to group latency observations
+        :param send: callable performing the request
+
+        """
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self.burst, self._tokens + self.budget)
+
+        delay = self.delay(key)
+        primary = None if delay is None else self._submit(key, send, args, kwargs)
+        if primary is None:
+            return self._timed(key, send, args, kwargs)
+
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_token():
+            return primary.result()
+
+        hedge = self._submit(key, send, args, kwargs)
+        if hedge is None:
+            with self._lock:
+                # return the token, the hedge was never sent
+                self._tokens += 1
+                self.hedges_sent -= 1
+            return primary.result()
+        pending = set([primary, hedge])
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                for other in pending:
+                    if not other.cancel():
+                        other.add_done_callback(self._close_response)
+                if future is hedge:
+                    with self._lock:
+                        self.hedges_won += 1
+                return future.result()
+        raise error
+
+    def stats(self):
+        """Counters describing how hedging has behaved so far"""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedges_sent': self.hedges_sent,
+                'hedges_won': self.hedges_won,
+                'hedges_denied': self.hedges_denied,
+                'hedge_rate': float(self.hedges_sent) / self.requests if self.requests else 0.0,
+                'win_rate': float(self.hedges_won) / self.hedges_sent if self.hedges_sent else 0.0,
+            }
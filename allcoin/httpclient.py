@@ -0,0 +1,162 @@
+# coding=utf-8
+"""Standard library HTTP transport
+
+:class:`HTTPSession` sends requests with :mod:`http.client` so a client can run without
+importing ``requests`` at all, which saves most of the start up time of short lived jobs.
+
+.. code:: python
+
+    client = Client(api_key, api_secret, transport='http.client')
+
+It supports what the client needs, one keep alive connection per host, form encoded
+bodies, timeouts and streamed bodies, and nothing else, no proxies, redirects, cookies or
+retries.  Network failures raise the exceptions in :mod:`allcoin.transport`.
+
+"""
+
+import http.client
+import json
+import socket
+from urllib.parse import urlencode, urlsplit
+
+from .transport import ConnectTimeout, ConnectionError, Timeout
+
+
+class HTTPResponse(object):
+    """The parts of ``requests.Response`` the client uses"""
+
+    request = None
+
+    def __init__(self, raw, connection, stream):
+        self.raw = raw
+        self.status_code = raw.status
+        self.reason = raw.reason
+        self.headers = raw.msg
+        self._connection = connection
+        self._content = None
+        if not stream:
+            self._content = self._read()
+
+    def _read(self, amount=None):
+        try:
+            return self.raw.read(amount)
+        except socket.timeout as e:
+            self._connection.close()
+            raise Timeout(e)
+        except (OSError, http.client.HTTPException) as e:
+            self._connection.close()
+            raise ConnectionError(e)
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = self._read()
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+    def iter_content(self, chunk_size=1):
+        if self._content is not None:
+            for i in range(0, len(self._content), chunk_size):
+                yield self._content[i:i + chunk_size]
+            return
+        while True:
+            chunk = self._read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        if not self.raw.isclosed():
+            # unread body left on the socket would corrupt the next response
+            self.raw.close()
+            self._connection.close()
+
+
+class HTTPSession(object):
+    """Minimal stand in for ``requests.Session`` built on :mod:`http.client`
+
+    Not thread safe, the client keeps one per thread.
+
+    """
+
+    def __init__(self):
+        self.headers = {}
+        self._connections = {}
+
+    def _connection(self, scheme, netloc, timeout):
+        key = (scheme, netloc)
+        connection = self._connections.get(key)
+        if connection is None:
+            if scheme == 'https':
+                connection = http.client.HTTPSConnection(netloc, timeout=timeout)
+            else:
+                connection = http.client.HTTPConnection(netloc, timeout=timeout)
+            self._connections[key] = connection
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection
+
+    def request(self, method, url, params=None, data=None, timeout=None, stream=False, headers=None, **kwargs):
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        query = '&'.join(q for q in (parts.query, urlencode(params) if params else '') if q)
+        if query:
+            path = '{}?{}'.format(path, query)
+        body = urlencode(data) if data else None
+        request_headers = dict(self.headers)
+        if body is not None:
+            request_headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        request_headers.update(headers or {})
+        method = method.upper()
+
+        connection = self._connection(parts.scheme, parts.netloc, timeout)
+        for attempt in (1, 2):
+            reused = connection.sock is not None
+            if not reused:
+                try:
+                    connection.connect()
+                except socket.timeout as e:
+                    connection.close()
+                    raise ConnectTimeout(e)
+                except OSError as e:
+                    connection.close()
+                    raise ConnectionError(e)
+            try:
+                connection.request(method, path, body, request_headers)
+                raw = connection.getresponse()
+                break
+            except socket.timeout as e:
+                connection.close()
+                raise Timeout(e)
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                # the server may have closed an idle keep alive connection, GETs are safe to resend once
+                if reused and attempt == 1 and method == 'GET' and isinstance(
+                        e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)):
+                    continue
+                raise ConnectionError(e)
+        return HTTPResponse(raw, connection, stream)
+
+    def get(self, url, **kwargs):
+        return self.request('get', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('post', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('put', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('delete', url, **kwargs)
+
+    def close(self):
+        for connection in self._connections.values():
+            connection.close()
+        self._connections = {}
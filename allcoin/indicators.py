@@ -0,0 +1,263 @@
+# coding=utf-8
+"""Technical indicators updated incrementally as klines arrive
+
+Each indicator keeps the state of the closed bars and derives its value for the latest
+bar from that state, so a new kline costs O(1) whatever the history length.  Passing a
+kline with the same time as the last one replaces the still forming bar rather than
+adding a bar, and the state only moves forward when a kline with a later time arrives.
+
+.. code:: python
+
+    from allcoin.indicators import ATR, EMA, RSI, BollingerBands, Indicators
+
+    indicators = Indicators(ema=EMA(21), rsi=RSI(14), atr=ATR(14), bands=BollingerBands(20, 2))
+    indicators.seed(client.get_klines('eth_btc', '1min', size=500))
+
+    # every poll, the last kline is the forming bar
+    for kline in client.get_klines('eth_btc', '1min', size=2, since=indicators.time):
+        values = indicators.update(kline)
+
+Klines may be :meth:`Client.get_klines` rows or :class:`allcoin.models.Kline` tuples.
+Values are None until enough bars have been seen.
+
+"""
+
+from collections import deque, namedtuple
+
+TIME, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+Bands = namedtuple('Bands', 'lower middle upper')
+
+
+class Indicator(object):
+    """Base class, subclasses implement ``_value`` for the forming bar and ``_commit`` for a closed one"""
+
+    def __init__(self):
+        self.time = None
+        self.value = None
+        self._last = None
+
+    def _value(self, kline):
+        raise NotImplementedError
+
+    def _commit(self, kline):
+        raise NotImplementedError
+
+    def update(self, kline):
+        """Add a kline, or replace the forming bar if it has the same time, returning the new value"""
+        time = int(kline[TIME])
+        if self.time is not None:
+            if time < self.time:
+                raise ValueError('kline at {} is older than the last at {}'.format(time, self.time))
+            if time > self.time:
+                self._commit(self._last)
+        self.time, self._last = time, kline
+        self.value = self._value(kline)
+        return self.value
+
+    def seed(self, klines):
+        """Initialise from history in one pass, the last kline is treated as forming"""
+        klines = list(klines)
+        if not klines:
+            return self.value
+        if self.time is not None:
+            first = int(klines[0][TIME])
+            if first < self.time:
+                raise ValueError('kline at {} is older than the last at {}'.format(first, self.time))
+            if first > self.time:
+                self._commit(self._last)
+        commit = self._commit
+        for kline in klines[:-1]:
+            commit(kline)
+        self.time = None
+        return self.update(klines[-1])
+
+
+class SMA(Indicator):
+    """Simple moving average of ``field`` over ``period`` bars"""
+
+    def __init__(self, period, field=CLOSE):
+        super(SMA, self).__init__()
+        self.period = period
+        self.field = field
+        self._window = deque(maxlen=period - 1)
+        self._sum = 0.0
+
+    def _value(self, kline):
+        if len(self._window) < self.period - 1:
+            return None
+        return (self._sum + float(kline[self.field])) / self.period
+
+    def _commit(self, kline):
+        if self.period == 1:
+            return
+        if len(self._window) == self._window.maxlen:
+            self._sum -= self._window[0]
+        x = float(kline[self.field])
+        self._window.append(x)
+        self._sum += x
+
+
+class EMA(Indicator):
+    """Exponential moving average seeded with the simple average of the first ``period`` bars"""
+
+    def __init__(self, period, field=CLOSE):
+        super(EMA, self).__init__()
+        self.period = period
+        self.field = field
+        self.alpha = 2.0 / (period + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._ema = None
+
+    def _next(self, x):
+        if self._ema is not None:
+            return self._ema + self.alpha * (x - self._ema)
+        if self._count == self.period - 1:
+            return (self._sum + x) / self.period
+        return None
+
+    def _value(self, kline):
+        return self._next(float(kline[self.field]))
+
+    def _commit(self, kline):
+        x = float(kline[self.field])
+        self._ema = self._next(x)
+        self._count += 1
+        self._sum += x
+
+
+class _Wilder(object):
+    """Wilder smoothing, a simple average of the first ``period`` values then ``(avg * (n - 1) + x) / n``"""
+
+    __slots__ = ('period', 'count', 'total', 'average')
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.total = 0.0
+        self.average = None
+
+    def next(self, x):
+        if self.average is not None:
+            return (self.average * (self.period - 1) + x) / self.period
+        if self.count == self.period - 1:
+            return (self.total + x) / self.period
+        return None
+
+    def commit(self, x):
+        self.average = self.next(x)
+        self.count += 1
+        self.total += x
+
+
+class RSI(Indicator):
+    """Relative strength index with Wilder smoothing over ``period`` bars"""
+
+    def __init__(self, period=14, field=CLOSE):
+        super(RSI, self).__init__()
+        self.period = period
+        self.field = field
+        self._prev = None
+        self._gain = _Wilder(period)
+        self._loss = _Wilder(period)
+
+    def _value(self, kline):
+        if self._prev is None:
+            return None
+        change = float(kline[self.field]) - self._prev
+        gain, loss = self._gain.next(max(change, 0.0)), self._loss.next(max(-change, 0.0))
+        if gain is None:
+            return None
+        if loss == 0:
+            return 100.0 if gain else 50.0
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+    def _commit(self, kline):
+        x = float(kline[self.field])
+        if self._prev is not None:
+            change = x - self._prev
+            self._gain.commit(max(change, 0.0))
+            self._loss.commit(max(-change, 0.0))
+        self._prev = x
+
+
+class ATR(Indicator):
+    """Average true range with Wilder smoothing over ``period`` bars"""
+
+    def __init__(self, period=14):
+        super(ATR, self).__init__()
+        self.period = period
+        self._prev_close = None
+        self._tr = _Wilder(period)
+
+    def _true_range(self, kline):
+        high, low = float(kline[HIGH]), float(kline[LOW])
+        if self._prev_close is None:
+            return high - low
+        return max(high, self._prev_close) - min(low, self._prev_close)
+
+    def _value(self, kline):
+        return self._tr.next(self._true_range(kline))
+
+    def _commit(self, kline):
+        self._tr.commit(self._true_range(kline))
+        self._prev_close = float(kline[CLOSE])
+
+
+class BollingerBands(Indicator):
+    """Simple moving average of ``field`` over ``period`` bars with bands ``k`` population standard deviations either side"""
+
+    def __init__(self, period=20, k=2.0, field=CLOSE):
+        super(BollingerBands, self).__init__()
+        self.period = period
+        self.k = k
+        self.field = field
+        self._window = deque(maxlen=period - 1)
+        self._sum = 0.0
+        self._squares = 0.0
+
+    def _value(self, kline):
+        if len(self._window) < self.period - 1:
+            return None
+        x = float(kline[self.field])
+        mean = (self._sum + x) / self.period
+        variance = max(0.0, (self._squares + x * x) / self.period - mean * mean)
+        width = self.k * variance ** 0.5
+        return Bands(mean - width, mean, mean + width)
+
+    def _commit(self, kline):
+        if self.period == 1:
+            return
+        if len(self._window) == self._window.maxlen:
+            old = self._window[0]
+            self._sum -= old
+            self._squares -= old * old
+        x = float(kline[self.field])
+        self._window.append(x)
+        self._sum += x
+        self._squares += x * x
+
+
+class Indicators(object):
+    """A named set of indicators over one kline series, updated together"""
+
+    def __init__(self, **indicators):
+        self.indicators = indicators
+
+    @property
+    def time(self):
+        """Time of the latest kline, the ``since`` to poll from so the forming bar is refetched"""
+        return next(iter(self.indicators.values())).time if self.indicators else None
+
+    def seed(self, klines):
+        """Initialise every indicator from history, returning a dict of name to value"""
+        klines = list(klines)
+        return dict((name, indicator.seed(klines)) for name, indicator in self.indicators.items())
+
+    def update(self, kline):
+        """Add or correct the latest kline, returning a dict of name to value"""
+        return dict((name, indicator.update(kline)) for name, indicator in self.indicators.items())
+
+    def values(self):
+        return dict((name, indicator.value) for name, indicator in self.indicators.items())
@@ -0,0 +1,197 @@
+# coding=utf-8
+
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .exceptions import AllcoinAPIException, AllcoinRequestException
+
+# order ids per cancel_order request and orders per batch_trade request
+CANCEL_LIMIT = 3
+BATCH_LIMIT = 5
+
+LadderPlan = namedtuple('LadderPlan', 'keep cancel create')
+LadderPlan.__doc__ = """Operations to move the live orders to a desired ladder
+
+keep - order ids already quoting a desired level, cancel - order ids to cancel,
+create - dicts of type, price and amount for batch_orders
+
+"""
+
+
+class LadderManager(object):
+    """Keep a ladder of resting orders for one symbol with as few requests as possible
+
+    A reprice is diffed against the live orders.  Orders already resting at a desired
+    price for the desired amount are left alone, so only levels that moved are cancelled
+    and recreated.  Cancels and creates are sent concurrently, except creates which would
+    cross one of our own orders being cancelled, which wait for the cancels.
+
+    .. code:: python
+
+        ladder = LadderManager(client, 'eth_btc')
+        ladder.refresh()
+
+        result = ladder.apply({
+            'buy': [('0.0501', '10'), ('0.0500', '20')],
+            'sell': [('0.0503', '10'), ('0.0504', '20')],
+        })
+        print(result['created'], result['cancelled'], result['kept'])
+
+    Levels are ``(price, amount)`` pairs, prices should be unique per side.  An order that
+    has partly filled is kept while its remaining amount is within ``amount_tolerance``
+    (a fraction of the desired amount) so small fills do not trigger a requote.
+
+    """
+
+    def __init__(self, client, symbol, amount_tolerance=0.0, max_workers=4):
+        """
+        :param client: Client to send orders with
+        :type client: allcoin.client.Client
+        :param symbol: symbol to quote e.g. eth_btc
+        :type symbol: str
+        :param amount_tolerance: fraction of the desired amount a resting order may differ by and still be kept
+        :type amount_tolerance: float
+        :param max_workers: maximum concurrent requests
+        :type max_workers: int
+
+        """
+        self.client = client
+        self.symbol = symbol
+        self.amount_tolerance = amount_tolerance
+        self.max_workers = max_workers
+        # order id -> dict of type, price and remaining amount
+        self.live = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Replace the live orders with the open orders reported by the exchange"""
+        res = self.client.get_open_orders(self.symbol)
+        live = {}
+        for o in res.get('orders', []):
+            live[str(o['order_id'])] = {
+                'type': o['type'],
+                'price': float(o['price']),
+                'amount': float(o['amount']) - float(o['deal_amount']),
+            }
+        with self._lock:
+            self.live = live
+        return live
+
+    def plan(self, desired):
+        """Diff the desired ladder against the live orders
+
+        :param desired: dict of side to list of (price, amount)
+        :returns: LadderPlan
+
+        """
+        with self._lock:
+            live = dict(self.live)
+        keep, create = [], []
+        for side in ('buy', 'sell'):
+            # live orders on this side by price, oldest first to keep queue position
+            resting = {}
+            for order_id in sorted(live, key=int):
+                order = live[order_id]
+                if order['type'] == side:
+                    resting.setdefault(order['price'], []).append(order_id)
+            for price, amount in desired.get(side, []):
+                candidates = resting.get(float(price), [])
+                match = None
+                for order_id in candidates:
+                    if abs(live[order_id]['amount'] - float(amount)) <= float(amount) * self.amount_tolerance + 1e-12:
+                        match = order_id
+                        break
+                if match is None:
+                    create.append({'type': side, 'price': str(price), 'amount': str(amount)})
+                else:
+                    candidates.remove(match)
+                    keep.append(match)
+        kept = set(keep)
+        cancel = [order_id for order_id in sorted(live, key=int) if order_id not in kept]
+        return LadderPlan(keep, cancel, create)
+
+    def _crosses(self, order, cancel_prices):
+        contra = cancel_prices['sell' if order['type'] == 'buy' else 'buy']
+        price = float(order['price'])
+        if order['type'] == 'buy':
+            return any(p <= price for p in contra)
+        return any(p >= price for p in contra)
+
+    def _cancel(self, order_ids):
+        try:
+            res = self.client.cancel_order(self.symbol, ','.join(order_ids))
+        except (AllcoinAPIException, AllcoinRequestException):
+            return [], list(order_ids)
+        if 'order_id' in res:
+            return list(order_ids), []
+        success = [i for i in res.get('success', '').split(',') if i]
+        return success, [i for i in order_ids if i not in success]
+
+    def _create(self, orders):
+        try:
+            res = self.client.batch_orders(self.symbol, orders)
+        except (AllcoinAPIException, AllcoinRequestException):
+            return [], list(orders)
+        created, failed = [], []
+        for order, info in zip(orders, res.get('order_info', [])):
+            if int(info.get('order_id', -1)) == -1:
+                failed.append(dict(order, error_code=info.get('error_code')))
+            else:
+                created.append((str(info['order_id']), order))
+        return created, failed
+
+    def apply(self, desired):
+        """Move the live orders to the desired ladder
+
+        :param desired: dict of side to list of (price, amount)
+        :returns: dict of kept, cancelled and created order ids plus failed_cancels and failed_creates
+
+        """
+        plan = self.plan(desired)
+        with self._lock:
+            cancel_prices = {'buy': [], 'sell': []}
+            for order_id in plan.cancel:
+                order = self.live[order_id]
+                cancel_prices[order['type']].append(order['price'])
+        now, after = [], []
+        for order in plan.create:
+            (after if self._crosses(order, cancel_prices) else now).append(order)
+
+        cancelled, failed_cancels, created, failed_creates = [], [], [], []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            cancels = [executor.submit(self._cancel, plan.cancel[i:i + CANCEL_LIMIT])
+                       for i in range(0, len(plan.cancel), CANCEL_LIMIT)]
+            creates = [executor.submit(self._create, now[i:i + BATCH_LIMIT]) for i in range(0, len(now), BATCH_LIMIT)]
+            for future in cancels:
+                success, failed = future.result()
+                cancelled.extend(success)
+                failed_cancels.extend(failed)
+            # creates that would have crossed our own resting orders go once those are gone
+            with self._lock:
+                still_resting = {'buy': [], 'sell': []}
+                for order_id in failed_cancels:
+                    order = self.live[order_id]
+                    still_resting[order['type']].append(order['price'])
+            failed_creates.extend(dict(o, error_code='self_cross') for o in after if self._crosses(o, still_resting))
+            after = [o for o in after if not self._crosses(o, still_resting)]
+            creates.extend(executor.submit(self._create, after[i:i + BATCH_LIMIT])
+                           for i in range(0, len(after), BATCH_LIMIT))
+            for future in creates:
+                success, failed = future.result()
+                created.extend(success)
+                failed_creates.extend(failed)
+
+        with self._lock:
+            for order_id in cancelled:
+                self.live.pop(order_id, None)
+            for order_id, order in created:
+                self.live[order_id] = {'type': order['type'], 'price': float(order['price']),
+                                       'amount': float(order['amount'])}
+        return {
+            'kept': plan.keep,
+            'cancelled': cancelled,
+            'created': [order_id for order_id, _ in created],
+            'failed_cancels': failed_cancels,
+            'failed_creates': failed_creates,
+        }
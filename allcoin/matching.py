@@ -0,0 +1,513 @@
+# coding=utf-8
+
+import json
+from collections import defaultdict
+from contextlib import nullcontext
+
+from .exceptions import AllcoinAPIException
+
+ORDER_STATUS_UNFILLED = 0
+ORDER_STATUS_PARTIALLY_FILLED = 1
+ORDER_STATUS_FILLED = 2
+ORDER_STATUS_CANCELLED = 10
+
+KLINE_SECONDS = {
+    '1min': 60, '3min': 180, '5min': 300, '15min': 900, '30min': 1800,
+    '1hour': 3600, '2hour': 7200, '4hour': 14400, '6hour': 21600, '12hour': 43200,
+    '1day': 86400, '3day': 259200, '1week': 604800,
+}
+
+# amounts below this are treated as fully filled to absorb float rounding
+EPSILON = 1e-12
+
+
+class _SimulatedResponse(object):
+    """Minimal stand in for a requests Response so simulated errors raise
+    the same AllcoinAPIException the live client does
+
+    """
+
+    status_code = 200
+    request = None
+
+    def __init__(self, payload):
+        self._payload = payload
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return self._payload
+
+
+def api_error(code):
+    """Build an AllcoinAPIException for the given Allcoin error code
+
+    :param code: Allcoin error code e.g. 10010
+    :type code: int or str
+
+    :returns: AllcoinAPIException
+
+    """
+    return AllcoinAPIException(_SimulatedResponse({'error_code': str(code), 'result': False}))
+
+
+def split_symbol(symbol):
+    """Split a symbol into its base and quote currency
+
+    .. code:: python
+
+        split_symbol('eth_btc')  # ('eth', 'btc')
+
+    """
+    base, _, quote = symbol.partition('_')
+    return base, quote
+
+
+def new_order(order_id, symbol, side, price, amount, create_date):
+    """Order dict in the Allcoin order_info shape"""
+    return {
+        'amount': amount,
+        'avg_price': 0,
+        'create_date': create_date,
+        'deal_amount': 0,
+        'order_id': order_id,
+        'price': price,
+        'status': ORDER_STATUS_UNFILLED,
+        'symbol': symbol,
+        'type': side,
+    }
+
+
+def check_cancellable(order, symbol):
+    """Raise the error the exchange returns when an order can not be cancelled"""
+    if order is None or order['symbol'] != symbol:
+        raise api_error(10009)
+    if order['status'] == ORDER_STATUS_CANCELLED:
+        raise api_error(10027)
+    if order['status'] == ORDER_STATUS_FILLED:
+        raise api_error(10028)
+
+
+class Account(object):
+    """Free and frozen balances with the order accounting shared by the simulators
+
+    Buys reserve quote at the limit price and sells reserve base.  Fills release the
+    reservation, pay at the fill price and take the fee from the currency received.
+
+    """
+
+    def __init__(self, balances=None):
+        self.free = defaultdict(float)
+        self.freezed = defaultdict(float)
+        self.fees = defaultdict(float)
+        self.fills = defaultdict(list)
+        for currency, amount in (balances or {}).items():
+            self.free[currency] = float(amount)
+
+    def reserve(self, symbol, side, price, amount):
+        """Validate an order and freeze the funds it needs
+
+        :returns: price and amount as floats
+        :raises: AllcoinAPIException with the code the exchange would return
+
+        """
+        if side not in ('buy', 'sell'):
+            raise api_error(10008)
+        try:
+            price = float(price)
+            amount = float(amount)
+        except (TypeError, ValueError):
+            raise api_error(10008)
+        if price <= 0:
+            raise api_error(10013)
+        if amount <= 0:
+            raise api_error(10008)
+        base, quote = split_symbol(symbol)
+        if side == 'buy':
+            currency, cost = quote, price * amount
+        else:
+            currency, cost = base, amount
+        if self.free[currency] + EPSILON < cost:
+            raise api_error(10010 if side == 'buy' else 10014)
+        self.free[currency] -= cost
+        self.freezed[currency] += cost
+        return price, amount
+
+    def release(self, order):
+        """Unfreeze the funds held for the unfilled part of an order"""
+        base, quote = split_symbol(order['symbol'])
+        remaining = order['amount'] - order['deal_amount']
+        if order['type'] == 'buy':
+            currency, amount = quote, remaining * order['price']
+        else:
+            currency, amount = base, remaining
+        amount = min(amount, self.freezed[currency])
+        self.freezed[currency] -= amount
+        self.free[currency] += amount
+
+    def settle(self, order, qty, price, fee_rate, time_ms, tid):
+        """Apply a fill to the balances and the order, recording it in ``fills``
+
+        :returns: the fill in the trade_history shape
+
+        """
+        base, quote = split_symbol(order['symbol'])
+        if order['type'] == 'buy':
+            # release the reservation at the limit price, pay at the fill price
+            self.freezed[quote] -= qty * order['price']
+            self.free[quote] += qty * (order['price'] - price)
+            fee = qty * fee_rate
+            self.free[base] += qty - fee
+            self.fees[base] += fee
+        else:
+            self.freezed[base] -= qty
+            fee = qty * price * fee_rate
+            self.free[quote] += qty * price - fee
+            self.fees[quote] += fee
+
+        dealt = order['deal_amount']
+        order['avg_price'] = (order['avg_price'] * dealt + price * qty) / (dealt + qty)
+        order['deal_amount'] = dealt + qty
+        if order['amount'] - order['deal_amount'] <= EPSILON:
+            order['deal_amount'] = order['amount']
+            order['status'] = ORDER_STATUS_FILLED
+        else:
+            order['status'] = ORDER_STATUS_PARTIALLY_FILLED
+
+        fill = {
+            'date': time_ms // 1000,
+            'date_ms': time_ms,
+            'price': price,
+            'amount': qty,
+            'tid': str(tid),
+            'type': order['type'],
+            'order_id': order['order_id'],
+            'fee': fee,
+        }
+        self.fills[order['symbol']].append(fill)
+        return fill
+
+    def funds(self):
+        """Balances in the userinfo funds shape"""
+        currencies = set(self.free) | set(self.freezed)
+        return {
+            'free': dict((c, '{:.8f}'.format(self.free[c])) for c in currencies),
+            'freezed': dict((c, '{:.8f}'.format(self.freezed[c])) for c in currencies),
+        }
+
+
+class MatchingEngine(object):
+    """Simulated matching engine for a single account
+
+    Orders rest until the market trades through them.  Market data is fed in through
+    :meth:`set_book`, :meth:`on_trade` and :meth:`on_bar`; orders which cross the current
+    book when submitted fill immediately as taker, resting orders fill as maker.  Book
+    levels taken by simulated orders stay used up until the next book arrives, so fills
+    against one book never exceed the amounts it shows.
+
+    Order and balance structures match the shapes returned by the Allcoin API so callers
+    can hand them straight back to strategy code.
+
+    """
+
+    def __init__(self, balances=None, maker_fee=0.001, taker_fee=0.002):
+        """
+        :param balances: optional - initial free balances by currency e.g. {'btc': 1.0}
+        :type balances: dict
+        :param maker_fee: fee rate charged on resting fills
+        :type maker_fee: float
+        :param taker_fee: fee rate charged on fills that cross the book
+        :type taker_fee: float
+
+        """
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.account = Account(balances)
+        self.free = self.account.free
+        self.freezed = self.account.freezed
+        self.fees = self.account.fees
+        self.fills = self.account.fills
+        self.orders = {}
+        self._open = defaultdict(list)
+        self._books = {}
+        # amount simulated orders have taken from each level of the current book
+        self._taken = defaultdict(dict)
+        self._next_order_id = 1
+        self._next_tid = 1
+        self.time_ms = 0
+
+    # Market data
+
+    def set_book(self, symbol, bids, asks, ts=None):
+        """Update the reference book for a symbol and fill anything it crosses
+
+        Resting orders fill at their own price up to the amount of the levels crossing
+        them, in the order they were submitted.
+
+        :param bids: list of [price, amount] best first
+        :param asks: list of [price, amount] best first
+
+        """
+        if ts is not None:
+            self.time_ms = ts
+        self._books[symbol] = (bids, asks)
+        self._taken[symbol] = {}
+        for order in list(self._open[symbol]):
+            levels = asks if order['type'] == 'buy' else bids
+            taken = self._take(order, levels, order['amount'] - order['deal_amount'])
+            self._fill(order, sum(qty for _, qty in taken), order['price'], self.maker_fee)
+
+    def get_book(self, symbol):
+        return self._books.get(symbol, ([], []))
+
+    def on_trade(self, symbol, ts, price, amount, side):
+        """Fill resting orders against a print on the trade tape
+
+        A sell print at or below a resting buy (or a buy print at or above a resting sell)
+        fills it up to the printed amount.
+
+        :param side: aggressor side of the print, buy or sell
+
+        """
+        self.time_ms = ts
+        orders = self._open[symbol]
+        if not orders:
+            return
+        remaining = amount
+        for order in list(orders):
+            if remaining <= EPSILON:
+                break
+            if side == 'sell' and order['type'] == 'buy' and price <= order['price']:
+                pass
+            elif side == 'buy' and order['type'] == 'sell' and price >= order['price']:
+                pass
+            else:
+                continue
+            qty = min(remaining, order['amount'] - order['deal_amount'])
+            self._fill(order, qty, order['price'], self.maker_fee)
+            remaining -= qty
+
+    def on_bar(self, symbol, ts, high, low, close, volume=None):
+        """Fill resting orders against a kline
+
+        Buys fill when the bar trades below their price, sells when it trades above.
+        Fills are capped by the bar volume, a bar with no volume fills nothing and
+        ``None`` leaves fills uncapped.
+
+        """
+        self.time_ms = ts
+        liquidity = float('inf') if volume is None else volume
+        orders = self._open[symbol]
+        if orders:
+            remaining = liquidity
+            for order in list(orders):
+                if remaining <= EPSILON:
+                    break
+                if order['type'] == 'buy' and low < order['price']:
+                    pass
+                elif order['type'] == 'sell' and high > order['price']:
+                    pass
+                else:
+                    continue
+                qty = min(remaining, order['amount'] - order['deal_amount'])
+                self._fill(order, qty, order['price'], self.maker_fee)
+                remaining -= qty
+        self._books[symbol] = ([[close, liquidity]], [[close, liquidity]])
+        self._taken[symbol] = {}
+
+    # Orders
+
+    def submit(self, symbol, side, price, amount):
+        """Submit a limit order
+
+        :returns: order dict in the Allcoin order_info shape
+        :raises: AllcoinAPIException with the code the exchange would return
+
+        """
+        price, amount = self.account.reserve(symbol, side, price, amount)
+        order = new_order(self._next_order_id, symbol, side, price, amount, self.time_ms)
+        self._next_order_id += 1
+        self.orders[order['order_id']] = order
+        self._open[symbol].append(order)
+        self._cross(order)
+        return order
+
+    def _cross(self, order):
+        """Take liquidity from the reference book for a newly submitted order"""
+        bids, asks = self._books.get(order['symbol'], ([], []))
+        levels = asks if order['type'] == 'buy' else bids
+        for price, qty in self._take(order, levels, order['amount'] - order['deal_amount']):
+            self._fill(order, qty, price, self.taker_fee)
+
+    def _take(self, order, levels, amount):
+        """Use up to ``amount`` of the levels crossing an order
+
+        :returns: list of (level price, amount taken) best first
+
+        """
+        taken = self._taken[order['symbol']]
+        book_side = 'asks' if order['type'] == 'buy' else 'bids'
+        result = []
+        for level_price, level_amount in levels:
+            if amount <= EPSILON:
+                break
+            if order['type'] == 'buy' and level_price > order['price']:
+                break
+            if order['type'] == 'sell' and level_price < order['price']:
+                break
+            key = (book_side, level_price)
+            qty = min(amount, level_amount - taken.get(key, 0))
+            if qty > EPSILON:
+                taken[key] = taken.get(key, 0) + qty
+                result.append((level_price, qty))
+                amount -= qty
+        return result
+
+    def cancel(self, symbol, order_id):
+        """Cancel an open order
+
+        :raises: AllcoinAPIException 10009 if unknown, 10027 if already cancelled, 10028 if filled
+
+        """
+        order = self.orders.get(int(order_id))
+        check_cancellable(order, symbol)
+        self.account.release(order)
+        order['status'] = ORDER_STATUS_CANCELLED
+        self._open[symbol].remove(order)
+        return order
+
+    def open_orders(self, symbol):
+        return list(self._open[symbol])
+
+    def _fill(self, order, qty, price, fee_rate):
+        if qty <= EPSILON:
+            return
+        self.account.settle(order, qty, price, fee_rate, self.time_ms, self._next_tid)
+        self._next_tid += 1
+        if order['status'] == ORDER_STATUS_FILLED:
+            self._open[order['symbol']].remove(order)
+
+    # Account
+
+    def userinfo(self):
+        """Balances in the Allcoin userinfo shape"""
+        return {
+            'info': {
+                'funds': self.account.funds()
+            },
+            'result': True
+        }
+
+
+class SimulatedTradingMixin(object):
+    """Account and trading endpoints of :class:`allcoin.client.Client` served by ``self.engine``
+
+    Classes using it set ``engine`` to a :class:`MatchingEngine`, and may set
+    ``_engine_lock`` to a lock if they are shared between threads.  ``_before_trade`` is
+    called with the symbol outside the lock before each call that reads or changes orders.
+
+    """
+
+    _engine_lock = nullcontext()
+
+    def _before_trade(self, symbol):
+        pass
+
+    # User information
+
+    def get_userinfo(self):
+        with self._engine_lock:
+            return self.engine.userinfo()
+
+    # Trading Endpoints
+
+    def get_trade_history(self, symbol, since=None):
+        self._before_trade(symbol)
+        with self._engine_lock:
+            fills = self.engine.fills[symbol]
+            if since:
+                fills = [f for f in fills if int(f['tid']) >= int(since)]
+            return [dict(f) for f in fills[-600:]]
+
+    def create_order(self, symbol, side, price, amount):
+        self._before_trade(symbol)
+        with self._engine_lock:
+            order = self.engine.submit(symbol, side, price, amount)
+        return {'order_id': str(order['order_id']), 'result': True}
+
+    def create_buy_order(self, symbol, price, amount):
+        return self.create_order(symbol, 'buy', price, amount)
+
+    def create_sell_order(self, symbol, price, amount):
+        return self.create_order(symbol, 'sell', price, amount)
+
+    def batch_orders(self, symbol, order_data, order_type=None):
+        self._before_trade(symbol)
+        info = []
+        with self._engine_lock:
+            for data in order_data:
+                try:
+                    order = self.engine.submit(symbol, data.get('type', order_type), data['price'], data['amount'])
+                except AllcoinAPIException as e:
+                    info.append({'error_code': int(e.code), 'order_id': -1})
+                else:
+                    info.append({'order_id': order['order_id']})
+        return {'order_info': info, 'result': True}
+
+    def cancel_order(self, symbol, order_id):
+        self._before_trade(symbol)
+        order_ids = str(order_id).split(',')
+        with self._engine_lock:
+            if len(order_ids) == 1:
+                self.engine.cancel(symbol, order_ids[0])
+                return {'order_id': str(order_id), 'result': True}
+            success, error = [], []
+            for oid in order_ids:
+                try:
+                    self.engine.cancel(symbol, oid)
+                except AllcoinAPIException:
+                    error.append(oid)
+                else:
+                    success.append(oid)
+        return {'success': ','.join(success), 'error': ','.join(error)}
+
+    def get_order(self, symbol, order_id):
+        self._before_trade(symbol)
+        with self._engine_lock:
+            if str(order_id) == '-1':
+                orders = self.engine.open_orders(symbol)
+            else:
+                order = self.engine.orders.get(int(order_id))
+                if order is None or order['symbol'] != symbol:
+                    raise api_error(10009)
+                orders = [order]
+            return {'result': True, 'orders': [dict(o) for o in orders]}
+
+    def get_open_orders(self, symbol):
+        return self.get_order(symbol, order_id='-1')
+
+    def get_orders(self, symbol, order_status, order_ids):
+        self._before_trade(symbol)
+        orders = []
+        with self._engine_lock:
+            for oid in str(order_ids).split(','):
+                order = self.engine.orders.get(int(oid))
+                if order is not None and order['symbol'] == symbol:
+                    orders.append(dict(order))
+        return {'result': True, 'orders': orders}
+
+    def get_order_history(self, symbol, order_status, page=1, limit=200):
+        self._before_trade(symbol)
+        with self._engine_lock:
+            if int(order_status) == ORDER_STATUS_UNFILLED:
+                orders = self.engine.open_orders(symbol)
+            else:
+                orders = [o for o in self.engine.orders.values()
+                          if o['symbol'] == symbol and o['status'] in (ORDER_STATUS_FILLED, ORDER_STATUS_CANCELLED)]
+            start = (page - 1) * limit
+            return {
+                'current_page': page,
+                'orders': [dict(o) for o in orders[start:start + limit]],
+                'page_length': limit,
+                'result': True,
+                'total': len(orders)
+            }
@@ -0,0 +1,136 @@
+# coding=utf-8
+"""Compact typed models for API responses
+
+Responses are nested dicts of strings, convenient for one off calls but around 1KB per
+trade or order once held in memory.  The models here are namedtuples with parsed numeric
+fields and no per instance ``__dict__``, so large histories take a fraction of the memory
+and fields are attributes rather than string keys.
+
+Conversion is lazy, the helpers for lists of rows are generators so rows can be converted
+as they stream in without ever holding the dicts.
+
+.. code:: python
+
+    from allcoin import models
+
+    trades = list(models.trades(client.stream_trades('eth_btc')))
+    print(trades[0].price, trades[0].side)
+
+    book = models.order_book(client.get_order_book('eth_btc'))
+    print(book.bids[0].price)
+
+    for order in models.orders(client.get_open_orders('eth_btc')):
+        if order.status is models.OrderStatus.PARTIALLY_FILLED:
+            print(order.order_id, order.remaining)
+
+"""
+
+from collections import namedtuple
+from enum import IntEnum
+
+
+class OrderStatus(IntEnum):
+    UNFILLED = 0
+    PARTIALLY_FILLED = 1
+    FILLED = 2
+    CANCELLED = 10
+
+    @property
+    def is_open(self):
+        return self in (OrderStatus.UNFILLED, OrderStatus.PARTIALLY_FILLED)
+
+
+class Ticker(namedtuple('Ticker', 'date buy sell high low last volume')):
+    __slots__ = ()
+
+    @classmethod
+    def from_api(cls, res):
+        t = res['ticker']
+        return cls(int(res['date']), float(t['buy']), float(t['sell']), float(t['high']), float(t['low']),
+                   float(t['last']), float(t['vol']))
+
+
+class Trade(namedtuple('Trade', 'tid date_ms price amount side')):
+    """Public trade or account fill"""
+    __slots__ = ()
+
+    @classmethod
+    def from_api(cls, row):
+        return cls(int(row['tid']), int(row['date_ms']), float(row['price']), float(row['amount']), row['type'])
+
+
+class Kline(namedtuple('Kline', 'time open high low close volume')):
+    __slots__ = ()
+
+    @classmethod
+    def from_api(cls, row):
+        return cls(int(row[0]), float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5]))
+
+
+class Order(namedtuple('Order', 'order_id symbol side price amount deal_amount avg_price status create_date')):
+    __slots__ = ()
+
+    @classmethod
+    def from_api(cls, row):
+        return cls(int(row['order_id']), row['symbol'], row['type'], float(row['price']), float(row['amount']),
+                   float(row['deal_amount']), float(row['avg_price']), OrderStatus(int(row['status'])),
+                   int(row['create_date']))
+
+    @property
+    def remaining(self):
+        return self.amount - self.deal_amount
+
+
+class BookLevel(namedtuple('BookLevel', 'price amount')):
+    __slots__ = ()
+
+    @classmethod
+    def from_api(cls, row):
+        return cls(float(row[0]), float(row[1]))
+
+
+class Balance(namedtuple('Balance', 'currency free freezed')):
+    __slots__ = ()
+
+    @property
+    def total(self):
+        return self.free + self.freezed
+
+
+OrderBook = namedtuple('OrderBook', 'bids asks')
+
+
+def ticker(res):
+    """:class:`Ticker` from a :meth:`Client.get_ticker` response"""
+    return Ticker.from_api(res)
+
+
+def trades(rows):
+    """Generate :class:`Trade` from get_trades, get_trade_history or their stream_ versions"""
+    return (Trade.from_api(row) for row in rows)
+
+
+def klines(rows):
+    """Generate :class:`Kline` from a :meth:`Client.get_klines` response"""
+    return (Kline.from_api(row) for row in rows)
+
+
+def orders(res):
+    """Generate :class:`Order` from an order response, order history page or list of orders"""
+    if isinstance(res, dict):
+        res = res.get('orders', [])
+    return (Order.from_api(row) for row in res)
+
+
+def order_book(res):
+    """:class:`OrderBook` of :class:`BookLevel` lists, best price first on both sides"""
+    # asks arrive highest first
+    return OrderBook([BookLevel.from_api(row) for row in res['bids']],
+                     [BookLevel.from_api(row) for row in reversed(res['asks'])])
+
+
+def balances(res):
+    """Dict of currency to :class:`Balance` from a :meth:`Client.get_userinfo` response"""
+    funds = res['info']['funds']
+    free, freezed = funds.get('free', {}), funds.get('freezed', {})
+    return dict((c, Balance(c, float(free.get(c, 0)), float(freezed.get(c, 0)))) for c in set(free) | set(freezed))
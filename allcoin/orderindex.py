@@ -0,0 +1,237 @@
+# coding=utf-8
+
+from array import array
+from bisect import bisect_left
+
+SIDES = ('buy', 'sell')
+OPEN_STATUSES = (0, 1)
+
+# orders_info accepts at most 50 ids per request
+ORDERS_INFO_LIMIT = 50
+
+
+class OrderIndex(object):
+    """Compact local index of orders with fast symbol, status, side, time and price queries
+
+    Order fields are held column wise in typed arrays, about 60 bytes an order, with a
+    time sorted index per symbol and side.  :meth:`refresh` keeps the index current from
+    :meth:`Client.get_order_history` and :meth:`Client.get_orders`, only fetching the
+    history pages that can hold completed orders it does not have yet.
+
+    .. code:: python
+
+        index = OrderIndex()
+        index.refresh(client, 'eth_btc')
+
+        filled_sells = index.query('eth_btc', status=Client.ORDER_STATUS_FILLED, side='sell',
+                                   start=1517875200000, end=1517961600000)
+
+    """
+
+    def __init__(self):
+        self.order_id = array('q')
+        self.create_date = array('q')
+        self.price = array('d')
+        self.amount = array('d')
+        self.deal_amount = array('d')
+        self.avg_price = array('d')
+        self.status = array('b')
+        self.side = array('b')
+        self.symbol = array('H')
+        self.symbols = []
+        self._symbol_ids = {}
+        self._rows = {}
+        # (symbol id, side) -> parallel sorted lists of create_date and row
+        self._times = {}
+
+    def __len__(self):
+        return len(self.order_id)
+
+    def _symbol_id(self, symbol):
+        try:
+            return self._symbol_ids[symbol]
+        except KeyError:
+            self.symbols.append(symbol)
+            symbol_id = self._symbol_ids[symbol] = len(self.symbols) - 1
+            return symbol_id
+
+    def update(self, orders):
+        """Insert new orders and reconcile changes to known ones
+
+        :param orders: orders in the API order format
+        :returns: number of orders added or changed
+
+        """
+        changed = 0
+        for o in orders:
+            order_id = int(o['order_id'])
+            row = self._rows.get(order_id)
+            status = int(o['status'])
+            deal_amount = float(o['deal_amount'])
+            avg_price = float(o['avg_price'])
+            if row is not None:
+                if (self.status[row] != status or self.deal_amount[row] != deal_amount or
+                        self.avg_price[row] != avg_price):
+                    self.status[row] = status
+                    self.deal_amount[row] = deal_amount
+                    self.avg_price[row] = avg_price
+                    changed += 1
+                continue
+
+            row = len(self.order_id)
+            symbol_id = self._symbol_id(o['symbol'])
+            side = SIDES.index(o['type'])
+            create_date = int(o['create_date'])
+            self.order_id.append(order_id)
+            self.create_date.append(create_date)
+            self.price.append(float(o['price']))
+            self.amount.append(float(o['amount']))
+            self.deal_amount.append(deal_amount)
+            self.avg_price.append(avg_price)
+            self.status.append(status)
+            self.side.append(side)
+            self.symbol.append(symbol_id)
+            self._rows[order_id] = row
+            times, rows = self._times.setdefault((symbol_id, side), ([], []))
+            if not times or create_date >= times[-1]:
+                times.append(create_date)
+                rows.append(row)
+            else:
+                i = bisect_left(times, create_date)
+                times.insert(i, create_date)
+                rows.insert(i, row)
+            changed += 1
+        return changed
+
+    def order(self, order_id):
+        """Order by id in the API order format or None"""
+        row = self._rows.get(int(order_id))
+        return None if row is None else self._order(row)
+
+    def _order(self, row):
+        return {
+            'amount': self.amount[row],
+            'avg_price': self.avg_price[row],
+            'create_date': self.create_date[row],
+            'deal_amount': self.deal_amount[row],
+            'order_id': self.order_id[row],
+            'price': self.price[row],
+            'status': self.status[row],
+            'symbol': self.symbols[self.symbol[row]],
+            'type': SIDES[self.side[row]],
+        }
+
+    def query_rows(self, symbol=None, status=None, side=None, start=None, end=None, min_price=None, max_price=None):
+        """Row numbers matching the query in create date order per symbol and side"""
+        if symbol is None:
+            symbol_ids = range(len(self.symbols))
+        elif symbol in self._symbol_ids:
+            symbol_ids = [self._symbol_ids[symbol]]
+        else:
+            return []
+        sides = range(len(SIDES)) if side is None else [SIDES.index(side)]
+        if status is None:
+            statuses = None
+        elif isinstance(status, int):
+            statuses = (status,)
+        else:
+            statuses = tuple(status)
+
+        price = self.price
+        order_status = self.status
+        result = []
+        for symbol_id in symbol_ids:
+            for side_id in sides:
+                try:
+                    times, rows = self._times[(symbol_id, side_id)]
+                except KeyError:
+                    continue
+                lo = bisect_left(times, start) if start is not None else 0
+                hi = bisect_left(times, end) if end is not None else len(times)
+                candidates = rows[lo:hi]
+                if statuses is not None:
+                    candidates = [r for r in candidates if order_status[r] in statuses]
+                if min_price is not None:
+                    candidates = [r for r in candidates if price[r] >= min_price]
+                if max_price is not None:
+                    candidates = [r for r in candidates if price[r] <= max_price]
+                result.extend(candidates)
+        return result
+
+    def query(self, symbol=None, status=None, side=None, start=None, end=None, min_price=None, max_price=None):
+        """Orders matching all the given filters
+
+        :param symbol: optional - symbol e.g. eth_btc
+        :param status: optional - ORDER_STATUS value or list of values
+        :param side: optional - buy or sell
+        :param start: optional - first create date in ms (inclusive)
+        :param end: optional - last create date in ms (exclusive)
+        :param min_price: optional - lowest price (inclusive)
+        :param max_price: optional - highest price (inclusive)
+        :returns: list of orders in the API order format
+
+        """
+        return [self._order(r) for r in self.query_rows(symbol, status, side, start, end, min_price, max_price)]
+
+    def open_order_ids(self, symbol):
+        return [self.order_id[r] for r in self.query_rows(symbol, status=OPEN_STATUSES)]
+
+    def _history_page(self, client, symbol, order_status, page, page_length):
+        res = client.get_order_history(symbol, order_status, page=page, limit=page_length)
+        if isinstance(res, list):
+            res = res[0] if res else {}
+        return res.get('orders', []), res.get('total')
+
+    def refresh(self, client, symbol, page_length=200):
+        """Bring the index up to date for a symbol
+
+        Fetches every page of open orders, then completed orders until the history's
+        ``total`` is accounted for.  Order history is listed oldest first, so completed
+        orders are read from the page where the known ones end and earlier pages are only
+        fetched if new orders are still missing.  Orders the index still has as open that
+        were in neither are fetched by id to pick up their final state.
+
+        :returns: number of orders added or changed
+
+        """
+        changed = 0
+        seen = set()
+        page = 1
+        while True:
+            orders, _ = self._history_page(client, symbol, 0, page, page_length)
+            seen.update(int(o['order_id']) for o in orders)
+            changed += self.update(orders)
+            if len(orders) < page_length:
+                break
+            page += 1
+
+        completed = set(self.order_id[r] for r in self.query_rows(symbol)
+                        if self.status[r] not in OPEN_STATUSES)
+        known = len(completed)
+        start = known // page_length + 1
+        pages = [start]
+        found = 0
+        while pages:
+            page = pages.pop(0)
+            orders, total = self._history_page(client, symbol, 1, page, page_length)
+            ids = [int(o['order_id']) for o in orders]
+            seen.update(ids)
+            found += len(set(ids) - completed)
+            completed.update(ids)
+            changed += self.update(orders)
+            if total is None:
+                # without a total read forward to the last page
+                if len(orders) == page_length:
+                    pages.append(page + 1)
+                continue
+            if found >= total - known:
+                break
+            if page == start:
+                last = -(-total // page_length)
+                pages = list(range(start + 1, last + 1)) + list(range(start - 1, 0, -1))
+
+        stale = [str(order_id) for order_id in self.open_order_ids(symbol) if order_id not in seen]
+        for i in range(0, len(stale), ORDERS_INFO_LIMIT):
+            res = client.get_orders(symbol, 1, ','.join(stale[i:i + ORDERS_INFO_LIMIT]))
+            changed += self.update(res.get('orders', []))
+        return changed
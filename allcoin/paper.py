@@ -0,0 +1,96 @@
+# coding=utf-8
+
+import threading
+import time
+
+from .client import Client
+from .matching import MatchingEngine, SimulatedTradingMixin
+
+
+class PaperClient(SimulatedTradingMixin, Client):
+    """Client trading against live market data with a simulated account
+
+    Market data calls go to the exchange as usual, while orders, cancels, order queries,
+    trade history and balances are served by an in-process :class:`MatchingEngine` with
+    the same response shapes and error codes as the API.  No signed request is ever sent,
+    so API keys are optional.
+
+    Every full order book fetched is fed to the engine, filling orders it crosses, and
+    every print on the trade tape since the previous :meth:`get_trades` fills resting
+    orders it trades through.  Orders crossing the book when created fill as taker
+    against it, the book being refreshed first if it is older than ``book_max_age``.
+
+    .. code:: python
+
+        client = PaperClient(balances={'btc': 1.0})
+        client.create_buy_order('eth_btc', '0.05', '2')
+
+        # polling market data moves the simulation on
+        client.get_order_book('eth_btc')
+        client.get_trades('eth_btc')
+        print(client.get_open_orders('eth_btc'))
+
+    Call :meth:`sync` for symbols a strategy trades without polling their data itself.
+
+    """
+
+    def __init__(self, api_key='', api_secret='', balances=None, maker_fee=0.001, taker_fee=0.002,
+                 book_max_age=1.0, **kwargs):
+        """
+        :param balances: optional - initial free balances by currency e.g. {'btc': 1.0}
+        :type balances: dict
+        :param maker_fee: fee rate for resting fills
+        :type maker_fee: float
+        :param taker_fee: fee rate for fills crossing the book
+        :type taker_fee: float
+        :param book_max_age: seconds a fetched book is trusted for before an order refreshes it
+        :type book_max_age: float
+
+        Other keyword arguments are passed to :class:`Client`.
+
+        """
+        super(PaperClient, self).__init__(api_key, api_secret, **kwargs)
+        self.engine = MatchingEngine(balances, maker_fee=maker_fee, taker_fee=taker_fee)
+        self.book_max_age = book_max_age
+        self._engine_lock = threading.RLock()
+        self._book_times = {}
+        self._last_tids = {}
+
+    def _before_trade(self, symbol):
+        if time.time() - self._book_times.get(symbol, 0) > self.book_max_age:
+            self.get_order_book(symbol)
+        with self._engine_lock:
+            self.engine.time_ms = int(time.time() * 1000)
+
+    def sync(self, symbol):
+        """Fetch the book and new trades for a symbol and fill simulated orders against them"""
+        self.get_order_book(symbol)
+        self.get_trades(symbol)
+
+    # Exchange Endpoints
+
+    def get_order_book(self, symbol, size=None, merge=None):
+        res = super(PaperClient, self).get_order_book(symbol, size=size, merge=merge)
+        # merged levels round prices away from the spread, only real levels are matched against
+        if not merge or float(merge) == 1:
+            bids = [[float(p), float(a)] for p, a in res.get('bids', [])]
+            asks = [[float(p), float(a)] for p, a in reversed(res.get('asks', []))]
+            with self._engine_lock:
+                self.engine.set_book(symbol, bids, asks, int(time.time() * 1000))
+                self._book_times[symbol] = time.time()
+        return res
+
+    def get_trades(self, symbol, since=None):
+        res = super(PaperClient, self).get_trades(symbol, since=since)
+        if not res:
+            return res
+        with self._engine_lock:
+            last = self._last_tids.get(symbol)
+            # the first fetch only marks the tape, earlier prints predate any simulated order
+            if last is not None:
+                for trade in res:
+                    if int(trade['tid']) > last:
+                        self.engine.on_trade(symbol, int(trade['date_ms']), float(trade['price']),
+                                             float(trade['amount']), trade['type'])
+            self._last_tids[symbol] = max([last or 0] + [int(t['tid']) for t in res])
+        return res
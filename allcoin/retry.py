@@ -0,0 +1,211 @@
+# coding=utf-8
+
+import random
+import threading
+import time
+
+from .exceptions import AllcoinAPIException, AllcoinCircuitOpenException
+from .transport import ambiguous_errors, connect_timeouts
+
+# error codes where the request was rejected before doing anything, safe to resend anywhere
+RETRYABLE_CODES = frozenset(['10001', '10030'])
+# error codes where the outcome is unknown, only resent for idempotent endpoints
+TRANSIENT_CODES = frozenset(['10002', '10016', '10026'])
+# error codes meaning the exchange is unavailable and the breaker should open straight away
+OUTAGE_CODES = frozenset(['10030'])
+
+# endpoints which change state on every call so must not be resent after an ambiguous failure
+NON_IDEMPOTENT_PATHS = frozenset(['trade', 'batch_trade'])
+
+FAIL = 'fail'
+RETRY = 'retry'
+OUTAGE = 'outage'
+
+
+def classify(exc, idempotent=True):
+    """Decide how to handle an exception raised by a request
+
+    :param exc: exception raised by the request
+    :param idempotent: whether the request can be resent when its outcome is unknown
+
+    :returns: one of FAIL, RETRY or OUTAGE
+
+    """
+    if isinstance(exc, AllcoinAPIException):
+        code = str(exc.code)
+        if code in OUTAGE_CODES:
+            return OUTAGE
+        if code in RETRYABLE_CODES:
+            return RETRY
+        if code in TRANSIENT_CODES:
+            return RETRY if idempotent else FAIL
+        if not code and (exc.status_code == 429 or exc.status_code >= 500):
+            return RETRY if idempotent or exc.status_code in (429, 503) else FAIL
+        return FAIL
+    if isinstance(exc, connect_timeouts()):
+        # the connection was never made so the request can not have reached the exchange
+        return RETRY
+    if isinstance(exc, ambiguous_errors()):
+        return RETRY if idempotent else FAIL
+    return FAIL
+
+
+def is_failure(exc):
+    """Whether an exception indicates the endpoint is unhealthy rather than the request being bad"""
+    if isinstance(exc, AllcoinAPIException):
+        code = str(exc.code)
+        if code:
+            # rate limits mean we are too busy, not that the exchange is down
+            return code in TRANSIENT_CODES or code in OUTAGE_CODES
+        return exc.status_code == 429 or exc.status_code >= 500
+    return True
+
+
+class CircuitBreaker(object):
+    """Opens after consecutive failures so callers fail fast rather than waiting on timeouts
+
+    closed - requests flow, open - requests are rejected until ``reset_timeout`` passes,
+    half_open - a single trial request decides whether to close or open again.
+
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_request(self, path):
+        """Raise AllcoinCircuitOpenException if the request should not be sent"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self.opened_at + self.reset_timeout - time.time()
+            if self.state == self.OPEN and remaining > 0:
+                raise AllcoinCircuitOpenException(path, remaining)
+            if self._trial:
+                raise AllcoinCircuitOpenException(path, 0)
+            self.state = self.HALF_OPEN
+            self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial = False
+
+    def record_failure(self, outage=False):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if outage or self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.time()
+
+
+class RetryPolicy(object):
+    """Retry transient failures with jittered backoff and a circuit breaker per endpoint
+
+    .. code:: python
+
+        policy = RetryPolicy(max_attempts=4, backoff=0.2)
+        client = Client(api_key, api_secret, retry_policy=policy)
+
+    Rate limits (10001) are always retried.  System errors, timeouts and connection
+    errors are only retried for endpoints that are safe to resend, order creation is
+    never resent after an ambiguous failure.  Maintenance (10030) opens the breaker
+    immediately.  Each request earns ``budget`` retry tokens, and a retry spends one, so
+    retries stay within ``budget`` extra load over time.
+
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.1, max_backoff=2.0, budget=0.2, burst=10,
+                 failure_threshold=5, reset_timeout=30.0):
+        """
+        :param max_attempts: total attempts per request including the first
+        :type max_attempts: int
+        :param backoff: base backoff in seconds, doubled on each attempt
+        :type backoff: float
+        :param max_backoff: maximum backoff in seconds
+        :type max_backoff: float
+        :param budget: maximum extra load from retries as a fraction of requests
+        :type budget: float
+        :param burst: maximum retry tokens that can accumulate
+        :type burst: float
+        :param failure_threshold: consecutive failures which open an endpoint's breaker
+        :type failure_threshold: int
+        :param reset_timeout: seconds an open breaker waits before allowing a trial request
+        :type reset_timeout: float
+
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers = {}
+        self._tokens = float(burst)
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.retries_denied = 0
+
+    def breaker(self, path):
+        with self._lock:
+            try:
+                return self.breakers[path]
+            except KeyError:
+                breaker = self.breakers[path] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                return breaker
+
+    def _take_token(self):
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.retries += 1
+                return True
+            self.retries_denied += 1
+            return False
+
+    def _sleep(self, attempt):
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt))))
+
+    def call(self, path, send):
+        """Call ``send()`` for the endpoint ``path`` applying the retry policy
+
+        :raises: AllcoinCircuitOpenException if the endpoint's breaker is open, otherwise the
+            last exception raised by ``send``
+
+        """
+        breaker = self.breaker(path)
+        idempotent = path not in NON_IDEMPOTENT_PATHS
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.budget)
+
+        attempt = 0
+        while True:
+            breaker.before_request(path)
+            try:
+                result = send()
+            except Exception as e:
+                action = classify(e, idempotent)
+                if is_failure(e):
+                    breaker.record_failure(outage=action == OUTAGE)
+                else:
+                    # permanent errors show the endpoint is up and answering
+                    breaker.record_success()
+                attempt += 1
+                if action != RETRY or attempt >= self.max_attempts or not self._take_token():
+                    raise
+                self._sleep(attempt)
+            else:
+                breaker.record_success()
+                return result
@@ -0,0 +1,131 @@
+# coding=utf-8
+
+import threading
+import time
+from collections import deque
+
+# priority classes, lower is more urgent
+CANCEL = 0
+CREATE = 1
+ACCOUNT = 2
+MARKET = 3
+CLASSES = (CANCEL, CREATE, ACCOUNT, MARKET)
+CLASS_NAMES = ('cancel', 'create', 'account', 'market')
+
+PATH_CLASSES = {
+    'cancel_order': CANCEL,
+    'trade': CREATE,
+    'batch_trade': CREATE,
+    'userinfo': ACCOUNT,
+    'order_info': ACCOUNT,
+    'orders_info': ACCOUNT,
+    'order_history': ACCOUNT,
+    'trade_history': ACCOUNT,
+}
+
+
+def classify_path(path):
+    """Priority class for an API path, anything unknown is market data"""
+    return PATH_CLASSES.get(path, MARKET)
+
+
+class RequestScheduler(object):
+    """Share a request rate budget between priority classes
+
+    Requests wait for a token from a bucket refilled at ``rate`` per second.  A waiting
+    request is only dispatched when no more urgent request is waiting, so cancels go ahead
+    of creates, creates ahead of account queries and account queries ahead of market data,
+    however long the lower classes have queued.  ``reserved`` tokens are held back for
+    each class from everything less urgent, so market data polling can never drain the
+    bucket below what cancels and creates need.  Classes with a ``deadlines`` entry are
+    sent once they have waited that long even if the bucket is empty, borrowing against
+    future tokens, so urgent work has bounded latency.
+
+    .. code:: python
+
+        scheduler = RequestScheduler(rate=10, reserved={CANCEL: 2, CREATE: 2})
+        client = Client(api_key, api_secret, scheduler=scheduler)
+
+        print(scheduler.stats())
+
+    """
+
+    def __init__(self, rate=10.0, burst=None, reserved=None, deadlines=None):
+        """
+        :param rate: requests per second across all classes
+        :type rate: float
+        :param burst: maximum tokens that can accumulate, default one second of rate
+        :type burst: float
+        :param reserved: optional - dict of class to tokens held back from less urgent classes,
+            default 1 each for cancels and creates
+        :type reserved: dict
+        :param deadlines: optional - dict of class to seconds after which it is sent regardless,
+            default 0.5 for cancels and 1 for creates
+        :type deadlines: dict
+
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        reserved = {CANCEL: 1, CREATE: 1} if reserved is None else reserved
+        self.deadlines = {CANCEL: 0.5, CREATE: 1.0} if deadlines is None else dict(deadlines)
+        # tokens a class must leave in the bucket for the more urgent classes
+        self._floor = [sum(reserved.get(c, 0) for c in CLASSES if c < cls) for cls in CLASSES]
+        self._tokens = self.burst
+        self._last = time.time()
+        self._queues = [deque() for _ in CLASSES]
+        self._cond = threading.Condition()
+        self.dispatched = [0] * len(CLASSES)
+        self.forced = [0] * len(CLASSES)
+        self.wait_total = [0.0] * len(CLASSES)
+        self.wait_max = [0.0] * len(CLASSES)
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, cls):
+        """Block until a request of class ``cls`` may be sent, returning seconds waited"""
+        ticket = object()
+        queue = self._queues[cls]
+        start = time.time()
+        deadline = self.deadlines.get(cls)
+        with self._cond:
+            queue.append(ticket)
+            while True:
+                now = time.time()
+                self._refill(now)
+                waited = now - start
+                first = queue[0] is ticket and not any(self._queues[c] for c in CLASSES if c < cls)
+                if first and self._tokens - 1 >= self._floor[cls]:
+                    break
+                if queue[0] is ticket and deadline is not None and waited >= deadline:
+                    self.forced[cls] += 1
+                    break
+                timeout = (self._floor[cls] + 1 - self._tokens) / self.rate if first else None
+                if deadline is not None:
+                    remaining = max(0.0, deadline - waited)
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                self._cond.wait(timeout if timeout is None else max(timeout, 0.001))
+            queue.popleft()
+            self._tokens -= 1
+            self.dispatched[cls] += 1
+            self.wait_total[cls] += waited
+            self.wait_max[cls] = max(self.wait_max[cls], waited)
+            self._cond.notify_all()
+        return waited
+
+    def call(self, path, send):
+        """Schedule ``send`` as a request for ``path`` and return its result"""
+        self.acquire(classify_path(path))
+        return send()
+
+    def stats(self):
+        """Queue depth, dispatched count, deadline dispatches and wait times per class"""
+        with self._cond:
+            return dict((CLASS_NAMES[c], {
+                'queued': len(self._queues[c]),
+                'dispatched': self.dispatched[c],
+                'forced': self.forced[c],
+                'wait_avg': self.wait_total[c] / self.dispatched[c] if self.dispatched[c] else 0.0,
+                'wait_max': self.wait_max[c],
+            }) for c in CLASSES)
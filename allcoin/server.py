@@ -0,0 +1,592 @@
+# coding=utf-8
+"""Simulated Allcoin exchange for integration and load testing
+
+Serves the v1 endpoints used by :class:`allcoin.client.Client` from an in-memory
+exchange with a price-time priority matching engine, MD5 signature checks and
+optional latency and error injection.
+
+.. code:: python
+
+    exchange = SimulatedExchange(latency=0.002, error_rates={10001: 0.01})
+    exchange.add_account('maker', 'maker_secret', {'btc': 10, 'eth': 100})
+    exchange.start()
+
+    client = Client('maker', 'maker_secret')
+    client.API_URL = exchange.api_url
+
+Run standalone with ``python -m allcoin.server --port 8080``.
+
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import deque
+from operator import itemgetter
+from socketserver import ThreadingMixIn
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+from .exceptions import AllcoinAPIException
+from .matching import (
+    Account as _Account, EPSILON, ORDER_STATUS_UNFILLED, ORDER_STATUS_PARTIALLY_FILLED,
+    ORDER_STATUS_FILLED, ORDER_STATUS_CANCELLED, KLINE_SECONDS, api_error, check_cancellable, new_order,
+    split_symbol
+)
+
+SIGNED_ENDPOINTS = (
+    'userinfo', 'trade', 'batch_trade', 'cancel_order', 'order_info', 'orders_info',
+    'order_history', 'trade_history'
+)
+
+# public trades and bars per kline type kept for each symbol
+TRADE_HISTORY = 10000
+KLINE_HISTORY = 2000
+TICKER_WINDOW_MS = 86400 * 1000
+
+
+def generate_signature(params, secret):
+    """MD5 signature matching :meth:`allcoin.client.Client._generate_signature`"""
+    ordered = sorted(((k, v) for k, v in params.items() if k != 'sign'), key=itemgetter(0))
+    ordered.append(('secret_key', secret))
+    query_string = '&'.join(["{}={}".format(k, v) for k, v in ordered])
+    return hashlib.md5(query_string.encode('utf-8')).hexdigest().upper()
+
+
+class Account(_Account):
+
+    def __init__(self, api_key, secret, balances=None):
+        super(Account, self).__init__(balances)
+        self.api_key = api_key
+        self.secret = secret
+
+
+class MarketData(object):
+    """Public trades, rolling 24 hour ticker stats and kline buckets for one symbol
+
+    Everything is updated as trades print so requests never scan the trade history.
+    Trades and bars are capped at ``TRADE_HISTORY`` and ``KLINE_HISTORY``.
+
+    """
+
+    def __init__(self):
+        self.trades = []
+        self.tids = []
+        self.last = None
+        # trades inside the ticker window, plus monotonic queues of their prices
+        self._window = deque()
+        self._highs = deque()
+        self._lows = deque()
+        self.volume = 0.0
+        # kline type -> (bar start times, bars)
+        self._bars = dict((kline_type, ([], [])) for kline_type in KLINE_SECONDS)
+
+    def add(self, trade):
+        ts, price, amount = int(trade['date_ms']), trade['price'], trade['amount']
+        self.trades.append(trade)
+        self.tids.append(int(trade['tid']))
+        if len(self.trades) > 2 * TRADE_HISTORY:
+            del self.trades[:-TRADE_HISTORY]
+            del self.tids[:-TRADE_HISTORY]
+        self.last = price
+
+        self._window.append((ts, price, amount))
+        self.volume += amount
+        while self._highs and self._highs[-1][1] <= price:
+            self._highs.pop()
+        self._highs.append((ts, price))
+        while self._lows and self._lows[-1][1] >= price:
+            self._lows.pop()
+        self._lows.append((ts, price))
+
+        for kline_type, (starts, bars) in self._bars.items():
+            step = KLINE_SECONDS[kline_type] * 1000
+            start = ts - ts % step
+            if starts and starts[-1] == start:
+                bar = bars[-1]
+                bar[2] = max(bar[2], price)
+                bar[3] = min(bar[3], price)
+                bar[4] = price
+                bar[5] += amount
+            else:
+                starts.append(start)
+                bars.append([start, price, price, price, price, amount])
+                if len(bars) > 2 * KLINE_HISTORY:
+                    del starts[:-KLINE_HISTORY]
+                    del bars[:-KLINE_HISTORY]
+
+    def _expire(self, now_ms):
+        cutoff = now_ms - TICKER_WINDOW_MS
+        window = self._window
+        while window and window[0][0] < cutoff:
+            self.volume -= window.popleft()[2]
+        if not window:
+            self.volume = 0.0
+        while self._highs and self._highs[0][0] < cutoff:
+            self._highs.popleft()
+        while self._lows and self._lows[0][0] < cutoff:
+            self._lows.popleft()
+
+    def stats(self, now_ms):
+        """High, low and volume over the 24 hours to ``now_ms``"""
+        self._expire(now_ms)
+        high = self._highs[0][1] if self._highs else None
+        low = self._lows[0][1] if self._lows else None
+        return high, low, self.volume
+
+    def trades_since(self, since, limit):
+        i = bisect_left(self.tids, since)
+        return self.trades[i:i + limit]
+
+    def klines(self, kline_type, since=None, size=None):
+        starts, bars = self._bars[kline_type]
+        if since:
+            # include the bar the since time falls in
+            step = KLINE_SECONDS[kline_type] * 1000
+            i = bisect_left(starts, since - since % step)
+            bars = bars[i:i + size] if size else bars[i:]
+        elif size:
+            bars = bars[-size:]
+        return [list(bar) for bar in bars[-KLINE_HISTORY:]]
+
+
+class OrderBook(object):
+    """Price-time priority limit order book for one symbol
+
+    Each side keeps a sorted list of prices plus a FIFO queue of orders per price.
+
+    """
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.base, self.quote = split_symbol(symbol)
+        # bid prices are stored negated so both sides sort best first
+        self.prices = {'buy': [], 'sell': []}
+        self.levels = {'buy': {}, 'sell': {}}
+        self.market = MarketData()
+        self.open = {}
+
+    def _key(self, side, price):
+        return -price if side == 'buy' else price
+
+    def add(self, order):
+        side = order['type']
+        key = self._key(side, order['price'])
+        level = self.levels[side].get(key)
+        if level is None:
+            level = self.levels[side][key] = deque()
+            insort(self.prices[side], key)
+        level.append(order)
+        self.open[order['order_id']] = order
+
+    def remove(self, order):
+        side = order['type']
+        key = self._key(side, order['price'])
+        level = self.levels[side][key]
+        level.remove(order)
+        if not level:
+            del self.levels[side][key]
+            self.prices[side].remove(key)
+        self.open.pop(order['order_id'], None)
+
+    def depth(self, side, size):
+        levels = []
+        for key in self.prices[side][:size]:
+            amount = sum(o['amount'] - o['deal_amount'] for o in self.levels[side][key])
+            levels.append([abs(key), round(amount, 8)])
+        return levels
+
+
+class Exchange(object):
+    """In-memory exchange state shared by all request handler threads"""
+
+    def __init__(self, maker_fee=0.001, taker_fee=0.002):
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.accounts = {}
+        self.books = {}
+        self.orders = {}
+        self.owners = {}
+        self.lock = threading.Lock()
+        self._next_order_id = 1
+        self._next_tid = 1
+
+    def add_account(self, api_key, secret, balances=None):
+        self.accounts[api_key] = Account(api_key, secret, balances)
+        return self.accounts[api_key]
+
+    def book(self, symbol):
+        try:
+            return self.books[symbol]
+        except KeyError:
+            if '_' not in symbol:
+                raise api_error(10017)
+            book = self.books[symbol] = OrderBook(symbol)
+            return book
+
+    # Trading
+
+    def place(self, account, symbol, side, price, amount):
+        book = self.book(symbol)
+        price, amount = account.reserve(symbol, side, price, amount)
+        order = new_order(self._next_order_id, symbol, side, price, amount, int(time.time() * 1000))
+        self._next_order_id += 1
+        self.orders[order['order_id']] = order
+        self.owners[order['order_id']] = account
+        self._match(book, order, account)
+        if order['status'] in (ORDER_STATUS_UNFILLED, ORDER_STATUS_PARTIALLY_FILLED):
+            book.add(order)
+        return order
+
+    def _match(self, book, taker, taker_account):
+        contra = 'sell' if taker['type'] == 'buy' else 'buy'
+        prices = book.prices[contra]
+        while prices and taker['amount'] - taker['deal_amount'] > EPSILON:
+            key = prices[0]
+            level_price = abs(key)
+            if taker['type'] == 'buy' and level_price > taker['price']:
+                break
+            if taker['type'] == 'sell' and level_price < taker['price']:
+                break
+            maker = book.levels[contra][key][0]
+            qty = min(taker['amount'] - taker['deal_amount'], maker['amount'] - maker['deal_amount'])
+            now_ms = int(time.time() * 1000)
+            self.owners[maker['order_id']].settle(maker, qty, level_price, self.maker_fee, now_ms, self._next_tid)
+            taker_account.settle(taker, qty, level_price, self.taker_fee, now_ms, self._next_tid)
+            if maker['status'] == ORDER_STATUS_FILLED:
+                book.remove(maker)
+            book.market.add({
+                'date': str(now_ms // 1000),
+                'date_ms': str(now_ms),
+                'price': level_price,
+                'amount': qty,
+                'tid': str(self._next_tid),
+                'type': taker['type']
+            })
+            self._next_tid += 1
+
+    def cancel(self, account, symbol, order_id):
+        try:
+            order = self.orders.get(int(order_id))
+        except ValueError:
+            raise api_error(10009)
+        if order is not None and self.owners[order['order_id']] is not account:
+            order = None
+        check_cancellable(order, symbol)
+        self.books[symbol].remove(order)
+        account.release(order)
+        order['status'] = ORDER_STATUS_CANCELLED
+        return order
+
+    def account_orders(self, account, symbol):
+        return [o for oid, o in sorted(self.orders.items())
+                if o['symbol'] == symbol and self.owners[oid] is account]
+
+
+class Handlers(object):
+    """Endpoint implementations, each taking the account (or None) and request params"""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def ticker(self, account, params):
+        book = self.exchange.book(params['symbol'])
+        now = time.time()
+        high, low, volume = book.market.stats(int(now * 1000))
+        bids, asks = book.depth('buy', 1), book.depth('sell', 1)
+        return {
+            'date': str(int(now)),
+            'ticker': {
+                'buy': str(bids[0][0]) if bids else '0',
+                'high': str(high) if high is not None else '0',
+                'last': str(book.market.last) if book.market.last is not None else '0',
+                'low': str(low) if low is not None else '0',
+                'sell': str(asks[0][0]) if asks else '0',
+                'vol': str(volume),
+            }
+        }
+
+    def depth(self, account, params):
+        book = self.exchange.book(params['symbol'])
+        size = min(int(params.get('size', 100)), 100)
+        return {
+            'asks': book.depth('sell', size)[::-1],
+            'bids': book.depth('buy', size),
+        }
+
+    def trades(self, account, params):
+        market = self.exchange.book(params['symbol']).market
+        if 'since' in params:
+            return market.trades_since(int(params['since']), 600)
+        return market.trades[-600:]
+
+    def kline(self, account, params):
+        book = self.exchange.book(params['symbol'])
+        if params.get('type') not in KLINE_SECONDS:
+            raise api_error(10008)
+        size = int(params['size']) if 'size' in params else None
+        return book.market.klines(params['type'], int(params.get('since', 0)), size)
+
+    def userinfo(self, account, params):
+        return {'info': {'funds': account.funds()}, 'result': True}
+
+    def trade(self, account, params):
+        order = self.exchange.place(account, params['symbol'], params.get('type'), params.get('price'), params.get('amount'))
+        return {'order_id': str(order['order_id']), 'result': True}
+
+    def batch_trade(self, account, params):
+        try:
+            order_data = json.loads(params['order_data'])
+        except (KeyError, ValueError):
+            raise api_error(10008)
+        info = []
+        for data in order_data:
+            try:
+                order = self.exchange.place(account, params['symbol'], data.get('type', params.get('type')),
+                                            data.get('price'), data.get('amount'))
+            except AllcoinAPIException as e:
+                info.append({'error_code': e.code, 'order_id': -1})
+            else:
+                info.append({'order_id': order['order_id']})
+        return {'order_info': info, 'result': True}
+
+    def cancel_order(self, account, params):
+        order_ids = params['order_id'].split(',')
+        if len(order_ids) > 3:
+            raise api_error(10008)
+        if len(order_ids) == 1:
+            self.exchange.cancel(account, params['symbol'], order_ids[0])
+            return {'order_id': order_ids[0], 'result': True}
+        success, error = [], []
+        for order_id in order_ids:
+            try:
+                self.exchange.cancel(account, params['symbol'], order_id)
+            except AllcoinAPIException:
+                error.append(order_id)
+            else:
+                success.append(order_id)
+        return {'success': ','.join(success), 'error': ','.join(error)}
+
+    def order_info(self, account, params):
+        symbol = params['symbol']
+        if params['order_id'] == '-1':
+            orders = [o for o in self.exchange.account_orders(account, symbol)
+                      if o['status'] in (ORDER_STATUS_UNFILLED, ORDER_STATUS_PARTIALLY_FILLED)]
+        else:
+            orders = self._lookup(account, symbol, [params['order_id']])
+            if not orders:
+                raise api_error(10009)
+        return {'result': True, 'orders': orders}
+
+    def orders_info(self, account, params):
+        order_ids = params['order_id'].split(',')
+        if len(order_ids) > 50:
+            raise api_error(10008)
+        return {'result': True, 'orders': self._lookup(account, params['symbol'], order_ids)}
+
+    def _lookup(self, account, symbol, order_ids):
+        orders = []
+        for order_id in order_ids:
+            try:
+                order = self.exchange.orders[int(order_id)]
+            except (KeyError, ValueError):
+                continue
+            if order['symbol'] == symbol and self.exchange.owners[order['order_id']] is account:
+                orders.append(dict(order))
+        return orders
+
+    def order_history(self, account, params):
+        open_statuses = (ORDER_STATUS_UNFILLED, ORDER_STATUS_PARTIALLY_FILLED)
+        want_open = params.get('status', '0') == '0'
+        orders = [dict(o) for o in self.exchange.account_orders(account, params['symbol'])
+                  if (o['status'] in open_statuses) == want_open]
+        page = int(params.get('current_page', 1))
+        length = int(params.get('page_length', 200))
+        start = (page - 1) * length
+        return {
+            'current_page': page,
+            'orders': orders[start:start + length],
+            'page_length': length,
+            'result': True,
+            'total': len(orders)
+        }
+
+    def trade_history(self, account, params):
+        fills = account.fills[params['symbol']]
+        if 'since' in params:
+            since = int(params['since'])
+            fills = [f for f in fills if int(f['tid']) >= since]
+        return fills[:600]
+
+
+class _HTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # buffer the response so headers and body leave in one segment
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self.server.simulator.handle(self, url.path, dict(parse_qsl(url.query)))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8')
+        self.server.simulator.handle(self, urlsplit(self.path).path, dict(parse_qsl(body)))
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SimulatedExchange(object):
+    """HTTP front end for :class:`Exchange`
+
+    :param host: interface to bind
+    :param port: port to bind, 0 picks a free port
+    :param latency: seconds of delay per request, or a callable returning the delay
+    :param error_rates: optional - dict of Allcoin error code to probability of injecting it
+    :param seed: optional - random seed for repeatable error injection
+
+    """
+
+    PREFIX = '/api/v1/'
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, error_rates=None, seed=None, exchange=None):
+        self.exchange = exchange or Exchange()
+        self.handlers = Handlers(self.exchange)
+        self.latency = latency
+        self.error_rates = dict(error_rates or {})
+        self._injected = deque()
+        self._random = random.Random(seed)
+        self._count_lock = threading.Lock()
+        self.request_count = 0
+        self._httpd = _HTTPServer((host, port), _RequestHandler)
+        self._httpd.simulator = self
+        self._thread = None
+
+    @property
+    def api_url(self):
+        host, port = self._httpd.server_address[:2]
+        return 'http://{}:{}/api'.format(host, port)
+
+    def add_account(self, api_key, secret, balances=None):
+        return self.exchange.add_account(api_key, secret, balances)
+
+    def inject_error(self, code, count=1):
+        """Return the given error code for the next ``count`` requests"""
+        self._injected.extend([code] * count)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def _delay(self):
+        latency = self.latency() if callable(self.latency) else self.latency
+        if latency:
+            time.sleep(latency)
+
+    def _injected_error(self):
+        try:
+            return self._injected.popleft()
+        except IndexError:
+            pass
+        for code, rate in self.error_rates.items():
+            if self._random.random() < rate:
+                return code
+        return None
+
+    def handle(self, request, path, params):
+        self._delay()
+        with self._count_lock:
+            self.request_count += 1
+        if not path.startswith(self.PREFIX):
+            return request.send_json(404, {'error_code': '10008', 'result': False})
+        endpoint = path[len(self.PREFIX):]
+        handler = getattr(self.handlers, endpoint, None)
+        if handler is None or endpoint.startswith('_'):
+            return request.send_json(404, {'error_code': '10008', 'result': False})
+        code = self._injected_error()
+        if code is not None:
+            return request.send_json(200, {'error_code': str(code), 'result': False})
+        try:
+            with self.exchange.lock:
+                account = self._authenticate(endpoint, params)
+                if 'symbol' not in params and endpoint != 'userinfo':
+                    raise api_error(10000)
+                payload = handler(account, params)
+        except AllcoinAPIException as e:
+            payload = {'error_code': e.code, 'result': False}
+        except KeyError:
+            payload = {'error_code': '10000', 'result': False}
+        except (TypeError, ValueError):
+            payload = {'error_code': '10008', 'result': False}
+        request.send_json(200, payload)
+
+    def _authenticate(self, endpoint, params):
+        if endpoint not in SIGNED_ENDPOINTS:
+            return None
+        if 'api_key' not in params or 'sign' not in params:
+            raise api_error(10000)
+        account = self.exchange.accounts.get(params['api_key'])
+        if account is None:
+            raise api_error(10006)
+        if generate_signature(params, account.secret) != params['sign']:
+            raise api_error(10007)
+        return account
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulated Allcoin exchange')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0, help='seconds of delay per request')
+    parser.add_argument('--error', action='append', default=[], metavar='CODE:RATE',
+                        help='inject an error code at the given rate e.g. 10001:0.01')
+    parser.add_argument('--account', action='append', default=[], metavar='KEY:SECRET:CUR=AMT,...',
+                        help='add an account e.g. key:secret:btc=10,eth=100')
+    args = parser.parse_args(argv)
+
+    error_rates = {}
+    for spec in args.error:
+        code, rate = spec.split(':')
+        error_rates[int(code)] = float(rate)
+    exchange = SimulatedExchange(args.host, args.port, latency=args.latency, error_rates=error_rates)
+    for spec in args.account:
+        api_key, secret, balances = (spec.split(':', 2) + [''])[:3]
+        exchange.add_account(api_key, secret, dict(b.split('=') for b in balances.split(',') if b))
+    print('Serving simulated Allcoin API on {}'.format(exchange.api_url))
+    try:
+        exchange.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+# coding=utf-8
+"""Latest tickers and order books shared between processes through shared memory
+
+One :class:`Poller` process fetches tickers and books and publishes them into a fixed
+layout :mod:`multiprocessing.shared_memory` block.  Any number of reader processes attach
+by name and read the latest snapshot straight from the block, without locks or HTTP
+requests of their own.
+
+.. code:: python
+
+    # poller process
+    shared = SharedMarketData.create('allcoin', ['eth_btc', 'ltc_btc'], depth=20)
+    Poller(client, shared, interval=0.5).run()
+
+    # strategy processes
+    shared = SharedMarketData.attach('allcoin')
+    ticker = shared.ticker('eth_btc')
+    book = shared.order_book('eth_btc')
+
+Each symbol slot is guarded by a sequence number in the style of a seqlock.  The writer
+makes it odd before writing and even afterwards, and a reader retries if the number was
+odd or changed while it read, so readers never see a half written snapshot and never
+block the writer.  There must be a single writer.
+
+"""
+
+import struct
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+MAGIC = 0x414c4331
+HEADER = struct.Struct('<IIII')
+SYMBOL = struct.Struct('<32s')
+# sequence number, then ticker update time in ms, date, buy, sell, high, low, last, vol
+SLOT_HEADER = struct.Struct('<QQQdddddd')
+# book update time in ms, bid and ask level counts
+BOOK_HEADER = struct.Struct('<QII')
+
+
+def _attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    if sys.version_info < (3, 13):
+        # before 3.13 every attaching process registers the block and unlinks it on exit
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+class SharedMarketData(object):
+    """Fixed layout shared memory block of the latest ticker and book per symbol
+
+    Use :meth:`create` in the writer and :meth:`attach` in readers.
+
+    """
+
+    def __init__(self, shm, symbols, depth, owner=False):
+        self.shm = shm
+        self.symbols = list(symbols)
+        self.depth = depth
+        self._owner = owner
+        self._buf = shm.buf
+        self._book = struct.Struct('<{}d'.format(4 * depth))
+        self._slot_size = SLOT_HEADER.size + BOOK_HEADER.size + self._book.size
+        self._base = HEADER.size + SYMBOL.size * len(self.symbols)
+        self._slots = dict((s, self._base + i * self._slot_size) for i, s in enumerate(self.symbols))
+
+    @classmethod
+    def size(cls, symbols, depth):
+        return HEADER.size + len(symbols) * (SYMBOL.size + SLOT_HEADER.size + BOOK_HEADER.size + 32 * depth)
+
+    @classmethod
+    def create(cls, name, symbols, depth=20):
+        """Create the block, the caller becomes its only writer
+
+        :param name: shared memory name readers attach with
+        :param symbols: symbols to hold, fixed for the life of the block
+        :param depth: book levels kept per side
+
+        """
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls.size(symbols, depth))
+        HEADER.pack_into(shm.buf, 0, MAGIC, 1, len(symbols), depth)
+        for i, symbol in enumerate(symbols):
+            SYMBOL.pack_into(shm.buf, HEADER.size + i * SYMBOL.size, symbol.encode('ascii'))
+        return cls(shm, symbols, depth, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to a block created by :meth:`create` in another process"""
+        shm = _attach(name)
+        magic, _, count, depth = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            shm.close()
+            raise ValueError('{} is not an allcoin market data block'.format(name))
+        symbols = [SYMBOL.unpack_from(shm.buf, HEADER.size + i * SYMBOL.size)[0].rstrip(b'\0').decode('ascii')
+                   for i in range(count)]
+        return cls(shm, symbols, depth)
+
+    def close(self):
+        """Detach, the creator also removes the block"""
+        self._buf = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+    # Writer
+
+    def _write(self, offset, write):
+        buf = self._buf
+        seq = struct.unpack_from('<Q', buf, offset)[0] + 1
+        struct.pack_into('<Q', buf, offset, seq)
+        write(buf)
+        struct.pack_into('<Q', buf, offset, seq + 1)
+
+    def publish_ticker(self, symbol, res, now_ms=None):
+        """Publish a :meth:`Client.get_ticker` response"""
+        offset = self._slots[symbol]
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        t = res['ticker']
+        values = (now_ms, int(res['date']), float(t['buy']), float(t['sell']), float(t['high']), float(t['low']),
+                  float(t['last']), float(t['vol']))
+        self._write(offset, lambda buf: struct.pack_into('<QQdddddd', buf, offset + 8, *values))
+
+    def publish_book(self, symbol, res, now_ms=None):
+        """Publish a :meth:`Client.get_order_book` response, keeping ``depth`` levels a side"""
+        offset = self._slots[symbol]
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        bids = res.get('bids', [])[:self.depth]
+        # asks arrive highest first, keep the best ``depth``
+        asks = res.get('asks', [])[-self.depth:][::-1]
+        levels = [0.0] * (4 * self.depth)
+        for i, (price, amount) in enumerate(bids):
+            levels[2 * i], levels[2 * i + 1] = float(price), float(amount)
+        for i, (price, amount) in enumerate(asks):
+            levels[2 * (self.depth + i)], levels[2 * (self.depth + i) + 1] = float(price), float(amount)
+        book_offset = offset + SLOT_HEADER.size
+
+        def write(buf):
+            BOOK_HEADER.pack_into(buf, book_offset, now_ms, len(bids), len(asks))
+            self._book.pack_into(buf, book_offset + BOOK_HEADER.size, *levels)
+
+        self._write(offset, write)
+
+    # Readers
+
+    def _read(self, symbol, read):
+        offset = self._slots[symbol]
+        buf = self._buf
+        while True:
+            before = struct.unpack_from('<Q', buf, offset)[0]
+            if before & 1:
+                # the writer is part way through, let it finish
+                time.sleep(0)
+                continue
+            value = read(buf, offset)
+            if struct.unpack_from('<Q', buf, offset)[0] == before:
+                return value
+
+    def ticker(self, symbol):
+        """Latest ticker in the :meth:`Client.get_ticker` shape plus ``updated`` ms, or None before the first publish"""
+        values = self._read(symbol, lambda buf, offset: SLOT_HEADER.unpack_from(buf, offset))
+        updated, date, buy, sell, high, low, last, vol = values[1:]
+        if not updated:
+            return None
+        return {
+            'date': str(date),
+            'updated': updated,
+            'ticker': {'buy': str(buy), 'high': str(high), 'last': str(last), 'low': str(low), 'sell': str(sell),
+                       'vol': str(vol)},
+        }
+
+    def order_book(self, symbol):
+        """Latest book in the :meth:`Client.get_order_book` shape plus ``updated`` ms, or None before the first publish"""
+        def read(buf, offset):
+            book_offset = offset + SLOT_HEADER.size
+            return BOOK_HEADER.unpack_from(buf, book_offset), self._book.unpack_from(buf, book_offset + BOOK_HEADER.size)
+
+        (updated, bid_count, ask_count), levels = self._read(symbol, read)
+        if not updated:
+            return None
+        depth = self.depth
+        return {
+            'updated': updated,
+            'bids': [[levels[2 * i], levels[2 * i + 1]] for i in range(bid_count)],
+            'asks': [[levels[2 * (depth + i)], levels[2 * (depth + i) + 1]] for i in range(ask_count)][::-1],
+        }
+
+
+class Poller(object):
+    """Fetch tickers and books for every symbol in a block and publish them
+
+    :param client: Client to poll with
+    :param shared: SharedMarketData created by this process
+    :param interval: seconds between polls of each symbol
+
+    """
+
+    def __init__(self, client, shared, interval=1.0):
+        self.client = client
+        self.shared = shared
+        self.interval = interval
+        self.errors = 0
+        self._stop = threading.Event()
+
+    def poll(self):
+        for symbol in self.shared.symbols:
+            try:
+                self.shared.publish_ticker(symbol, self.client.get_ticker(symbol))
+                self.shared.publish_book(symbol, self.client.get_order_book(symbol, size=self.shared.depth))
+            except Exception:
+                # readers keep the last good snapshot and can tell its age from ``updated``
+                self.errors += 1
+
+    def run(self):
+        while not self._stop.is_set():
+            start = time.time()
+            self.poll()
+            self._stop.wait(max(0.0, self.interval - (time.time() - start)))
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,169 @@
+# coding=utf-8
+
+import codecs
+import json
+import re
+
+from .exceptions import AllcoinAPIException, AllcoinRequestException
+from .transport import request_errors
+
+WHITESPACE = ' \t\n\r'
+SEPARATORS = WHITESPACE + ','
+
+
+class _BufferedResponse(object):
+    """Wraps a fully read streamed body so AllcoinAPIException can parse it"""
+
+    def __init__(self, response, text):
+        self.status_code = getattr(response, 'status_code', 200)
+        self.request = getattr(response, 'request', None)
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class JSONArrayStream(object):
+    """Iterate over the elements of a JSON array as the body arrives
+
+    Only the current element and the unparsed tail of the last chunk are held in memory,
+    so rows can be processed while the rest of the response is still downloading.
+
+    .. code:: python
+
+        response = session.get(uri, stream=True)
+        for row in JSONArrayStream(response.iter_content(8192)):
+            print(row)
+
+        # array nested under a key e.g. the orders in an order_history page
+        for order in JSONArrayStream(chunks, key='orders'):
+            print(order)
+
+        # close the connection when stopping early
+        with client.stream_trades('eth_btc') as trades:
+            for trade in trades:
+                if trade['tid'] == last_tid:
+                    break
+
+    The start of the array is located when the stream is created so error responses
+    raise straight away rather than on first iteration.  The response is closed once the
+    array is exhausted, on error, or by :meth:`close`.
+
+    :param chunks: iterable of bytes
+    :param key: optional - object key holding the array, default expects a top level array
+    :param response: optional - response the chunks came from, used for error reporting
+    :raises: AllcoinAPIException for error responses, AllcoinRequestException for invalid or truncated JSON
+        or when the connection fails part way through the body
+
+    """
+
+    # compact once this many characters have been consumed from the front of the buffer
+    COMPACT_SIZE = 65536
+
+    def __init__(self, chunks, key=None, response=None):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._done = False
+        self._response = response
+        self.key = key
+        self._start()
+
+    def _read(self):
+        """Append the next chunk to the buffer, returning False at the end of the body"""
+        if self._eof:
+            return False
+        try:
+            for chunk in self._chunks:
+                if chunk:
+                    self._buf += self._decoder.decode(chunk)
+                    return True
+        except request_errors() as e:
+            self.close()
+            raise AllcoinRequestException('Connection Error: %s' % e)
+        self._buf += self._decoder.decode(b'', final=True)
+        self._eof = True
+        return False
+
+    def close(self):
+        """Stop reading and release the connection back to the pool"""
+        self._done = True
+        if self._response is not None:
+            self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _fail(self):
+        while self._read():
+            pass
+        self.close()
+        text = self._buf
+        try:
+            res = json.loads(text)
+        except ValueError:
+            raise AllcoinRequestException('Invalid Response: %s' % text)
+        if isinstance(res, dict) and 'error_code' in res:
+            raise AllcoinAPIException(_BufferedResponse(self._response, text))
+        raise AllcoinRequestException('Invalid Response: %s' % text)
+
+    def _start(self):
+        if self.key is None:
+            while True:
+                stripped = self._buf.lstrip(WHITESPACE)
+                if stripped:
+                    if stripped[0] != '[':
+                        self._fail()
+                    self._pos = len(self._buf) - len(stripped) + 1
+                    return
+                if not self._read():
+                    self._fail()
+        pattern = re.compile(r'"{}"\s*:\s*\['.format(re.escape(self.key)))
+        while True:
+            match = pattern.search(self._buf)
+            if match:
+                self._pos = match.end()
+                return
+            if not self._read():
+                self._fail()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        while True:
+            buf = self._buf
+            pos = self._pos
+            while pos < len(buf) and buf[pos] in SEPARATORS:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                if buf[pos] == ']':
+                    self.close()
+                    raise StopIteration
+                try:
+                    value, end = self._json.raw_decode(buf, pos)
+                except ValueError:
+                    pass
+                else:
+                    # a number at the very end of the buffer may continue in the next chunk
+                    if end < len(buf) or self._eof:
+                        self._advance(end)
+                        return value
+            if not self._read():
+                self.close()
+                raise AllcoinRequestException('Truncated Response: %s' % self._buf[self._pos:])
+
+    def _advance(self, end):
+        self._pos = end
+        if end >= self.COMPACT_SIZE:
+            self._buf = self._buf[end:]
+            self._pos = 0
@@ -0,0 +1,237 @@
+# coding=utf-8
+
+import itertools
+import json
+import threading
+import time
+
+from .exceptions import AllcoinAPIException
+from .transport import ambiguous_errors
+
+
+class OrderIntent(object):
+    """Locally tagged order so a resubmission can be matched against what landed"""
+
+    __slots__ = ('intent_id', 'symbol', 'side', 'price', 'amount', 'created', 'sent', 'order_id', 'attempts',
+                 'timed_out')
+
+    def __init__(self, intent_id, symbol, side, price, amount):
+        self.intent_id = intent_id
+        self.symbol = symbol
+        self.side = side
+        self.price = price
+        self.amount = amount
+        self.created = time.time()
+        self.sent = None
+        self.order_id = None
+        self.attempts = 0
+        self.timed_out = False
+
+    def send(self):
+        """Record an attempt, remembering when the first one went out"""
+        self.attempts += 1
+        if self.sent is None:
+            self.sent = time.time()
+
+    def matches(self, order, since_ms, tolerance=1e-9):
+        return (
+            order['type'] == self.side and
+            abs(float(order['price']) - float(self.price)) <= tolerance and
+            abs(float(order['amount']) - float(self.amount)) <= tolerance and
+            int(order.get('create_date') or 0) >= since_ms
+        )
+
+
+class SafeOrderSubmitter(object):
+    """Submit orders so a timed out create can be retried without doubling up
+
+    Each order is tagged locally before it is sent.  If the create times out the open
+    orders and the most recent completed orders are fetched, an order matching the
+    intent's symbol, side, price and amount that is not already claimed by another intent
+    is adopted, otherwise the order is sent again.  Where more than one match turns up for
+    an intent that timed out, for example a slow first attempt landing after a retry, the
+    extras created after the intent was first sent are cancelled.
+    Intents with identical parameters in flight at the same time cannot be told apart, so
+    a strategy should not send the same order twice concurrently through one submitter.
+
+    .. code:: python
+
+        submitter = SafeOrderSubmitter(client, timeout=2)
+        order_id = submitter.create_order('eth_btc', 'buy', '0.0123', '10')
+
+    """
+
+    def __init__(self, client, timeout=2.0, max_attempts=3, clock_skew=60.0, cancel_skew=1.0):
+        """
+        :param client: Client to submit orders with
+        :type client: allcoin.client.Client
+        :param timeout: requests timeout in seconds for order submission
+        :type timeout: float
+        :param max_attempts: attempts per order including the first
+        :type max_attempts: int
+        :param clock_skew: seconds of clock difference allowed when matching order create dates
+        :type clock_skew: float
+        :param cancel_skew: seconds before an intent was first sent that a duplicate may be dated
+            and still be cancelled
+        :type cancel_skew: float
+
+        """
+        self.client = client
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.clock_skew = clock_skew
+        self.cancel_skew = cancel_skew
+        self.intents = {}
+        self._claimed = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _intent(self, symbol, side, price, amount):
+        intent = OrderIntent(next(self._ids), symbol, side, price, amount)
+        with self._lock:
+            self.intents[intent.intent_id] = intent
+        return intent
+
+    def _claim(self, intent, order_id):
+        order_id = str(order_id)
+        with self._lock:
+            if order_id in self._claimed:
+                return False
+            self._claimed.add(order_id)
+        intent.order_id = order_id
+        return True
+
+    def _since_ms(self, intents):
+        return int((min(i.created for i in intents) - self.clock_skew) * 1000)
+
+    def _candidates(self, symbol):
+        """Open orders and the first page of completed orders, oldest first"""
+        orders = list(self.client.get_open_orders(symbol).get('orders', []))
+        history = self.client.get_order_history(symbol, 1)
+        if isinstance(history, list):
+            history = history[0] if history else {}
+        orders.extend(history.get('orders', []))
+        orders.sort(key=lambda o: (int(o.get('create_date') or 0), int(o['order_id'])))
+        return orders
+
+    def _reconcile(self, symbol, intents):
+        """Adopt landed orders for unresolved intents and cancel duplicates
+
+        :returns: list of intents still without an order
+
+        """
+        since_ms = self._since_ms(intents)
+        matched = dict((i.intent_id, []) for i in intents)
+        for order in self._candidates(symbol):
+            with self._lock:
+                if str(order['order_id']) in self._claimed:
+                    continue
+            for intent in intents:
+                if intent.matches(order, since_ms):
+                    matched[intent.intent_id].append(order)
+                    break
+
+        missing = []
+        duplicates = []
+        for intent in intents:
+            orders = matched[intent.intent_id]
+            if intent.order_id is None:
+                while orders and not self._claim(intent, orders[0]['order_id']):
+                    orders.pop(0)
+                if intent.order_id is None:
+                    missing.append(intent)
+                    continue
+                orders = orders[1:]
+            if not intent.timed_out:
+                continue
+            # only orders this intent could have created, never an older identical order
+            sent_ms = int((intent.sent - self.cancel_skew) * 1000)
+            duplicates.extend(str(o['order_id']) for o in orders
+                              if int(o.get('create_date') or 0) >= sent_ms and
+                              o['status'] in (self.client.ORDER_STATUS_UNFILLED, self.client.ORDER_STATUS_PARTIALLY_FILLED))
+        self._cancel(symbol, duplicates)
+        return missing
+
+    def _cancel(self, symbol, order_ids):
+        # cancel_order accepts at most 3 ids per request
+        for i in range(0, len(order_ids), 3):
+            try:
+                self.client.cancel_order(symbol, ','.join(order_ids[i:i + 3]))
+            except AllcoinAPIException:
+                pass
+
+    def create_order(self, symbol, side, price, amount):
+        """Create an order, recovering from timeouts without creating duplicates
+
+        :returns: order id of the order which landed
+        :raises: the last ambiguous exception if the order could not be confirmed after max_attempts
+
+        """
+        intent = self._intent(symbol, side, price, amount)
+        params = {
+            'symbol': symbol,
+            'type': side,
+            'price': price,
+            'amount': amount,
+            'requests_params': {'timeout': self.timeout},
+        }
+        while True:
+            intent.send()
+            try:
+                res = self.client._post('trade', data=dict(params), signed=True)
+            except ambiguous_errors():
+                # outcome of the request is unknown, the order may or may not have landed
+                intent.timed_out = True
+                if not self._reconcile(symbol, [intent]):
+                    return intent.order_id
+                if intent.attempts >= self.max_attempts:
+                    raise
+            else:
+                self._claim(intent, res['order_id'])
+                if intent.attempts > 1:
+                    # an earlier attempt may still land after this one
+                    self._reconcile(symbol, [intent])
+                return intent.order_id
+
+    def batch_orders(self, symbol, order_data, order_type=None):
+        """Create a batch of orders, resending only the orders that did not land after a timeout
+
+        :returns: order_info list in the batch_orders response shape, one entry per order_data item
+
+        """
+        intents = [self._intent(symbol, d.get('type', order_type), d['price'], d['amount']) for d in order_data]
+        info = [None] * len(intents)
+        pending = list(range(len(intents)))
+        attempts = 0
+        while pending:
+            attempts += 1
+            batch = [intents[i] for i in pending]
+            for intent in batch:
+                intent.send()
+            params = {
+                'symbol': symbol,
+                'order_data': json.dumps([{'price': i.price, 'amount': i.amount, 'type': i.side} for i in batch],
+                                         separators=(',', ':')),
+                'requests_params': {'timeout': self.timeout},
+            }
+            try:
+                res = self.client._post('batch_trade', data=params, signed=True)
+            except ambiguous_errors():
+                for intent in batch:
+                    intent.timed_out = True
+                missing = self._reconcile(symbol, batch)
+                for i in pending:
+                    if intents[i] not in missing:
+                        info[i] = {'order_id': int(intents[i].order_id)}
+                pending = [i for i in pending if intents[i] in missing]
+                if pending and attempts >= self.max_attempts:
+                    raise
+            else:
+                for i, entry in zip(pending, res['order_info']):
+                    if int(entry.get('order_id', -1)) != -1:
+                        self._claim(intents[i], entry['order_id'])
+                    info[i] = entry
+                if attempts > 1:
+                    self._reconcile(symbol, [intents[i] for i in pending])
+                pending = []
+        return info
@@ -0,0 +1,175 @@
+# coding=utf-8
+
+import threading
+from decimal import Decimal, ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, InvalidOperation
+
+from .exceptions import AllcoinOrderValidationException
+
+
+def _decimals(value):
+    exponent = Decimal(str(value)).normalize().as_tuple().exponent
+    return max(0, -exponent)
+
+
+class SymbolInfo(object):
+    """Trading rules for one symbol
+
+    :param price_decimals: optional - decimal places allowed in the price, unchecked if None
+    :param amount_decimals: optional - decimal places allowed in the amount, unchecked if None
+    :param min_amount: optional - smallest order amount
+    :param max_amount: optional - largest order amount
+    :param price_band: optional - fraction either side of ``reference_price`` the price must be within
+    :param reference_price: optional - price the band is centred on, usually the last trade
+
+    ``seen_price_decimals`` and ``seen_amount_decimals`` are the most decimal places seen in
+    market data.  They are only a lower bound on the real precision so orders are never
+    rounded or rejected with them.
+
+    """
+
+    __slots__ = ('symbol', 'price_decimals', 'amount_decimals', 'min_amount', 'max_amount', 'price_band',
+                 'reference_price', 'seen_price_decimals', 'seen_amount_decimals', '_price_step', '_amount_step')
+
+    def __init__(self, symbol, price_decimals=None, amount_decimals=None, min_amount=None, max_amount=None,
+                 price_band=None, reference_price=None):
+        self.symbol = symbol
+        self.price_decimals = price_decimals
+        self.amount_decimals = amount_decimals
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.price_band = price_band
+        self.reference_price = reference_price
+        self.seen_price_decimals = 0
+        self.seen_amount_decimals = 0
+        self._steps()
+
+    def _steps(self):
+        self._price_step = None if self.price_decimals is None else Decimal(1).scaleb(-self.price_decimals)
+        self._amount_step = None if self.amount_decimals is None else Decimal(1).scaleb(-self.amount_decimals)
+
+    def update(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self._steps()
+
+
+class SymbolRegistry(object):
+    """Symbol rules used to check and normalise orders before they are sent
+
+    Rules come from configuration through :meth:`configure`, and :meth:`learn` centres the
+    price band on the last trade from market data.  Orders failing a rule raise
+    :class:`AllcoinOrderValidationException` with the error code the exchange would have
+    returned, without a request being made.
+
+    .. code:: python
+
+        registry = SymbolRegistry()
+        registry.configure('eth_btc', price_decimals=6, amount_decimals=3, min_amount=0.01, price_band=0.2)
+        registry.learn('eth_btc', ticker=client.get_ticker('eth_btc'))
+
+        client = Client(api_key, api_secret, symbol_registry=registry)
+        client.create_buy_order('eth_btc', '0.0512345', '1.23456')  # sent as 0.051234 and 1.234
+
+    Precision beyond the configured decimal places is rounded away from the spread (buys
+    down, sells up) and amounts down, or rejected with 10008 when ``round`` is False.  With ``strict`` unknown symbols
+    are rejected with 10017, otherwise they are passed through unchecked.
+
+    """
+
+    def __init__(self, round=True, strict=False):
+        self.round = round
+        self.strict = strict
+        self.symbols = {}
+        self._lock = threading.Lock()
+
+    def configure(self, symbol, **rules):
+        """Set rules for a symbol, see :class:`SymbolInfo` for the fields"""
+        with self._lock:
+            info = self.symbols.get(symbol)
+            if info is None:
+                self.symbols[symbol] = SymbolInfo(symbol, **rules)
+            else:
+                info.update(**rules)
+            return self.symbols[symbol]
+
+    def learn(self, symbol, ticker=None, book=None, trades=None):
+        """Record the reference price and the decimal places seen in market data responses
+
+        Learning alone never changes how orders are rounded, configure ``price_decimals``
+        and ``amount_decimals`` for that.
+
+        :param ticker: optional - :meth:`Client.get_ticker` response
+        :param book: optional - :meth:`Client.get_order_book` response
+        :param trades: optional - :meth:`Client.get_trades` response
+
+        """
+        prices, amounts = [], []
+        if book:
+            for price, amount in book.get('bids', []) + book.get('asks', []):
+                prices.append(price)
+                amounts.append(amount)
+        for trade in trades or []:
+            prices.append(trade['price'])
+            amounts.append(trade['amount'])
+        with self._lock:
+            info = self.symbols.get(symbol)
+            if info is None:
+                info = self.symbols[symbol] = SymbolInfo(symbol)
+            if prices:
+                info.seen_price_decimals = max([info.seen_price_decimals] + [_decimals(p) for p in prices])
+            if amounts:
+                info.seen_amount_decimals = max([info.seen_amount_decimals] + [_decimals(a) for a in amounts])
+            if ticker:
+                info.reference_price = float(ticker['ticker']['last']) or info.reference_price
+            elif trades:
+                info.reference_price = float(trades[-1]['price'])
+            return info
+
+    def _quantize(self, info, field, value, step, rounding):
+        try:
+            exact = Decimal(str(value))
+        except InvalidOperation:
+            raise AllcoinOrderValidationException('10008', info.symbol, field, 'Invalid {}: {}'.format(field, value))
+        if not exact.is_finite():
+            raise AllcoinOrderValidationException('10008', info.symbol, field, 'Invalid {}: {}'.format(field, value))
+        if step is None:
+            return exact
+        rounded = exact.quantize(step, rounding=rounding)
+        if rounded != exact and not self.round:
+            raise AllcoinOrderValidationException(
+                '10008', info.symbol, field, '{} {} has more than {} decimal places'.format(
+                    field.capitalize(), value, -step.as_tuple().exponent))
+        return rounded
+
+    def normalize(self, symbol, side, price, amount):
+        """Check an order and round it to the symbol's precision
+
+        :returns: price and amount as strings ready to send
+        :raises: AllcoinOrderValidationException
+
+        """
+        info = self.symbols.get(symbol)
+        if info is None:
+            if self.strict:
+                raise AllcoinOrderValidationException('10017', symbol, 'symbol', 'Unknown symbol {}'.format(symbol))
+            return price, amount
+        if side not in ('buy', 'sell'):
+            raise AllcoinOrderValidationException('10008', symbol, 'type', 'Invalid side: {}'.format(side))
+
+        price = self._quantize(info, 'price', price, info._price_step, ROUND_FLOOR if side == 'buy' else ROUND_CEILING)
+        amount = self._quantize(info, 'amount', amount, info._amount_step, ROUND_DOWN)
+        if price <= 0:
+            raise AllcoinOrderValidationException('10013', symbol, 'price', 'Price must be positive')
+        if info.price_band is not None and info.reference_price:
+            low = info.reference_price * (1 - info.price_band)
+            high = info.reference_price * (1 + info.price_band)
+            if not low <= float(price) <= high:
+                raise AllcoinOrderValidationException(
+                    '10013', symbol, 'price', 'Price {} outside {:.8g} - {:.8g}'.format(price, low, high))
+        if amount <= 0:
+            raise AllcoinOrderValidationException('10008', symbol, 'amount', 'Amount must be positive')
+        if (info.min_amount is not None and float(amount) < info.min_amount or
+                info.max_amount is not None and float(amount) > info.max_amount):
+            raise AllcoinOrderValidationException(
+                '10023', symbol, 'amount', 'Amount {} outside {} - {}'.format(amount, info.min_amount, info.max_amount))
+        return '{:f}'.format(price), '{:f}'.format(amount)
@@ -0,0 +1,180 @@
+# coding=utf-8
+
+import sqlite3
+from itertools import islice
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    symbol TEXT NOT NULL,
+    tid INTEGER NOT NULL,
+    time_ms INTEGER NOT NULL,
+    price REAL NOT NULL,
+    amount REAL NOT NULL,
+    side TEXT NOT NULL,
+    fee REAL NOT NULL,
+    PRIMARY KEY (symbol, tid)
+);
+CREATE INDEX IF NOT EXISTS trades_time ON trades (symbol, time_ms);
+CREATE INDEX IF NOT EXISTS trades_side ON trades (symbol, side, time_ms);
+"""
+
+INSERT_BATCH = 1000
+
+
+class TradeHistorySync(object):
+    """Keep account trade history in a local SQLite database
+
+    Each :meth:`sync` only requests trades after the highest transaction id already stored,
+    so reports read from the local store and do not depend on API latency or rate limits.
+
+    .. code:: python
+
+        store = TradeHistorySync(client, 'fills.db', fee_rate=0.001)
+        store.sync('eth_btc')
+
+        print(store.volume('eth_btc', start=1517443200000))
+        print(store.pnl('eth_btc', mark_price=0.085))
+
+    The API does not report fees on fills so they are estimated from ``fee_rate`` and stored
+    in quote currency alongside each trade.
+
+    """
+
+    def __init__(self, client, path=':memory:', fee_rate=0.0):
+        """
+        :param client: Client used to fetch trade history
+        :type client: allcoin.client.Client
+        :param path: SQLite database file
+        :type path: str
+        :param fee_rate: fee rate used to estimate fees on fills
+        :type fee_rate: float
+
+        """
+        self.client = client
+        self.fee_rate = fee_rate
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def last_tid(self, symbol):
+        """Highest stored transaction id for a symbol or None"""
+        return self.db.execute('SELECT MAX(tid) FROM trades WHERE symbol = ?', (symbol,)).fetchone()[0]
+
+    def _rows(self, symbol, trades):
+        fee_rate = self.fee_rate
+        for t in trades:
+            price = float(t['price'])
+            amount = float(t['amount'])
+            yield (symbol, int(t['tid']), int(t['date_ms']), price, amount, t['type'], price * amount * fee_rate)
+
+    def sync(self, symbol):
+        """Fetch and store trades newer than those already stored
+
+        :returns: number of new trades stored
+
+        """
+        added = 0
+        while True:
+            last = self.last_tid(symbol)
+            since = last + 1 if last is not None else None
+            rows = self._rows(symbol, self.client.stream_trade_history(symbol, since=since))
+            fetched = 0
+            with self.db:
+                while True:
+                    batch = list(islice(rows, INSERT_BATCH))
+                    if not batch:
+                        break
+                    fetched += len(batch)
+                    cursor = self.db.executemany('INSERT OR IGNORE INTO trades VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+                    added += cursor.rowcount
+            if not fetched or self.last_tid(symbol) == last:
+                return added
+
+    def _where(self, symbol, start, end, side):
+        clauses = ['symbol = ?']
+        args = [symbol]
+        if start is not None:
+            clauses.append('time_ms >= ?')
+            args.append(start)
+        if end is not None:
+            clauses.append('time_ms < ?')
+            args.append(end)
+        if side is not None:
+            clauses.append('side = ?')
+            args.append(side)
+        return ' AND '.join(clauses), args
+
+    def trades(self, symbol, start=None, end=None, side=None):
+        """Stored trades in time order in the :meth:`Client.get_trade_history` format
+
+        :param start: optional - first time in ms (inclusive)
+        :param end: optional - last time in ms (exclusive)
+        :param side: optional - buy or sell
+
+        """
+        where, args = self._where(symbol, start, end, side)
+        rows = self.db.execute(
+            'SELECT tid, time_ms, price, amount, side FROM trades WHERE {} ORDER BY time_ms, tid'.format(where), args)
+        return [{
+            'date': time_ms // 1000,
+            'date_ms': time_ms,
+            'price': price,
+            'amount': amount,
+            'tid': str(tid),
+            'type': side,
+        } for tid, time_ms, price, amount, side in rows]
+
+    def volume(self, symbol, start=None, end=None, side=None):
+        """Traded volume as a dict of base and quote amounts and trade count"""
+        where, args = self._where(symbol, start, end, side)
+        count, base, quote = self.db.execute(
+            'SELECT COUNT(*), TOTAL(amount), TOTAL(amount * price) FROM trades WHERE {}'.format(where), args).fetchone()
+        return {'count': count, 'base': base, 'quote': quote}
+
+    def fees(self, symbol, start=None, end=None, side=None):
+        """Estimated fees in quote currency"""
+        where, args = self._where(symbol, start, end, side)
+        return self.db.execute('SELECT TOTAL(fee) FROM trades WHERE {}'.format(where), args).fetchone()[0]
+
+    def pnl(self, symbol, mark_price=None, start=None, end=None):
+        """Average cost profit and loss in quote currency
+
+        The whole history up to ``end`` is replayed so the average cost of a position opened
+        before ``start`` is known, realized PnL and fees only count trades from ``start``.
+
+        :param mark_price: optional - price to value the position held at ``end``
+        :returns: dict of position, average cost, realized, unrealized and fees
+
+        """
+        where, args = self._where(symbol, None, end, None)
+        position = cost = realized = fees = 0.0
+        for time_ms, price, amount, side, fee in self.db.execute(
+                'SELECT time_ms, price, amount, side, fee FROM trades WHERE {} ORDER BY time_ms, tid'.format(where), args):
+            in_window = start is None or time_ms >= start
+            if in_window:
+                fees += fee
+            signed = amount if side == 'buy' else -amount
+            if position == 0 or (position > 0) == (signed > 0):
+                # adding to the position moves the average cost
+                cost = (cost * abs(position) + price * amount) / (abs(position) + amount)
+                position += signed
+                continue
+            closed = min(amount, abs(position))
+            if in_window:
+                realized += closed * (price - cost) * (1 if position > 0 else -1)
+            position += signed
+            if abs(position) < 1e-12:
+                position = cost = 0.0
+            elif (position > 0) == (signed > 0):
+                # flipped through flat, the remainder opens at this price
+                cost = price
+        unrealized = position * (mark_price - cost) if mark_price is not None and position else 0.0
+        return {
+            'position': position,
+            'average_cost': cost,
+            'realized': realized - fees,
+            'unrealized': unrealized,
+            'fees': fees,
+        }
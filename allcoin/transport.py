@@ -0,0 +1,54 @@
+# coding=utf-8
+"""Network errors of the client transports
+
+:class:`ConnectTimeout`, :class:`Timeout` and :class:`ConnectionError` are raised by the
+standard library transport in :mod:`allcoin.httpclient` and mirror the ``requests``
+exceptions of the same names.  :func:`connect_timeouts`, :func:`ambiguous_errors` and
+:func:`request_errors` match the exceptions of both transports without importing
+``requests`` or :mod:`http.client`, so code classifying failures stays cheap to import.
+
+"""
+
+import sys
+
+
+class TransportError(IOError):
+    """Base class for network failures of :class:`allcoin.httpclient.HTTPSession`"""
+
+
+class ConnectionError(TransportError):
+    pass
+
+
+class Timeout(TransportError):
+    pass
+
+
+class ConnectTimeout(ConnectionError, Timeout):
+    """The connection was not made in time, so the request never reached the server"""
+
+
+def _requests_exceptions():
+    # if requests raised the exception it is already imported
+    requests = sys.modules.get('requests')
+    return getattr(requests, 'exceptions', None)
+
+
+def connect_timeouts():
+    """Exception types for connect timeouts, safe to retry on any endpoint"""
+    exceptions = _requests_exceptions()
+    return (ConnectTimeout, exceptions.ConnectTimeout) if exceptions else (ConnectTimeout,)
+
+
+def ambiguous_errors():
+    """Exception types after which a request may or may not have reached the exchange"""
+    exceptions = _requests_exceptions()
+    if exceptions:
+        return Timeout, ConnectionError, exceptions.Timeout, exceptions.ConnectionError
+    return Timeout, ConnectionError
+
+
+def request_errors():
+    """Exception types for any failure of the transport"""
+    exceptions = _requests_exceptions()
+    return (TransportError, exceptions.RequestException) if exceptions else (TransportError,)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""Measure the start up cost of importing allcoin and making a first session
+
+Each case runs in a fresh interpreter, the median wall time over ``--runs`` is reported
+against a bare interpreter as the baseline.
+
+.. code:: bash
+
+    python benchmarks/import_time.py --runs 20
+
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+CASES = [
+    ('python', 'pass'),
+    ('import allcoin', 'import allcoin'),
+    ('import Client', 'from allcoin import Client'),
+    ('session, http.client', "from allcoin import Client; Client('', '', transport='http.client').session"),
+    ('session, requests', "from allcoin import Client; Client('', '').session"),
+]
+
+
+def measure(code, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', code])
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    baseline = None
+    for name, code in CASES:
+        median = measure(code, args.runs)
+        baseline = median if baseline is None else baseline
+        print('{:<24} {:8.1f} ms {:+8.1f} ms'.format(name, median * 1000, (median - baseline) * 1000))
+
+
+if __name__ == '__main__':
+    main()
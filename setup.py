@@ -10,19 +10,25 @@ setup(
     author='Sam McHardy',
     license='MIT',
     author_email='',
+    python_requires='>=3.8',
     install_requires=['requests', ],
+    extras_require={
+        'export': ['pyarrow'],
+    },
+    entry_points={
+        'console_scripts': ['allcoin=allcoin.__main__:main'],
+    },
     keywords='allcoin exchange rest api bitcoin ethereum btc eth qtum cnet ck.usd',
     classifiers=[
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
         'Operating System :: OS Independent',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
         'Programming Language :: Python',
         'Topic :: Software Development :: Libraries :: Python Modules',
     ],
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+from allcoin.client import Client
+from allcoin.server import SimulatedExchange
+import pytest
+
+
+@pytest.fixture
+def accounts():
+    """Balances by API key the exchange fixture opens accounts with, override in a module to change them"""
+    return {'maker': {'btc': 10, 'eth': 100}, 'taker': {'btc': 10, 'eth': 100}}
+
+
+@pytest.fixture
+def exchange_options():
+    """Keyword arguments for the SimulatedExchange, override in a module to change them"""
+    return {}
+
+
+@pytest.fixture
+def exchange(accounts, exchange_options):
+    """Running SimulatedExchange, each account's secret is its API key with _secret appended"""
+    exchange = SimulatedExchange(**exchange_options)
+    for api_key, balances in accounts.items():
+        exchange.add_account(api_key, '{}_secret'.format(api_key), dict(balances))
+    exchange.start()
+    yield exchange
+    exchange.stop()
+
+
+@pytest.fixture
+def exchange_client(exchange):
+    """Factory for clients of an exchange fixture account, extra keyword arguments go to Client"""
+    def make(api_key, **kwargs):
+        client = Client(api_key, '{}_secret'.format(api_key), **kwargs)
+        client.API_URL = exchange.api_url
+        return client
+    return make
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+from allcoin.backtest import BacktestClient, DataStore, KlineSeries, TradeSeries
+from allcoin.exceptions import AllcoinAPIException
+import pytest
+
+
+def _store():
+    klines = [
+        [60000, 0.050, 0.051, 0.049, 0.050, 100],
+        [120000, 0.050, 0.050, 0.047, 0.048, 100],
+        [180000, 0.048, 0.055, 0.048, 0.054, 100],
+    ]
+    store = DataStore()
+    store.add_klines('eth_btc', '1min', KlineSeries.from_klines(klines))
+    return store
+
+
+def test_resting_orders_fill_through_status_transitions():
+    """Test a resting buy fills when the bar trades through it, then a sell"""
+    client = BacktestClient(_store(), balances={'btc': 1.0}, maker_fee=0.001)
+    seen = {}
+
+    def on_bar(c, symbol, kline):
+        if kline[0] == 60000:
+            seen['buy'] = c.create_buy_order(symbol, '0.048', '10')['order_id']
+        elif kline[0] == 120000:
+            order = c.get_order(symbol, seen['buy'])['orders'][0]
+            assert order['status'] == c.ORDER_STATUS_FILLED
+            seen['sell'] = c.create_sell_order(symbol, '0.053', '5')['order_id']
+
+    client.run(on_bar=on_bar)
+
+    sell = client.get_order('eth_btc', seen['sell'])['orders'][0]
+    assert sell['status'] == client.ORDER_STATUS_FILLED
+    funds = client.get_userinfo()['info']['funds']['free']
+    assert float(funds['eth']) == pytest.approx(10 * 0.999 - 5)
+    assert float(funds['btc']) == pytest.approx(1 - 0.48 + 5 * 0.053 * 0.999)
+    assert len(client.get_trade_history('eth_btc')) == 2
+
+
+def test_marketable_order_and_cancel():
+    """Test crossing orders fill as taker and cancel releases frozen funds"""
+    client = BacktestClient(_store(), balances={'btc': 1.0}, taker_fee=0.002)
+    seen = {}
+
+    def on_bar(c, symbol, kline):
+        if kline[0] == 60000:
+            c.create_buy_order(symbol, '0.06', '1')
+            seen['rest'] = c.create_buy_order(symbol, '0.01', '1')['order_id']
+            assert len(c.get_open_orders(symbol)['orders']) == 1
+            c.cancel_order(symbol, seen['rest'])
+
+    client.run(on_bar=on_bar)
+
+    order = client.get_order('eth_btc', seen['rest'])['orders'][0]
+    assert order['status'] == client.ORDER_STATUS_CANCELLED
+    funds = client.get_userinfo()['info']['funds']
+    assert float(funds['freezed']['btc']) == pytest.approx(0)
+    assert float(funds['free']['btc']) == pytest.approx(1 - 0.05)
+    with pytest.raises(AllcoinAPIException):
+        client.cancel_order('eth_btc', seen['rest'])
+
+
+def test_insufficient_funds():
+    """Test orders beyond the balance are rejected like the exchange"""
+    client = BacktestClient(_store(), balances={'btc': 0.01})
+    with pytest.raises(AllcoinAPIException) as e:
+        client.create_buy_order('eth_btc', '0.05', '1')
+    assert e.value.code == '10010'
+
+
+def test_market_data_respects_clock(tmpdir):
+    """Test market data only shows history up to the replay clock"""
+    store = _store()
+    store.add_trades('eth_btc', TradeSeries.from_trades([
+        {'date_ms': 90000, 'price': 0.049, 'amount': 1, 'tid': 1, 'type': 'sell'},
+        {'date_ms': 150000, 'price': 0.050, 'amount': 2, 'tid': 2, 'type': 'buy'},
+    ]))
+    store.root = str(tmpdir)
+    store.save()
+    loaded = DataStore(str(tmpdir))
+    loaded.load(['eth_btc'])
+    client = BacktestClient(loaded)
+    counts = []
+
+    def on_bar(c, symbol, kline):
+        counts.append((len(c.get_klines(symbol, '1min')), len(c.get_trades(symbol))))
+
+    client.run(on_bar=on_bar)
+    assert counts == [(1, 1), (2, 2), (3, 2)]
+    assert client.get_ticker('eth_btc')['ticker']['last'] == '0.054'
+
+
+def test_no_look_ahead():
+    """Test klines are only visible once closed and arrive after the trades inside them"""
+    store = _store()
+    store.add_klines('eth_btc', '1hour', KlineSeries.from_klines([[0, 1, 9, 0.5, 7, 100]]))
+    store.add_trades('eth_btc', TradeSeries.from_trades([
+        {'date_ms': 110000, 'price': 0.049, 'amount': 1, 'tid': 1, 'type': 'sell'},
+    ]))
+    client = BacktestClient(store)
+    events = []
+
+    def on_bar(c, symbol, kline):
+        events.append(('bar', kline[0], c.time_ms, len(c.get_klines(symbol, '1hour'))))
+
+    def on_trade(c, symbol, trade):
+        events.append(('trade', int(trade['date_ms']), c.time_ms, len(c.get_klines(symbol, '1min'))))
+
+    client.run(on_bar=on_bar, on_trade=on_trade)
+    assert events == [
+        ('trade', 110000, 110000, 0),
+        ('bar', 60000, 120000, 0),
+        ('bar', 120000, 180000, 0),
+        ('bar', 180000, 240000, 0),
+    ]
+    client.time_ms = 3600000
+    assert client.get_klines('eth_btc', '1hour') == [[0, 1, 9, 0.5, 7, 100]]
+
+
+def test_zero_volume_bar_fills_nothing():
+    """Test an empty bar does not fill resting orders"""
+    store = DataStore()
+    store.add_klines('eth_btc', '1min', KlineSeries.from_klines([
+        [60000, 0.05, 0.05, 0.05, 0.05, 10],
+        [120000, 0.05, 0.05, 0.04, 0.04, 0],
+    ]))
+    client = BacktestClient(store, balances={'btc': 1.0})
+    orders = []
+
+    def on_bar(c, symbol, kline):
+        if not orders:
+            orders.append(c.create_buy_order(symbol, '0.045', '1')['order_id'])
+
+    client.run(on_bar=on_bar)
+    assert client.get_order('eth_btc', orders[0])['orders'][0]['status'] == client.ORDER_STATUS_UNFILLED
+
+
+def test_ticker_rolls_over_24_hours():
+    """Test the ticker's high, low and volume cover the klines of the last day as time moves"""
+    klines = [[i * 3600000, 1, 1 + i % 7, 1 - (i % 5) / 10.0, 1, i % 3] for i in range(60)]
+    store = DataStore()
+    store.add_klines('eth_btc', '1hour', KlineSeries.from_klines(klines))
+    client = BacktestClient(store, kline_type='1hour')
+    tickers = []
+
+    def on_bar(c, symbol, kline):
+        tickers.append(c.get_ticker(symbol)['ticker'])
+
+    client.run(on_bar=on_bar, start=10 * 3600000)
+    # klines are dispatched when they close, so the first is the one opening at 9 hours
+    assert len(tickers) == 51
+    for ticker, end in zip(tickers, range(9, 60)):
+        day = klines[max(0, end - 24):end + 1]
+        assert float(ticker['high']) == max(k[2] for k in day)
+        assert float(ticker['low']) == min(k[3] for k in day)
+        assert float(ticker['vol']) == sum(k[5] for k in day)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import threading
+import time
+
+from allcoin.client import Client
+import pytest
+import requests_mock
+
+
+@pytest.fixture
+def exchange_options():
+    return {'latency': 0.02}
+
+
+def _throughput(client, threads, requests_per_thread):
+    def worker():
+        for _ in range(requests_per_thread):
+            client.get_userinfo()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.time()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return threads * requests_per_thread / (time.time() - start)
+
+
+def test_throughput_scales_with_threads(exchange):
+    """Test one shared client serves concurrent threads in parallel"""
+    client = Client('maker', 'maker_secret')
+    client.API_URL = exchange.api_url
+    single = _throughput(client, 1, 16)
+    parallel = _throughput(client, 8, 16)
+    assert parallel > 4 * single
+    assert exchange.request_count == 16 + 8 * 16
+    # sessions of ended threads are closed when the next thread starts one
+    assert len(client._sessions) == 8
+    client.get_userinfo()
+    assert len(client._sessions) == 1
+    client.close()
+    assert client._sessions == []
+
+
+def test_caller_data_not_modified():
+    """Test request params passed in are left untouched for reuse"""
+    client = Client('api_key', 'api_secret')
+    data = {'symbol': 'eth_btc', 'type': 'buy', 'price': '0.01', 'amount': '1', 'requests_params': {'timeout': 5}}
+    with requests_mock.mock() as m:
+        m.post('https://api.allcoin.com/api/v1/trade', json={'order_id': '1', 'result': True})
+        client._post('trade', signed=True, data=data)
+        client._post('trade', signed=True, data=data)
+        assert m.request_history[0].text == m.request_history[1].text
+    assert data == {'symbol': 'eth_btc', 'type': 'buy', 'price': '0.01', 'amount': '1', 'requests_params': {'timeout': 5}}
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import time
+
+from allcoin.client import Client
+from allcoin.clock import ClockEstimator
+import requests_mock
+
+
+def test_bounds_narrow_the_offset():
+    """Test whole second server stamps at different phases pin the offset below a second"""
+    clock = ClockEstimator()
+    offset = 2300
+    for local in range(0, 10000, 370):
+        server = local + 20 + offset
+        clock.observe(local, local + 40, server // 1000 * 1000, server // 1000 * 1000 + 1000)
+    assert abs(clock.offset - offset) <= clock.uncertainty < 100
+
+
+def test_lower_bounds_alone_leave_offset_unset():
+    """Test trade times only bound the offset from below"""
+    clock = ClockEstimator()
+    clock.observe(0, 40, 5000)
+    assert (clock.offset, clock.uncertainty) == (0.0, None)
+
+
+def test_inconsistent_bounds_fall_back_to_tightest_sample():
+    """Test disjoint bounds after a clock step use the narrowest sample"""
+    clock = ClockEstimator(window=4)
+    clock.observe(0, 100, 1000, 2000)
+    clock.observe(0, 10, 5000, 5200)
+    assert clock.offset == 5095.0
+
+
+def test_client_annotates_responses():
+    """Test the client feeds the estimator and annotates dict responses with their age"""
+    clock = ClockEstimator()
+    client = Client('api_key', 'api_secret', clock=clock)
+    now = time.time()
+    date = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(now))
+    ticker = {'date': str(int(now) - 5), 'ticker': {'buy': '1', 'high': '1', 'last': '1', 'low': '1', 'sell': '1',
+                                                    'vol': '1'}}
+    trades = [{'date': int(now) - 1, 'date_ms': int(now * 1000) - 1000, 'amount': 1, 'price': 1, 'tid': '1',
+               'type': 'buy'}]
+    with requests_mock.mock() as m:
+        m.get('https://api.allcoin.com/api/v1/ticker?symbol=eth_btc', json=ticker, headers={'Date': date})
+        m.get('https://api.allcoin.com/api/v1/trades?symbol=eth_btc', json=trades, headers={'Date': date})
+        res = client.get_ticker('eth_btc')
+        client.get_trades('eth_btc')
+
+    assert abs(clock.offset) < 1500
+    assert 3000 < res['age_ms'] < 7000
+    assert 3000 < clock.age(res) < 7000
+    assert 0 < clock.age(trades[0]['date_ms']) < 3000
+    stats = clock.stats()
+    assert stats['samples'] == 2 and stats['rtt_min'] >= 0
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+from allcoin.client import Client
+from allcoin.depth import DepthCache, DepthSnapshot, merge_levels
+import requests_mock
+
+BOOK = {
+    'asks': [[792, 5], [789.68, 0.018], [788.99, 0.042], [788.43, 0.036], [787.27, 0.02]],
+    'bids': [[787.1, 0.35], [787, 12.071], [786.5, 0.014], [786.2, 0.38], [786, 3.217], [785.3, 5.322]],
+}
+
+
+def test_merge_rounds_away_from_the_spread():
+    """Test bids bucket down and asks bucket up"""
+    assert merge_levels([(787.1, 1), (787.0, 2), (786.5, 3)], 0.01, 100, 'buy') == [[787.0, 3], [786.0, 3]]
+    assert merge_levels([(787.27, 1), (788.43, 2), (788.99, 3)], 0.01, 100, 'sell') == [[788.0, 1], [789.0, 5]]
+
+
+def test_views_from_one_snapshot():
+    """Test size and merge views keep the API shape and are cached"""
+    snapshot = DepthSnapshot(BOOK)
+    assert snapshot.tick == 0.01
+    assert snapshot.view() == BOOK
+    assert snapshot.view(size=2) == {'asks': [[788.43, 0.036], [787.27, 0.02]], 'bids': [[787.1, 0.35], [787, 12.071]]}
+    merged = snapshot.view(size=2, merge=100)
+    assert merged == {'asks': [[789.0, 0.078], [788.0, 0.02]], 'bids': [[787.0, 12.421], [786.0, 3.611]]}
+    assert snapshot.view(size=2, merge=100) is merged
+
+
+def test_tick_of_small_prices():
+    """Test the tick is inferred from prices Python prints in exponent form"""
+    snapshot = DepthSnapshot({'asks': [[0.00001551, 10], [0.0000155, 20]], 'bids': [[0.00001234, 5], [0.0000123, 7]]})
+    assert snapshot.tick == 1e-08
+    assert snapshot.view(merge=10) == {'asks': [[0.0000156, 10], [0.0000155, 20]], 'bids': [[0.0000123, 12]]}
+
+
+def test_cache_serves_every_view_with_one_request():
+    """Test different views within max_age cost a single depth request"""
+    cache = DepthCache(Client('api_key', 'api_secret'), max_age=60)
+    with requests_mock.mock() as m:
+        m.get('https://api.allcoin.com/api/v1/depth?symbol=eth_btc&size=100', json=BOOK)
+        cache.get_order_book('eth_btc', merge=1)
+        cache.get_order_book('eth_btc', size=5, merge=5)
+        cache.get_order_book('eth_btc', size=10, merge=10)
+        assert m.call_count == 1
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import gzip
+import json
+import os
+
+from allcoin.__main__ import main
+from allcoin.client import Client
+import pytest
+
+
+def _trade(exchange, count):
+    maker = Client('maker', 'maker_secret')
+    taker = Client('taker', 'taker_secret')
+    maker.API_URL = taker.API_URL = exchange.api_url
+    for _ in range(count):
+        maker.create_sell_order('eth_btc', '0.05', '1')
+        taker.create_buy_order('eth_btc', '0.05', '1')
+
+
+def _rows(path):
+    with gzip.open(path, 'rt') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_download_resumes_from_checkpoint(exchange, tmpdir):
+    """Test a second run only appends rows newer than the checkpoint"""
+    args = ['download', 'eth_btc', 'ltc_btc', '--kinds', 'trades', 'klines', 'order_history',
+            '--output', str(tmpdir), '--rate', '1000', '--api-url', exchange.api_url,
+            '--api-key', 'maker', '--api-secret', 'maker_secret']
+    _trade(exchange, 3)
+    assert main(args) == 0
+    trades = str(tmpdir.join('eth_btc_trades.jsonl.gz'))
+    assert [t['tid'] for t in _rows(trades)] == ['1', '2', '3']
+    # the current minute has not closed yet
+    assert not os.path.exists(str(tmpdir.join('eth_btc_klines_1min.jsonl.gz')))
+    assert len(_rows(str(tmpdir.join('eth_btc_orders_completed.jsonl.gz')))) == 3
+    assert not os.path.exists(str(tmpdir.join('ltc_btc_trades.jsonl.gz')))
+
+    _trade(exchange, 2)
+    assert main(args) == 0
+    assert [t['tid'] for t in _rows(trades)] == ['1', '2', '3', '4', '5']
+    assert len(_rows(str(tmpdir.join('eth_btc_orders_completed.jsonl.gz')))) == 5
+    assert _rows(str(tmpdir.join('eth_btc_orders_open.jsonl.gz'))) == []
+    checkpoint = json.loads(tmpdir.join('checkpoint.json').read())
+    assert checkpoint['eth_btc_trades'] == 6
+
+
+def test_order_history_needs_keys(tmpdir):
+    """Test signed downloads are refused without credentials"""
+    with pytest.raises(SystemExit):
+        main(['download', 'eth_btc', '--kinds', 'order_history', '--output', str(tmpdir),
+              '--api-key', '', '--api-secret', ''])
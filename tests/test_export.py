@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+
+from allcoin.client import Client
+import pytest
+import requests_mock
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from allcoin.export import Exporter, export_order_history, export_trades, to_record_batch  # noqa: E402
+
+client = Client('api_key', 'api_secret')
+
+
+def _trade(tid):
+    return {"date": "1367130137", "date_ms": "1367130137000", "price": 787.71, "amount": "0.5",
+            "tid": str(tid), "type": "sell"}
+
+
+def test_kline_batch_schema():
+    """Test klines convert to the fixed schema"""
+    batch = to_record_batch('klines', [[1417449600000, 2339.11, 2383.15, 2322, 2369.85, 83850.06]])
+    assert batch.schema.names == ['time', 'open', 'high', 'low', 'close', 'volume']
+    assert batch.column(3).to_pylist() == [2322.0]
+    assert batch.schema.field('time').type.tz == 'UTC'
+
+
+def test_export_trades_pages_until_empty(tmpdir):
+    """Test trades are appended page by page to one parquet file"""
+    path = str(tmpdir.join('trades.parquet'))
+    with requests_mock.mock() as m:
+        m.get('https://api.allcoin.com/api/v1/trades?symbol=eth_btc', text=json.dumps([_trade(1), _trade(2)]))
+        m.get('https://api.allcoin.com/api/v1/trades?symbol=eth_btc&since=3', text=json.dumps([_trade(3)]))
+        m.get('https://api.allcoin.com/api/v1/trades?symbol=eth_btc&since=4', text='[]')
+        assert export_trades(client, path, 'eth_btc') == 3
+    table = pq.read_table(path)
+    assert table.column('tid').to_pylist() == [1, 2, 3]
+    assert table.column('amount').to_pylist() == [0.5, 0.5, 0.5]
+
+
+def test_export_order_history_arrow(tmpdir):
+    """Test order history pages are written to an Arrow file"""
+    path = str(tmpdir.join('orders.arrow'))
+    order = {"amount": 0.1, "avg_price": 0, "create_date": 1418008467000, "deal_amount": 0, "order_id": 10000591,
+             "price": 500, "status": 2, "symbol": "eth_btc", "type": "sell"}
+    with requests_mock.mock() as m:
+        m.post('https://api.allcoin.com/api/v1/order_history', [
+            {'text': json.dumps({"current_page": 1, "orders": [order, order], "page_length": 2, "result": True})},
+            {'text': json.dumps({"current_page": 2, "orders": [order], "page_length": 2, "result": True})},
+        ])
+        assert export_order_history(client, path, 'eth_btc', 1, page_length=2, format='arrow') == 3
+    table = pa.ipc.open_file(path).read_all()
+    assert table.num_rows == 3
+    assert table.column('status').to_pylist() == [2, 2, 2]
+
+
+def test_exporter_write_iter(tmpdir):
+    """Test iterators are written in bounded batches"""
+    path = str(tmpdir.join('trades.parquet'))
+    with Exporter(path, 'trades') as exporter:
+        assert exporter.write_iter((_trade(i) for i in range(25)), batch_size=10) == 25
+    assert pq.ParquetFile(path).metadata.num_row_groups == 3
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+from allcoin.client import Client
+from allcoin.hedging import HedgePolicy
+from allcoin.server import SimulatedExchange
+import pytest
+import threading
+import time
+
+
+@pytest.fixture
+def slow_once():
+    # every 5th request stalls well past the normal latency
+    calls = {'n': 0}
+
+    def latency():
+        calls['n'] += 1
+        return 0.5 if calls['n'] % 5 == 0 else 0.001
+
+    exchange = SimulatedExchange(latency=latency).start()
+    yield exchange
+    exchange.stop()
+
+
+def _client(exchange, policy):
+    client = Client('api_key', 'api_secret', hedge_policy=policy)
+    client.API_URL = exchange.api_url
+    return client
+
+
+def test_hedge_wins_over_stalled_request(slow_once):
+    """Test a stalled request is overtaken by its hedge"""
+    policy = HedgePolicy(percentile=50, budget=1, min_samples=3, min_delay=0.01)
+    client = _client(slow_once, policy)
+    for _ in range(10):
+        client.get_order_book('eth_btc')
+    stats = policy.stats()
+    assert stats['requests'] == 10
+    assert stats['hedges_sent'] >= 1
+    assert stats['hedges_won'] >= 1
+
+
+def test_budget_caps_hedges(slow_once):
+    """Test no hedges are sent without budget"""
+    policy = HedgePolicy(percentile=50, budget=0, min_samples=3, min_delay=0.01)
+    client = _client(slow_once, policy)
+    for _ in range(6):
+        client.get_order_book('eth_btc')
+    stats = policy.stats()
+    assert stats['hedges_sent'] == 0
+    assert stats['hedges_denied'] >= 1
+
+
+class _Response(object):
+
+    def __init__(self, delay):
+        time.sleep(delay)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_losing_response_closed():
+    """Test the response that loses the race is closed once it arrives"""
+    policy = HedgePolicy(percentile=50, budget=1, min_samples=1, min_delay=0.01)
+    policy.tracker.record('depth', 0.01)
+    policy._tokens = 1
+    delays = iter([0.2, 0.0])
+    responses = []
+
+    def send():
+        response = _Response(next(delays))
+        responses.append(response)
+        return response
+
+    winner = policy.request('depth', send)
+    time.sleep(0.3)
+    assert not winner.closed
+    assert [r.closed for r in responses if r is not winner] == [True]
+
+
+def test_busy_pool_runs_inline():
+    """Test requests run on the calling thread when every worker is busy"""
+    policy = HedgePolicy(min_samples=1, max_workers=1)
+    policy.tracker.record('depth', 1.0)
+    release = threading.Event()
+    policy._submit('depth', release.wait, (), {})
+    threads = []
+    assert policy.request('depth', lambda: threads.append(threading.current_thread()) or 'ok') == 'ok'
+    assert threads == [threading.current_thread()]
+    release.set()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import random
+
+from allcoin.indicators import ATR, EMA, RSI, SMA, BollingerBands, Indicators
+import pytest
+
+
+def _klines(n, seed=1):
+    rng = random.Random(seed)
+    klines, close = [], 100.0
+    for i in range(n):
+        open_ = close
+        close = max(1.0, open_ + rng.uniform(-2, 2))
+        klines.append([i * 60000, open_, max(open_, close) + rng.random(), min(open_, close) - rng.random(), close,
+                       rng.random() * 10])
+    return klines
+
+
+def _ema(closes, period):
+    if len(closes) < period:
+        return None
+    ema = sum(closes[:period]) / period
+    for x in closes[period:]:
+        ema += 2.0 / (period + 1) * (x - ema)
+    return ema
+
+
+def _wilder(values, period):
+    if len(values) < period:
+        return None
+    average = sum(values[:period]) / period
+    for x in values[period:]:
+        average = (average * (period - 1) + x) / period
+    return average
+
+
+def _rsi(closes, period):
+    changes = [b - a for a, b in zip(closes, closes[1:])]
+    gain, loss = _wilder([max(c, 0) for c in changes], period), _wilder([max(-c, 0) for c in changes], period)
+    if gain is None:
+        return None
+    return 100.0 - 100.0 / (1 + gain / loss)
+
+
+def _atr(klines, period):
+    ranges = [klines[0][2] - klines[0][3]] + [max(k[2], p[4]) - min(k[3], p[4]) for p, k in zip(klines, klines[1:])]
+    return _wilder(ranges, period)
+
+
+def _bands(closes, period, k):
+    if len(closes) < period:
+        return None
+    window = closes[-period:]
+    mean = sum(window) / period
+    width = k * (sum((x - mean) ** 2 for x in window) / period) ** 0.5
+    return (mean - width, mean, mean + width)
+
+
+def _full(klines):
+    closes = [k[4] for k in klines]
+    return {
+        'sma': sum(closes[-10:]) / 10 if len(closes) >= 10 else None,
+        'ema': _ema(closes, 10),
+        'rsi': _rsi(closes, 14),
+        'atr': _atr(klines, 14),
+        'bands': _bands(closes, 20, 2),
+    }
+
+
+def _indicators():
+    return Indicators(sma=SMA(10), ema=EMA(10), rsi=RSI(14), atr=ATR(14), bands=BollingerBands(20, 2))
+
+
+def _assert_close(values, expected):
+    for name, value in expected.items():
+        if value is None:
+            assert values[name] is None, name
+        else:
+            assert values[name] == pytest.approx(value, rel=1e-9), name
+
+
+def test_incremental_matches_full_recompute():
+    """Test every update, including forming bar corrections, matches recomputing over the whole history"""
+    klines = _klines(120)
+    indicators = _indicators()
+    for i, kline in enumerate(klines):
+        # the bar is first seen part formed then corrected to its close
+        forming = [kline[0], kline[1], kline[1] + 0.5, kline[1] - 0.5, kline[1] + 0.25, 1.0]
+        _assert_close(indicators.update(forming), _full(klines[:i] + [forming]))
+        _assert_close(indicators.update(kline), _full(klines[:i + 1]))
+
+
+def test_seed_then_update():
+    """Test seeding from history then continuing matches the full recompute"""
+    klines = _klines(200, seed=2)
+    indicators = _indicators()
+    _assert_close(indicators.seed(klines[:150]), _full(klines[:150]))
+    assert indicators.time == klines[149][0]
+    # a poll refetches the forming bar along with the next
+    for kline in klines[149:]:
+        values = indicators.update(kline)
+    _assert_close(values, _full(klines))
+
+
+def test_out_of_order_rejected():
+    """Test older klines are refused"""
+    ema = EMA(3)
+    ema.seed(_klines(5))
+    with pytest.raises(ValueError):
+        ema.update(_klines(1)[0])
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+from allcoin.client import Client
+from allcoin.ladder import LadderManager
+
+
+def _ladder(exchange):
+    client = Client('maker', 'maker_secret')
+    client.API_URL = exchange.api_url
+    return client, LadderManager(client, 'eth_btc')
+
+
+def test_reprice_touches_only_moved_levels(exchange):
+    """Test a reprice keeps unchanged levels and replaces only the moved one"""
+    client, ladder = _ladder(exchange)
+    ladder.refresh()
+    first = ladder.apply({'buy': [('0.049', '1'), ('0.048', '2')], 'sell': [('0.051', '1'), ('0.052', '2')]})
+    assert len(first['created']) == 4 and not first['cancelled']
+
+    before = exchange.request_count
+    second = ladder.apply({'buy': [('0.049', '1'), ('0.047', '2')], 'sell': [('0.051', '1'), ('0.052', '2')]})
+    assert len(second['kept']) == 3
+    assert len(second['cancelled']) == 1 and len(second['created']) == 1
+    assert exchange.request_count - before == 2
+
+    open_orders = client.get_open_orders('eth_btc')['orders']
+    assert sorted(str(o['order_id']) for o in open_orders) == sorted(ladder.live)
+    assert sorted(o['price'] for o in open_orders) == [0.047, 0.049, 0.051, 0.052]
+
+
+def test_crossing_create_waits_for_cancel(exchange):
+    """Test a level moving through our own opposite quote does not self trade"""
+    client, ladder = _ladder(exchange)
+    ladder.apply({'buy': [('0.049', '1')], 'sell': [('0.051', '1')]})
+    result = ladder.apply({'buy': [('0.052', '1')], 'sell': [('0.053', '1')]})
+    assert len(result['cancelled']) == 2 and len(result['created']) == 2
+    assert client.get_trade_history('eth_btc') == []
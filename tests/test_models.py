@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+import tracemalloc
+
+from allcoin import models
+from allcoin.client import Client
+from allcoin.models import OrderStatus
+
+
+def _trade_rows(n):
+    # parsed from JSON like a real response so every value is its own object
+    return json.loads(json.dumps([{"date": "1367130137", "date_ms": str(1367130137000 + i), "price": "787.71",
+                                   "amount": "0.003", "tid": str(230433 + i), "type": "sell"} for i in range(n)]))
+
+
+def _allocated(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    assert held
+    return size
+
+
+def test_parsed_fields():
+    """Test models parse numeric fields and order status"""
+    trade = next(models.trades(_trade_rows(1)))
+    assert trade.price == 787.71 and trade.tid == 230433 and trade.side == 'sell'
+
+    order = next(models.orders({'orders': [{
+        'amount': '10', 'avg_price': 0, 'create_date': 1418008467000, 'deal_amount': '4', 'order_id': 10000591,
+        'price': '0.1', 'status': 1, 'symbol': 'eth_btc', 'type': 'sell'}]}))
+    assert order.status is OrderStatus.PARTIALLY_FILLED and order.status.is_open
+    assert order.remaining == 6
+    assert Client.ORDER_STATUS_FILLED is OrderStatus.FILLED
+
+    book = models.order_book({'asks': [[792, 5], [789.68, 0.018]], 'bids': [[787.7, 1]]})
+    assert book.asks[0] == models.BookLevel(789.68, 0.018)
+    balances = models.balances({'info': {'funds': {'free': {'btc': '1.5'}, 'freezed': {'btc': '0.5'}}}})
+    assert balances['btc'].total == 2
+
+
+def test_models_use_less_memory_than_dicts():
+    """Test a list of models takes well under half the memory of the API dicts"""
+    dicts = _allocated(lambda: _trade_rows(10000))
+    rows = _trade_rows(10000)
+    compact = _allocated(lambda: list(models.trades(rows)))
+    assert not hasattr(models.Trade(1, 2, 3.0, 4.0, 'buy'), '__dict__')
+    assert compact < dicts / 2
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+
+from allcoin.client import Client
+from allcoin.orderindex import OrderIndex
+import requests_mock
+
+
+def _order(order_id, status, side='sell', price=0.05, create_date=None, symbol='eth_btc'):
+    return {"amount": 1.0, "avg_price": price if status == 2 else 0, "create_date": create_date or order_id * 1000,
+            "deal_amount": 1.0 if status == 2 else 0, "order_id": order_id, "price": price, "status": status,
+            "symbol": symbol, "type": side}
+
+
+def test_query_filters():
+    """Test queries combine symbol, status, side, time and price filters"""
+    index = OrderIndex()
+    index.update([
+        _order(1, 2, 'sell', 0.05),
+        _order(2, 2, 'buy', 0.04),
+        _order(3, 10, 'sell', 0.06),
+        _order(5, 2, 'sell', 0.07),
+        _order(4, 2, 'sell', 0.055, create_date=3500),
+        _order(6, 2, 'sell', 0.05, symbol='ltc_btc'),
+    ])
+    ids = [o['order_id'] for o in index.query('eth_btc', status=2, side='sell', start=1000, end=5000)]
+    assert ids == [1, 4]
+    assert [o['order_id'] for o in index.query(status=2, min_price=0.05, max_price=0.06)] == [1, 4, 6]
+    assert index.order(3)['status'] == 10
+    assert index.query('xrp_btc') == []
+
+
+def test_refresh_reconciles_incrementally():
+    """Test refresh only fetches the completed pages past known orders and reconciles open ones"""
+    client = Client('api_key', 'api_secret')
+    index = OrderIndex()
+    index.update([_order(0, 2), _order(1, 2), _order(2, 0)])
+
+    pages = {'0': [_order(3, 0)], '1': [_order(0, 2), _order(1, 2), _order(4, 2)]}
+
+    def order_history(request, context):
+        params = dict(p.split('=') for p in request.text.split('&'))
+        page, length = int(params['current_page']), int(params['page_length'])
+        orders = pages[params['status']]
+        return json.dumps({"current_page": page, "orders": orders[(page - 1) * length:page * length],
+                           "result": True, "total": len(orders)})
+
+    with requests_mock.mock() as m:
+        m.post('https://api.allcoin.com/api/v1/order_history', text=order_history)
+        m.post('https://api.allcoin.com/api/v1/orders_info', text=json.dumps({"result": True, "orders": [_order(2, 2)]}))
+        assert index.refresh(client, 'eth_btc', page_length=1) == 3
+        assert 'order_id=2' in m.request_history[-1].text
+        history_pages = [r.text for r in m.request_history if r.path.endswith('order_history')]
+        # two open pages, then only the completed page after the two known orders
+        assert len(history_pages) == 3
+        assert 'current_page=3' in history_pages[-1]
+
+    assert index.order(2)['status'] == 2
+    assert index.open_order_ids('eth_btc') == [3]
+
+
+def test_refresh_against_simulator(exchange_client):
+    """Test orders completing between refreshes are picked up from the simulator's history"""
+    maker = exchange_client('maker')
+    taker = exchange_client('taker')
+    index = OrderIndex()
+
+    def fill(count):
+        for _ in range(count):
+            order_id = maker.create_sell_order('eth_btc', '0.05', '1')['order_id']
+            taker.create_buy_order('eth_btc', '0.05', '1')
+            yield int(order_id)
+
+    first = list(fill(5))
+    index.refresh(maker, 'eth_btc', page_length=2)
+    assert sorted(o['order_id'] for o in index.query('eth_btc', status=2)) == first
+
+    resting = int(maker.create_sell_order('eth_btc', '0.06', '1')['order_id'])
+    second = list(fill(3))
+    assert index.refresh(maker, 'eth_btc', page_length=2) == 4
+    assert index.open_order_ids('eth_btc') == [resting]
+
+    maker.cancel_order('eth_btc', resting)
+    assert index.refresh(maker, 'eth_btc', page_length=2) == 1
+    assert sorted(o['order_id'] for o in index.query('eth_btc', status=(2, 10))) == sorted(first + second + [resting])
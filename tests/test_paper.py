@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+from allcoin.client import Client
+from allcoin.exceptions import AllcoinAPIException
+from allcoin.paper import PaperClient
+import pytest
+
+
+def _client(exchange, key):
+    client = Client(key, '{}_secret'.format(key))
+    client.API_URL = exchange.api_url
+    return client
+
+
+def _paper(exchange, **kwargs):
+    paper = PaperClient(balances={'btc': 1.0}, **kwargs)
+    paper.API_URL = exchange.api_url
+    return paper
+
+
+def test_orders_fill_against_live_book(exchange):
+    """Test crossing paper orders take from the live book without placing real orders"""
+    maker = _client(exchange, 'maker')
+    maker.batch_orders('eth_btc', [{'price': '0.05', 'amount': '10'}, {'price': '0.06', 'amount': '10'}], order_type='sell')
+    paper = _paper(exchange)
+
+    order_id = paper.create_buy_order('eth_btc', '0.055', '15')['order_id']
+    order = paper.get_order('eth_btc', order_id)['orders'][0]
+    assert order['status'] == Client.ORDER_STATUS_PARTIALLY_FILLED
+    assert order['deal_amount'] == 10
+    funds = paper.get_userinfo()['info']['funds']
+    assert float(funds['free']['eth']) == pytest.approx(10 * (1 - 0.002))
+    assert float(funds['freezed']['btc']) == pytest.approx(5 * 0.055)
+    assert len(paper.get_trade_history('eth_btc')) == 1
+
+    # the exchange never saw the order
+    assert len(maker.get_open_orders('eth_btc')['orders']) == 2
+    assert maker.get_trades('eth_btc') == []
+
+
+def test_book_levels_are_used_up(exchange):
+    """Test paper orders share the amounts the book shows until it is fetched again"""
+    maker = _client(exchange, 'maker')
+    maker.batch_orders('eth_btc', [{'price': '0.05', 'amount': '1'}, {'price': '0.06', 'amount': '1'}], order_type='sell')
+    paper = _paper(exchange, book_max_age=60)
+
+    order_ids = [paper.create_buy_order('eth_btc', '0.05', '1')['order_id'] for _ in range(3)]
+    deals = [paper.get_order('eth_btc', i)['orders'][0]['deal_amount'] for i in order_ids]
+    assert deals == [1, 0, 0]
+
+    # a fresh book fills resting orders up to the amount at or below their price
+    paper.get_order_book('eth_btc')
+    deals = [paper.get_order('eth_btc', i)['orders'][0]['deal_amount'] for i in order_ids]
+    assert deals == [1, 1, 0]
+
+
+def test_resting_orders_fill_from_tape(exchange):
+    """Test prints through a resting paper order fill it and earlier prints do not"""
+    maker = _client(exchange, 'maker')
+    taker = _client(exchange, 'taker')
+    maker.create_sell_order('eth_btc', '0.05', '1')
+    taker.create_buy_order('eth_btc', '0.05', '1')
+
+    paper = _paper(exchange)
+    paper.get_trades('eth_btc')
+    order_id = paper.create_buy_order('eth_btc', '0.04', '2')['order_id']
+    paper.sync('eth_btc')
+    assert paper.get_order('eth_btc', order_id)['orders'][0]['deal_amount'] == 0
+
+    maker.create_buy_order('eth_btc', '0.039', '3')
+    taker.create_sell_order('eth_btc', '0.039', '3')
+    paper.sync('eth_btc')
+    order = paper.get_order('eth_btc', order_id)['orders'][0]
+    assert order['status'] == Client.ORDER_STATUS_FILLED
+
+    with pytest.raises(AllcoinAPIException) as e:
+        paper.cancel_order('eth_btc', order_id)
+    assert e.value.code == '10028'
+
+
+def test_simulated_errors(exchange):
+    """Test balance checks raise the codes the exchange would"""
+    paper = _paper(exchange)
+    with pytest.raises(AllcoinAPIException) as e:
+        paper.create_buy_order('eth_btc', '0.05', '100')
+    assert e.value.code == '10010'
+    res = paper.batch_orders('eth_btc', [{'price': '0.05', 'amount': '1'}, {'price': '0.05', 'amount': '100'}],
+                             order_type='buy')
+    assert [o.get('error_code') for o in res['order_info']] == [None, 10010]
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+from allcoin.client import Client
+from allcoin.exceptions import AllcoinAPIException, AllcoinCircuitOpenException
+from allcoin.retry import RetryPolicy
+import pytest
+import requests
+import requests_mock
+
+
+def _client(**kwargs):
+    return Client('api_key', 'api_secret', retry_policy=RetryPolicy(backoff=0, **kwargs))
+
+
+def test_retries_rate_limit():
+    """Test rate limited requests are retried"""
+    client = _client()
+    with requests_mock.mock() as m:
+        m.get('https://api.allcoin.com/api/v1/ticker?symbol=eth_btc', [
+            {'json': {'error_code': '10001', 'result': False}},
+            {'json': {'date': '1410431279', 'ticker': {}}},
+        ])
+        assert client.get_ticker('eth_btc')['date'] == '1410431279'
+        assert m.call_count == 2
+
+
+def test_permanent_error_not_retried():
+    """Test permanent errors are raised straight away"""
+    client = _client()
+    with requests_mock.mock() as m:
+        m.post('https://api.allcoin.com/api/v1/userinfo', json={'error_code': '10007', 'result': False})
+        with pytest.raises(AllcoinAPIException):
+            client.get_userinfo()
+        assert m.call_count == 1
+
+
+def test_order_creation_not_resent_after_timeout():
+    """Test timeouts are retried for reads but not for order creation"""
+    client = _client()
+    with requests_mock.mock() as m:
+        m.get('https://api.allcoin.com/api/v1/depth?symbol=eth_btc', [
+            {'exc': requests.exceptions.ConnectTimeout},
+            {'json': {'asks': [], 'bids': []}},
+        ])
+        m.post('https://api.allcoin.com/api/v1/trade', exc=requests.exceptions.ReadTimeout)
+        assert client.get_order_book('eth_btc') == {'asks': [], 'bids': []}
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            client.create_buy_order('eth_btc', '0.01', '1')
+        assert m.call_count == 3
+
+
+def test_maintenance_opens_breaker():
+    """Test maintenance opens the endpoint breaker so later calls fail fast"""
+    client = _client()
+    with requests_mock.mock() as m:
+        m.get('https://api.allcoin.com/api/v1/ticker?symbol=eth_btc', json={'error_code': '10030', 'result': False})
+        with pytest.raises(AllcoinAPIException):
+            client.get_ticker('eth_btc')
+        with pytest.raises(AllcoinCircuitOpenException):
+            client.get_ticker('eth_btc')
+        assert m.call_count == 1
+
+
+def test_order_creation_resent_after_connect_timeout():
+    """Test order creation is retried when the connection was never made"""
+    client = _client()
+    with requests_mock.mock() as m:
+        m.post('https://api.allcoin.com/api/v1/trade', [
+            {'exc': requests.exceptions.ConnectTimeout},
+            {'json': {'order_id': '123', 'result': True}},
+        ])
+        assert client.create_buy_order('eth_btc', '0.01', '1')['order_id'] == '123'
+        assert m.call_count == 2
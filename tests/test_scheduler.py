@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import threading
+import time
+
+from allcoin.client import Client
+from allcoin.scheduler import CANCEL, MARKET, RequestScheduler
+import requests_mock
+
+
+def _flood(scheduler, path, count, order):
+    def worker(i):
+        scheduler.call(path, lambda: order.append((path, i)))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def test_cancel_jumps_queued_market_data():
+    """Test a cancel is sent ahead of market data that queued before it"""
+    scheduler = RequestScheduler(rate=50, burst=1, reserved={}, deadlines={})
+    order = []
+    threads = _flood(scheduler, 'depth', 10, order)
+    time.sleep(0.05)
+    threads += _flood(scheduler, 'cancel_order', 1, order)
+    for t in threads:
+        t.join()
+    assert [p for p, _ in order].index('cancel_order') <= 4
+    stats = scheduler.stats()
+    assert stats['market']['dispatched'] == 10 and stats['cancel']['dispatched'] == 1
+
+
+def test_reserved_tokens_held_back_from_market_data():
+    """Test market data cannot spend the tokens reserved for cancels"""
+    scheduler = RequestScheduler(rate=1, burst=3, reserved={CANCEL: 2}, deadlines={})
+    scheduler.acquire(MARKET)
+    start = time.time()
+    scheduler.acquire(CANCEL)
+    scheduler.acquire(CANCEL)
+    assert time.time() - start < 0.1
+
+
+def test_deadline_sends_without_tokens():
+    """Test urgent work is sent once its deadline passes even with an empty bucket"""
+    scheduler = RequestScheduler(rate=0.1, burst=1, reserved={}, deadlines={CANCEL: 0.05})
+    scheduler.acquire(CANCEL)
+    assert scheduler.acquire(CANCEL) < 0.5
+    assert scheduler.stats()['cancel']['forced'] == 1
+
+
+def test_client_requests_pass_through_scheduler():
+    """Test client requests are counted against their priority class"""
+    scheduler = RequestScheduler(rate=100)
+    client = Client('api_key', 'api_secret', scheduler=scheduler)
+    with requests_mock.mock() as m:
+        m.get('https://api.allcoin.com/api/v1/depth?symbol=eth_btc', json={'asks': [], 'bids': []})
+        m.post('https://api.allcoin.com/api/v1/cancel_order', json={'order_id': '1', 'result': True})
+        client.get_order_book('eth_btc')
+        client.cancel_order('eth_btc', '1')
+    stats = scheduler.stats()
+    assert stats['market']['dispatched'] == 1 and stats['cancel']['dispatched'] == 1
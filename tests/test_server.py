@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+from allcoin.client import Client
+from allcoin.exceptions import AllcoinAPIException
+from allcoin.server import MarketData
+import pytest
+
+
+def _client(exchange, key):
+    client = Client(key, '{}_secret'.format(key))
+    client.API_URL = exchange.api_url
+    return client
+
+
+def test_orders_match_between_accounts(exchange):
+    """Test signed orders from two clients cross on the simulated book"""
+    maker = _client(exchange, 'maker')
+    taker = _client(exchange, 'taker')
+
+    maker.batch_orders('eth_btc', [{'price': '0.05', 'amount': '10'}, {'price': '0.06', 'amount': '10'}], order_type='sell')
+    book = taker.get_order_book('eth_btc')
+    assert book['asks'] == [[0.06, 10.0], [0.05, 10.0]]
+
+    order_id = taker.create_buy_order('eth_btc', '0.055', '15')['order_id']
+    order = taker.get_order('eth_btc', order_id)['orders'][0]
+    assert order['status'] == Client.ORDER_STATUS_PARTIALLY_FILLED
+    assert order['deal_amount'] == 10
+
+    assert len(taker.get_trades('eth_btc')) == 1
+    assert taker.get_ticker('eth_btc')['ticker']['last'] == '0.05'
+    assert len(taker.get_trade_history('eth_btc')) == 1
+    assert len(taker.get_open_orders('eth_btc')['orders']) == 1
+
+    taker.cancel_order('eth_btc', order_id)
+    funds = taker.get_userinfo()['info']['funds']
+    assert float(funds['freezed']['btc']) == pytest.approx(0)
+    assert float(funds['free']['btc']) == pytest.approx(10 - 0.5)
+
+
+def test_bad_signature(exchange):
+    """Test the exchange rejects a signature made with the wrong secret"""
+    client = Client('maker', 'wrong_secret')
+    client.API_URL = exchange.api_url
+    with pytest.raises(AllcoinAPIException) as e:
+        client.get_userinfo()
+    assert e.value.code == '10007'
+
+
+def test_injected_error(exchange):
+    """Test injected error codes surface as API exceptions"""
+    client = _client(exchange, 'maker')
+    exchange.inject_error(10030)
+    with pytest.raises(AllcoinAPIException) as e:
+        client.get_ticker('eth_btc')
+    assert e.value.code == '10030'
+    client.get_ticker('eth_btc')
+
+
+def test_market_data_rolls_window_and_buckets():
+    """Test ticker stats expire after 24 hours and klines build as trades print"""
+    market = MarketData()
+    for tid, (ts, price) in enumerate([(0, 5.0), (30000, 7.0), (70000, 6.0), (86460000, 4.0)], 1):
+        market.add({'date_ms': str(ts), 'price': price, 'amount': 1.0, 'tid': str(tid)})
+
+    assert market.stats(86460000) == (6.0, 4.0, 2.0)
+    assert market.klines('1min')[:2] == [[0, 5.0, 7.0, 5.0, 7.0, 2.0], [60000, 6.0, 6.0, 6.0, 6.0, 1.0]]
+    assert market.klines('1min', since=61000, size=1) == [[60000, 6.0, 6.0, 6.0, 6.0, 1.0]]
+    assert [t['tid'] for t in market.trades_since(3, 600)] == ['3', '4']
+
+
+def test_malformed_params(exchange):
+    """Test malformed parameters return 10008 instead of dropping the connection"""
+    client = _client(exchange, 'maker')
+    with pytest.raises(AllcoinAPIException) as e:
+        client.get_order_book('eth_btc', size='ten')
+    assert e.value.code == '10008'
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import multiprocessing
+import os
+import threading
+
+from allcoin.client import Client
+from allcoin.shm import Poller, SharedMarketData
+from allcoin.server import SimulatedExchange
+import pytest
+
+TICKER = {'date': '1410431279', 'ticker': {'buy': '33.15', 'high': '34.15', 'last': '33.15', 'low': '32.05',
+                                           'sell': '33.16', 'vol': '10532696.39199642'}}
+BOOK = {'asks': [[792, 5], [789.68, 0.018], [787.27, 0.02]], 'bids': [[787.1, 0.35], [787, 12.071]]}
+
+
+@pytest.fixture
+def shared():
+    shared = SharedMarketData.create('allcoin_test_{}'.format(os.getpid()), ['eth_btc', 'ltc_btc'], depth=2)
+    yield shared
+    shared.close()
+
+
+def _read(name, queue):
+    reader = SharedMarketData.attach(name)
+    queue.put((reader.symbols, reader.ticker('eth_btc'), reader.order_book('eth_btc'), reader.ticker('ltc_btc')))
+    reader.close()
+
+
+def test_readers_in_other_processes_see_latest_snapshot(shared):
+    """Test a reader process attaches by name and reads what was published"""
+    shared.publish_ticker('eth_btc', TICKER, now_ms=1)
+    shared.publish_book('eth_btc', BOOK, now_ms=2)
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_read, args=(shared.shm.name, queue))
+    process.start()
+    symbols, ticker, book, missing = queue.get(timeout=10)
+    process.join()
+    assert symbols == ['eth_btc', 'ltc_btc']
+    assert ticker['ticker']['vol'] == '10532696.39199642' and ticker['updated'] == 1
+    # depth 2 keeps the two best asks
+    assert book == {'updated': 2, 'asks': [[789.68, 0.018], [787.27, 0.02]], 'bids': [[787.1, 0.35], [787, 12.071]]}
+    assert missing is None
+    # the block outlives the reader process
+    assert shared.ticker('eth_btc') == ticker
+
+
+def test_reader_waits_out_a_write_in_progress(shared):
+    """Test a reader does not return while the sequence number is odd"""
+    shared.publish_ticker('eth_btc', TICKER)
+    offset = shared._slots['eth_btc']
+    seq = bytes(shared.shm.buf[offset:offset + 8])
+    shared.shm.buf[offset] += 1
+    reads = []
+    reader = threading.Thread(target=lambda: reads.append(shared.ticker('eth_btc')))
+    reader.start()
+    reader.join(0.05)
+    assert reads == []
+    shared.shm.buf[offset:offset + 8] = seq
+    shared.shm.buf[offset] += 2
+    reader.join(1)
+    assert reads[0]['date'] == '1410431279'
+
+
+def test_poller_publishes(shared):
+    """Test the poller publishes tickers and books from the exchange"""
+    exchange = SimulatedExchange().start()
+    client = Client('api_key', 'api_secret')
+    client.API_URL = exchange.api_url
+    Poller(client, shared).poll()
+    exchange.stop()
+    assert shared.ticker('eth_btc')['ticker']['last'] == '0.0'
+    assert shared.order_book('ltc_btc')['bids'] == []
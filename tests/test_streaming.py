@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+
+from allcoin.client import Client
+from allcoin.exceptions import AllcoinAPIException, AllcoinRequestException
+from allcoin.streaming import JSONArrayStream
+import pytest
+import requests
+import requests_mock
+
+
+client = Client('api_key', 'api_secret')
+
+TRADES = [
+    {"date": "1367130137", "date_ms": "1367130137000", "price": 787.71, "amount": 0.003, "tid": "230433", "type": "sell"},
+    {"date": "1367130137", "date_ms": "1367130137000", "price": 787.65, "amount": 12345, "tid": "230434", "type": "buy"},
+]
+
+
+def _chunks(text, size):
+    data = text.encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 1000])
+def test_rows_parsed_across_chunk_boundaries(size):
+    """Test rows split at any byte boundary are parsed intact"""
+    body = json.dumps(TRADES + [12345, u"été"])
+    assert list(JSONArrayStream(_chunks(body, size))) == TRADES + [12345, u"été"]
+
+
+def test_nested_array():
+    """Test streaming an array nested under a key"""
+    body = json.dumps({"current_page": 1, "orders": [{"order_id": 1}, {"order_id": 2}], "result": True})
+    assert list(JSONArrayStream(_chunks(body, 5), key='orders')) == [{"order_id": 1}, {"order_id": 2}]
+
+
+def test_truncated_body():
+    """Test a truncated body raises"""
+    stream = JSONArrayStream(_chunks(json.dumps(TRADES)[:-20], 10))
+    with pytest.raises(AllcoinRequestException):
+        list(stream)
+
+
+def test_stream_trades():
+    """Test streaming trades through the client"""
+    with requests_mock.mock() as m:
+        m.get('https://api.allcoin.com/api/v1/trades?symbol=eth_btc', text=json.dumps(TRADES))
+        assert list(client.stream_trades('eth_btc')) == TRADES
+
+
+def test_stream_api_exception():
+    """Test error responses raise before iteration"""
+    with requests_mock.mock() as m:
+        m.post('https://api.allcoin.com/api/v1/order_history', json={"error_code": "10007", "result": False})
+        with pytest.raises(AllcoinAPIException):
+            client.stream_order_history('eth_btc', 1)
+
+
+class _Response(object):
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_early_break_closes_response():
+    """Test leaving the with block part way through closes the response"""
+    response = _Response()
+    with JSONArrayStream(_chunks(json.dumps(TRADES), 10), response=response) as stream:
+        for trade in stream:
+            break
+    assert response.closed
+    assert list(stream) == []
+
+
+def test_connection_error_wrapped():
+    """Test a connection dropped mid body raises AllcoinRequestException"""
+    def chunks():
+        yield b'[{"tid": "1"},'
+        raise requests.exceptions.ChunkedEncodingError('connection broken')
+
+    response = _Response()
+    stream = JSONArrayStream(chunks(), response=response)
+    assert next(stream) == {'tid': '1'}
+    with pytest.raises(AllcoinRequestException):
+        next(stream)
+    assert response.closed
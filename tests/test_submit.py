@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import time
+
+from allcoin.client import Client
+from allcoin.submit import SafeOrderSubmitter
+import requests
+import requests_mock
+
+URL = 'https://api.allcoin.com/api/v1/'
+
+
+def _order(order_id, status=0):
+    return {
+        'amount': 10, 'avg_price': 0, 'create_date': int(time.time() * 1000), 'deal_amount': 0,
+        'order_id': order_id, 'price': 0.0123, 'status': status, 'symbol': 'eth_btc', 'type': 'buy'
+    }
+
+
+def _history(m, open_orders, done_orders=()):
+    m.post(URL + 'order_info', json={'result': True, 'orders': list(open_orders)})
+    m.post(URL + 'order_history', json={'current_page': 1, 'orders': list(done_orders), 'page_length': 200,
+                                        'result': True, 'total': len(done_orders)})
+
+
+def test_timed_out_order_that_landed_is_adopted():
+    """Test a create which timed out but landed is not sent again"""
+    submitter = SafeOrderSubmitter(Client('api_key', 'api_secret'))
+    with requests_mock.mock() as m:
+        m.post(URL + 'trade', exc=requests.exceptions.ReadTimeout)
+        _history(m, [_order(41)])
+        assert submitter.create_order('eth_btc', 'buy', '0.0123', '10') == '41'
+        assert [r.path for r in m.request_history].count('/api/v1/trade') == 1
+
+
+def test_timed_out_order_that_did_not_land_is_resent():
+    """Test a create which timed out and did not land is sent again"""
+    submitter = SafeOrderSubmitter(Client('api_key', 'api_secret'))
+    with requests_mock.mock() as m:
+        m.post(URL + 'trade', [{'exc': requests.exceptions.ConnectTimeout}, {'json': {'order_id': '42', 'result': True}}])
+        _history(m, [])
+        m.post(URL + 'cancel_order', json={'result': True})
+        assert submitter.create_order('eth_btc', 'buy', '0.0123', '10') == '42'
+        assert not any(r.path == '/api/v1/cancel_order' for r in m.request_history)
+
+
+def test_duplicate_is_cancelled():
+    """Test a late landing first attempt is cancelled after a successful resend"""
+    submitter = SafeOrderSubmitter(Client('api_key', 'api_secret'))
+    with requests_mock.mock() as m:
+        m.post(URL + 'trade', [{'exc': requests.exceptions.ConnectTimeout}, {'json': {'order_id': '44', 'result': True}}])
+        m.post(URL + 'order_info', [{'json': {'result': True, 'orders': []}},
+                                    {'json': {'result': True, 'orders': [_order(43), _order(44)]}}])
+        m.post(URL + 'order_history', json={'current_page': 1, 'orders': [], 'result': True, 'total': 0})
+        m.post(URL + 'cancel_order', json={'order_id': '43', 'result': True})
+        assert submitter.create_order('eth_btc', 'buy', '0.0123', '10') == '44'
+        cancels = [r for r in m.request_history if r.path == '/api/v1/cancel_order']
+        assert len(cancels) == 1
+        assert 'order_id=43' in cancels[0].text
+
+
+def test_batch_resends_only_missing_orders():
+    """Test a timed out batch resends only the orders that did not land"""
+    submitter = SafeOrderSubmitter(Client('api_key', 'api_secret'))
+    with requests_mock.mock() as m:
+        m.post(URL + 'batch_trade', [{'exc': requests.exceptions.ReadTimeout},
+                                     {'json': {'order_info': [{'order_id': 46}], 'result': True}}])
+        _history(m, [_order(45)])
+        m.post(URL + 'cancel_order', json={'result': True})
+        info = submitter.batch_orders('eth_btc', [{'price': '0.0123', 'amount': '10'}, {'price': '0.0124', 'amount': '5'}],
+                                      order_type='buy')
+        assert info == [{'order_id': 45}, {'order_id': 46}]
+        batches = [r for r in m.request_history if r.path == '/api/v1/batch_trade']
+        assert '0.0123' not in batches[1].text
+
+
+def test_older_identical_order_not_cancelled():
+    """Test an identical order placed before the intent was sent is left alone"""
+    submitter = SafeOrderSubmitter(Client('api_key', 'api_secret'))
+    old = _order(40)
+    old['create_date'] -= 30000
+    with requests_mock.mock() as m:
+        m.post(URL + 'trade', [{'exc': requests.exceptions.ReadTimeout}, {'json': {'order_id': '47', 'result': True}}])
+        m.post(URL + 'order_info', [{'json': {'result': True, 'orders': []}},
+                                    {'json': {'result': True, 'orders': [old, _order(47)]}}])
+        m.post(URL + 'order_history', json={'current_page': 1, 'orders': [], 'result': True, 'total': 0})
+        m.post(URL + 'cancel_order', json={'result': True})
+        assert submitter.create_order('eth_btc', 'buy', '0.0123', '10') == '47'
+        assert not any(r.path == '/api/v1/cancel_order' for r in m.request_history)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+from urllib.parse import parse_qs
+
+from allcoin.client import Client
+from allcoin.exceptions import AllcoinOrderValidationException
+from allcoin.symbols import SymbolRegistry
+import pytest
+import requests_mock
+
+TICKER = {'date': '1410431279', 'ticker': {'buy': '0.05', 'high': '0.052', 'last': '0.05', 'low': '0.049',
+                                           'sell': '0.0501', 'vol': '7.6'}}
+BOOK = {'asks': [[0.0502, 1.5], [0.0501, 0.25]], 'bids': [[0.05, 2.125], [0.0499, 3]]}
+
+
+def registry(**kwargs):
+    registry = SymbolRegistry(**kwargs)
+    registry.configure('eth_btc', price_decimals=4, amount_decimals=3, min_amount=0.01, max_amount=1000,
+                       price_band=0.2)
+    registry.learn('eth_btc', ticker=TICKER)
+    return registry
+
+
+def test_learn_from_market_data():
+    """Test learning records the decimals seen and the band centre without setting precision"""
+    registry = SymbolRegistry()
+    info = registry.learn('eth_btc', ticker=TICKER, book=BOOK)
+    assert (info.seen_price_decimals, info.seen_amount_decimals, info.reference_price) == (4, 3, 0.05)
+    assert (info.price_decimals, info.amount_decimals) == (None, None)
+
+
+def test_learn_only_never_rounds():
+    """Test decimals seen in market data are not used to round or reject orders"""
+    registry = SymbolRegistry()
+    registry.learn('eth_btc', ticker=TICKER)
+    assert registry.normalize('eth_btc', 'buy', '0.0512', '1.5') == ('0.0512', '1.5')
+
+    registry = SymbolRegistry(round=False)
+    registry.learn('eth_btc', book={'bids': [[0.0512, 1.0]], 'asks': [[0.0513, 2.0]]})
+    assert registry.normalize('eth_btc', 'buy', 0.051234, 1.5) == ('0.051234', '1.5')
+    assert registry.normalize('eth_btc', 'sell', 1e-08, 2) == ('0.00000001', '2')
+
+
+def test_rounds_away_from_the_spread():
+    """Test buys round down, sells round up and amounts round down"""
+    assert registry().normalize('eth_btc', 'buy', '0.050123', '1.23456') == ('0.0501', '1.234')
+    assert registry().normalize('eth_btc', 'sell', 0.050123, 1.23456) == ('0.0502', '1.234')
+
+
+@pytest.mark.parametrize('side,price,amount,code,field', [
+    ('buy', '0.050123', '1', '10008', 'price'),
+    ('buy', '0.07', '1', '10013', 'price'),
+    ('buy', '0.05', '0.001', '10023', 'amount'),
+    ('buy', '0.05', 'lots', '10008', 'amount'),
+    ('short', '0.05', '1', '10008', 'type'),
+])
+def test_rejections(side, price, amount, code, field):
+    """Test failing orders raise with the code the exchange would return"""
+    with pytest.raises(AllcoinOrderValidationException) as e:
+        registry(round=False).normalize('eth_btc', side, price, amount)
+    assert (e.value.code, e.value.field) == (code, field)
+
+
+def test_unknown_symbols():
+    """Test unknown symbols pass through unless strict"""
+    assert registry().normalize('ltc_btc', 'buy', '1.23456789', '1') == ('1.23456789', '1')
+    with pytest.raises(AllcoinOrderValidationException) as e:
+        registry(strict=True).normalize('ltc_btc', 'buy', '1', '1')
+    assert e.value.code == '10017'
+
+
+def test_client_normalizes_before_sending():
+    """Test the client sends rounded orders and makes no request for rejected ones"""
+    client = Client('api_key', 'api_secret', symbol_registry=registry())
+    with requests_mock.mock() as m:
+        m.post('https://api.allcoin.com/api/v1/trade', json={'result': True, 'order_id': 1})
+        m.post('https://api.allcoin.com/api/v1/batch_trade', json={'result': True, 'order_info': []})
+        client.create_buy_order('eth_btc', '0.050123', '1.23456')
+        sent = parse_qs(m.last_request.text)
+        assert (sent['price'], sent['amount']) == (['0.0501'], ['1.234'])
+
+        order_data = [{'price': '0.050123', 'amount': '2.0005', 'type': 'sell'}, {'price': '0.05', 'amount': '1'}]
+        client.batch_orders('eth_btc', order_data, order_type='buy')
+        sent = json.loads(parse_qs(m.last_request.text)['order_data'][0])
+        assert sent == [{'price': '0.0502', 'amount': '2.000', 'type': 'sell'}, {'price': '0.0500', 'amount': '1.000'}]
+        assert order_data[0]['price'] == '0.050123'
+
+        with pytest.raises(AllcoinOrderValidationException):
+            client.create_sell_order('eth_btc', '1', '1')
+        assert m.call_count == 2
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+
+from allcoin.client import Client
+from allcoin.sync import TradeHistorySync
+import pytest
+import requests_mock
+
+URL = 'https://api.allcoin.com/api/v1/trade_history'
+
+
+def _trade(tid, price, amount, side):
+    return {"date": tid, "date_ms": tid * 1000, "price": price, "amount": amount, "tid": str(tid), "type": side}
+
+
+def _sync(m, pages):
+    m.post(URL, [{'text': json.dumps(page)} for page in pages])
+
+
+def test_incremental_sync_and_queries():
+    """Test only new trades are requested and reports come from the store"""
+    store = TradeHistorySync(Client('api_key', 'api_secret'), fee_rate=0.001)
+    with requests_mock.mock() as m:
+        _sync(m, [[_trade(1, 10.0, 2, 'buy'), _trade(2, 12.0, 1, 'sell')], []])
+        assert store.sync('eth_btc') == 2
+        assert 'since' not in m.request_history[0].text
+
+        _sync(m, [[_trade(3, 11.0, 1, 'sell')], []])
+        assert store.sync('eth_btc') == 1
+        assert 'since=3' in m.request_history[2].text
+
+    assert store.volume('eth_btc') == {'count': 3, 'base': 4.0, 'quote': 43.0}
+    assert store.volume('eth_btc', side='sell')['quote'] == 23.0
+    assert store.fees('eth_btc') == pytest.approx(0.043)
+    assert [t['tid'] for t in store.trades('eth_btc', start=2000)] == ['2', '3']
+
+    pnl = store.pnl('eth_btc')
+    assert pnl['position'] == 0
+    assert pnl['realized'] == pytest.approx(3.0 - 0.043)
+
+    # the buy before the window still sets the cost of the sell inside it
+    pnl = store.pnl('eth_btc', start=3000)
+    assert pnl['realized'] == pytest.approx(1.0 - 0.011)
+    assert pnl['fees'] == pytest.approx(0.011)
+
+
+def test_unrealized_pnl():
+    """Test open positions are valued at the mark price"""
+    store = TradeHistorySync(Client('api_key', 'api_secret'))
+    with requests_mock.mock() as m:
+        _sync(m, [[_trade(1, 10.0, 2, 'buy'), _trade(2, 14.0, 2, 'buy')], []])
+        store.sync('eth_btc')
+    pnl = store.pnl('eth_btc', mark_price=13.0)
+    assert pnl['average_cost'] == 12.0
+    assert pnl['unrealized'] == 4.0
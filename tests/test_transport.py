@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import socket
+import subprocess
+import sys
+import threading
+
+from allcoin.client import Client
+from allcoin.exceptions import AllcoinAPIException, AllcoinRequestException
+from allcoin.retry import FAIL, RETRY, classify
+from allcoin import transport
+import pytest
+
+
+def _client(exchange, **kwargs):
+    client = Client('maker', 'maker_secret', transport='http.client', **kwargs)
+    client.API_URL = exchange.api_url
+    return client
+
+
+def test_import_is_lazy():
+    """Test importing the package and client loads neither requests nor http.client"""
+    code = ("import sys, allcoin; from allcoin import Client; Client('', '', transport='http.client'); "
+            "print(sorted(m for m in ('requests', 'http.client', 'allcoin.client') if m in sys.modules))")
+    out = subprocess.check_output([sys.executable, '-c', code]).decode().strip()
+    assert out == "['allcoin.client']"
+
+
+def test_http_client_transport(exchange):
+    """Test signed, unsigned, streamed and failing requests through the standard library transport"""
+    client = _client(exchange)
+    order_id = client.create_sell_order('eth_btc', '0.05', '1')['order_id']
+    assert client.get_order_book('eth_btc')['asks'] == [[0.05, 1.0]]
+    assert client.get_order('eth_btc', order_id)['orders'][0]['amount'] == 1
+    with client.stream_order_history('eth_btc', 0) as orders:
+        assert [o['order_id'] for o in orders] == [int(order_id)]
+    with pytest.raises(AllcoinAPIException) as e:
+        client.cancel_order('eth_btc', '999')
+    assert e.value.code == '10009'
+    # the connection is reused after an error response
+    assert client.get_ticker('eth_btc')['ticker']
+    client.close()
+
+
+def test_network_errors_classified():
+    """Test refused and timed out connections raise the transport errors retry and submit understand"""
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    port = listener.getsockname()[1]
+    listener.close()
+    client = Client('', '', transport='http.client', timeout=0.5)
+    client.API_URL = 'http://127.0.0.1:{}/api'.format(port)
+    with pytest.raises(transport.ConnectionError) as e:
+        client.get_ticker('eth_btc')
+    assert classify(e.value, idempotent=True) == RETRY
+    assert classify(e.value, idempotent=False) == FAIL
+
+    # accepts the connection and never answers
+    silent = socket.socket()
+    silent.bind(('127.0.0.1', 0))
+    silent.listen(1)
+    client.API_URL = 'http://127.0.0.1:{}/api'.format(silent.getsockname()[1])
+    with pytest.raises(transport.Timeout) as e:
+        client.get_ticker('eth_btc')
+    assert not isinstance(e.value, transport.ConnectTimeout)
+    assert classify(e.value, idempotent=False) == FAIL
+    assert classify(transport.ConnectTimeout(), idempotent=False) == RETRY
+    silent.close()
+
+
+def test_stream_errors_wrapped():
+    """Test a connection dropped mid body raises AllcoinRequestException"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def respond():
+        conn, _ = server.accept()
+        conn.recv(65536)
+        conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 1000\r\n\r\n[{"tid": 1}, {"ti')
+        conn.close()
+
+    thread = threading.Thread(target=respond)
+    thread.start()
+    client = Client('', '', transport='http.client')
+    client.API_URL = 'http://127.0.0.1:{}/api'.format(server.getsockname()[1])
+    rows = client.stream_trades('eth_btc')
+    with pytest.raises(AllcoinRequestException):
+        list(rows)
+    thread.join()
+    server.close()